@@ -0,0 +1,237 @@
+from typing import Iterator, List, Optional, Protocol, Tuple
+import queue
+import subprocess
+import threading
+import uuid
+from debloat_scheduler import Watchdog
+
+
+def parse_devices(output: str) -> List[Tuple[str, str]]:
+    """Parse the output of ``adb devices``
+    
+    Args:
+        output: Raw ``adb devices`` output
+    
+    Returns:
+        List of (serial, state) pairs, e.g. ``('R58M123', 'device')``
+    """
+    devices = []
+    for line in output.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) >= 2 and not line.startswith('*'):
+            devices.append((fields[0], fields[1]))
+    return devices
+
+
+def list_devices() -> List[str]:
+    """List serials of attached devices that are ready for commands
+    
+    Returns:
+        Serials of devices in the ``device`` state
+    
+    Raises:
+        subprocess.CalledProcessError: If ``adb devices`` fails
+    """
+    result = subprocess.run(['adb', 'devices'], capture_output=True, text=True, check=True)
+    return [serial for serial, state in parse_devices(result.stdout) if state == 'device']
+
+
+class ShellTransport(Protocol):
+    """Interface shared by the ways of running shell commands on a device
+    
+    ``timeout`` is the number of seconds a command may go without
+    producing output before it is abandoned with subprocess.TimeoutExpired.
+    """
+    
+    def run(self, command: str, timeout: Optional[float] = None) -> str:
+        """Run a shell command and return its complete stdout"""
+    
+    def stream(self, command: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Run a shell command and yield its stdout line by line"""
+    
+    def close(self) -> None:
+        """Release the transport's resources"""
+
+
+class AdbShellSession:
+    """Long-lived ``adb shell`` process that runs many commands over one channel
+    
+    Each command is written to the shell's stdin followed by sentinel markers
+    carrying its exit code, so output can be split back into per-command
+    results without paying for a new adb client process every time.
+    """
+    
+    def __init__(self, adb_args: Optional[List[str]] = None) -> None:
+        """Initialize the session (the shell itself is started lazily)
+        
+        Args:
+            adb_args: Extra arguments placed before ``shell`` (e.g. ``['-s', serial]``)
+        """
+        self.adb_args = adb_args or []
+        self._proc: Optional[subprocess.Popen] = None
+        self._stderr: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._sentinel = f"__ADB_SESSION_{uuid.uuid4().hex}__"
+    
+    @property
+    def alive(self) -> bool:
+        """Whether the underlying shell process is running"""
+        return self._proc is not None and self._proc.poll() is None
+    
+    def start(self) -> None:
+        """Start the shell process if it is not already running
+        
+        Raises:
+            FileNotFoundError: If the adb executable cannot be found
+        """
+        if self.alive:
+            return
+        self._stderr = queue.Queue()
+        self._proc = subprocess.Popen(
+            ['adb'] + self.adb_args + ['shell', 'sh'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        threading.Thread(
+            target=self._pump_stderr,
+            args=(self._proc, self._stderr),
+            daemon=True
+        ).start()
+    
+    def close(self) -> None:
+        """Terminate the shell process"""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.stdin.write("exit\n")
+                proc.stdin.flush()
+                proc.wait(timeout=2)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+    
+    @staticmethod
+    def _pump_stderr(proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]") -> None:
+        """Forward stderr lines of the shell into a queue (runs on a daemon thread)"""
+        for line in proc.stderr:
+            lines.put(line)
+        lines.put(None)
+    
+    def _frame(self, command: str) -> str:
+        """Wrap a command with the sentinel markers that delimit its output"""
+        return (
+            f"{{ {command}\n}} </dev/null\n"
+            "__adb_rc=$?\n"
+            f"echo; echo \"{self._sentinel} $__adb_rc\"\n"
+            f"echo >&2; echo \"{self._sentinel}\" >&2\n"
+        )
+    
+    def _fail(self, command: str, output: str, message: str) -> subprocess.CalledProcessError:
+        """Tear down a broken session and build the error to raise"""
+        self.close()
+        return subprocess.CalledProcessError(255, ['adb', 'shell', command], output, message)
+    
+    def stream(self, command: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Run a shell command and yield its stdout line by line
+        
+        The session is locked until the generator is exhausted or closed;
+        abandoning it early drains the remaining output so the channel
+        stays in sync. A command that stays silent for ``timeout`` seconds
+        kills the session, which is restarted by the next command.
+        
+        Args:
+            command: Shell command line to run on the device
+            timeout: Seconds without output before giving up, or None to wait forever
+        
+        Yields:
+            Output lines including their trailing newline
+        
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero or the shell dies
+            subprocess.TimeoutExpired: If the command went silent for too long
+        """
+        with self._lock:
+            self.start()
+            proc = self._proc
+            try:
+                proc.stdin.write(self._frame(command))
+                proc.stdin.flush()
+            except OSError as e:
+                raise self._fail(command, "", str(e))
+            
+            marker = self._sentinel + " "
+            pending: Optional[str] = None
+            returncode = None
+            with Watchdog(timeout, proc.kill) as watchdog:
+                try:
+                    while True:
+                        watchdog.kick()
+                        line = proc.stdout.readline()
+                        if not line:
+                            error = self._fail(command, "", "adb shell session terminated")
+                            if watchdog.expired:
+                                raise subprocess.TimeoutExpired(['adb', 'shell', command], timeout)
+                            raise error
+                        if line.startswith(marker):
+                            returncode = int(line[len(marker):].strip() or 255)
+                            break
+                        # Hold one line back: the last line before the sentinel
+                        # carries the newline injected by the frame.
+                        if pending is not None:
+                            watchdog.pause()
+                            yield pending
+                        pending = line
+                except GeneratorExit:
+                    watchdog.kick()
+                    for line in iter(proc.stdout.readline, ""):
+                        if line.startswith(marker):
+                            break
+                        watchdog.kick()
+                    self._read_stderr()
+                    raise
+            
+            stderr = self._read_stderr()
+            if pending is not None and pending != "\n":
+                yield pending[:-1]
+            if returncode != 0:
+                raise subprocess.CalledProcessError(
+                    returncode, ['adb', 'shell', command], None, stderr
+                )
+    
+    def _read_stderr(self) -> str:
+        """Collect the stderr written by the current command"""
+        lines = []
+        while True:
+            line = self._stderr.get()
+            if line is None or line.rstrip("\n") == self._sentinel:
+                break
+            lines.append(line)
+        return "".join(lines)[:-1]
+    
+    def run(self, command: str, timeout: Optional[float] = None) -> str:
+        """Run a shell command and return its complete stdout
+        
+        Args:
+            command: Shell command line to run on the device
+            timeout: Seconds without output before giving up, or None to wait forever
+        
+        Returns:
+            Command output as string
+        
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero or the shell dies
+            subprocess.TimeoutExpired: If the command went silent for too long
+        """
+        lines = []
+        try:
+            for line in self.stream(command, timeout):
+                lines.append(line)
+        except subprocess.CalledProcessError as e:
+            e.output = "".join(lines)
+            raise
+        return "".join(lines)
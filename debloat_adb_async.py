@@ -0,0 +1,387 @@
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import os
+import queue
+import struct
+import subprocess
+import threading
+import uuid
+
+# Shell protocol v2 packet ids
+SHELL_STDIN = 0
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+SHELL_CLOSE_STDIN = 4
+
+
+class AdbProtocolError(Exception):
+    """The adb server rejected a request or sent an unexpected reply"""
+
+
+def default_server_port() -> int:
+    """Port of the local adb server, honouring ANDROID_ADB_SERVER_PORT"""
+    return int(os.environ.get('ANDROID_ADB_SERVER_PORT', 5037))
+
+
+class AdbServerClient:
+    """asyncio client speaking the adb server's smart-socket protocol directly
+    
+    Every request opens its own TCP connection to the server, so any number
+    of commands and devices can be multiplexed from one event loop without
+    starting ``adb`` client processes.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: Optional[int] = None) -> None:
+        """Initialize the client
+        
+        Args:
+            host: adb server host
+            port: adb server port, defaults to ANDROID_ADB_SERVER_PORT or 5037
+        """
+        self.host = host
+        self.port = port or default_server_port()
+        self._features: Dict[Optional[str], Set[str]] = {}
+    
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(self.host, self.port)
+    
+    @staticmethod
+    async def _read_string(reader: asyncio.StreamReader) -> str:
+        """Read a hex-length-prefixed string"""
+        length = int(await reader.readexactly(4), 16)
+        return (await reader.readexactly(length)).decode('utf-8', 'replace')
+    
+    async def _request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       request: str) -> None:
+        """Send one service request and wait for OKAY
+        
+        Raises:
+            AdbProtocolError: If the server answers FAIL or garbage
+        """
+        payload = request.encode('utf-8')
+        writer.write(b'%04x' % len(payload) + payload)
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b'FAIL':
+            raise AdbProtocolError(f"{request}: {await self._read_string(reader)}")
+        if status != b'OKAY':
+            raise AdbProtocolError(f"{request}: unexpected reply {status!r}")
+    
+    async def _host_query(self, request: str) -> str:
+        """Run a host service that replies with a single string"""
+        reader, writer = await self._connect()
+        try:
+            await self._request(reader, writer, request)
+            return await self._read_string(reader)
+        finally:
+            writer.close()
+    
+    async def version(self) -> int:
+        """Get the adb server's protocol version"""
+        return int(await self._host_query('host:version'), 16)
+    
+    async def devices(self) -> List[Tuple[str, str]]:
+        """List attached devices
+        
+        Returns:
+            List of (serial, state) pairs
+        """
+        output = await self._host_query('host:devices')
+        return [tuple(line.split('\t', 1)) for line in output.splitlines() if '\t' in line]
+    
+    async def features(self, serial: Optional[str] = None) -> Set[str]:
+        """Get (and cache) the feature set shared by the server and a device"""
+        if serial not in self._features:
+            service = f'host-serial:{serial}:features' if serial else 'host:features'
+            self._features[serial] = set((await self._host_query(service)).split(','))
+        return self._features[serial]
+    
+    async def _open_transport(self, serial: Optional[str]
+                              ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a connection switched to a device's transport"""
+        reader, writer = await self._connect()
+        try:
+            await self._request(
+                reader, writer, f'host:transport:{serial}' if serial else 'host:transport-any'
+            )
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+    
+    async def shell_lines(self, serial: Optional[str], command: str) -> AsyncIterator[str]:
+        """Run a shell command and yield its stdout line by line
+        
+        Uses shell protocol v2 (separate stderr and a real exit code) when
+        the device supports it, and the legacy raw shell otherwise.
+        
+        Args:
+            serial: Device serial, or None for the only attached device
+            command: Shell command line
+        
+        Yields:
+            Output lines including their trailing newline
+        
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero
+            AdbProtocolError: If the server rejects the request
+        """
+        v2 = 'shell_v2' in await self.features(serial)
+        marker = f"__ADB_EXIT_{uuid.uuid4().hex}__ "
+        if not v2:
+            # The legacy shell has no exit status, so append one to the output
+            command = f'{command}; __adb_rc=$?; echo; echo "{marker}$__adb_rc"'
+        reader, writer = await self._open_transport(serial)
+        try:
+            await self._request(reader, writer, f'shell,v2,raw:{command}' if v2 else f'shell:{command}')
+            if v2:
+                writer.write(struct.pack('<BI', SHELL_CLOSE_STDIN, 0))
+                await writer.drain()
+            
+            buffer = b''
+            stderr = b''
+            returncode = 0
+            lines: List[str] = []
+            while True:
+                if v2:
+                    try:
+                        header = await reader.readexactly(5)
+                    except asyncio.IncompleteReadError:
+                        break
+                    packet_id, length = struct.unpack('<BI', header)
+                    data = await reader.readexactly(length)
+                    if packet_id == SHELL_EXIT:
+                        returncode = data[0] if data else 0
+                        break
+                    if packet_id == SHELL_STDERR:
+                        stderr += data
+                        continue
+                    if packet_id != SHELL_STDOUT:
+                        continue
+                else:
+                    data = await reader.read(65536)
+                    if not data:
+                        break
+                buffer += data
+                *complete, buffer = buffer.split(b'\n')
+                for line in complete:
+                    text = line.decode('utf-8', 'replace') + '\n'
+                    if v2:
+                        yield text
+                    else:
+                        lines.append(text)
+                        # Hold back the framing lines until the marker is seen
+                        while len(lines) > 2:
+                            yield lines.pop(0)
+            
+            tail = buffer.decode('utf-8', 'replace')
+            if not v2:
+                if tail:
+                    lines.append(tail)
+                    tail = ''
+                if lines and lines[-1].startswith(marker):
+                    returncode = int(lines.pop().strip()[len(marker):] or 0)
+                    if lines and lines[-1] == '\n':
+                        lines.pop()
+                    elif lines:
+                        lines[-1] = lines[-1][:-1]
+                for line in lines:
+                    yield line
+            if tail:
+                yield tail
+            if returncode != 0:
+                raise subprocess.CalledProcessError(
+                    returncode, ['adb', 'shell', command], None,
+                    stderr.decode('utf-8', 'replace')
+                )
+        finally:
+            writer.close()
+    
+    async def shell(self, serial: Optional[str], command: str) -> str:
+        """Run a shell command and return its complete stdout
+        
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero
+        """
+        lines: List[str] = []
+        try:
+            async for line in self.shell_lines(serial, command):
+                lines.append(line)
+        except subprocess.CalledProcessError as e:
+            e.output = "".join(lines)
+            raise
+        return "".join(lines)
+    
+    async def _open_sync(self, serial: Optional[str]
+                         ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await self._open_transport(serial)
+        try:
+            await self._request(reader, writer, 'sync:')
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+    
+    @staticmethod
+    def _sync_request(writer: asyncio.StreamWriter, command: bytes, path: str) -> None:
+        encoded = path.encode('utf-8')
+        writer.write(command + struct.pack('<I', len(encoded)) + encoded)
+    
+    async def stat(self, serial: Optional[str], path: str) -> Tuple[int, int, int]:
+        """Stat a file on the device through the sync protocol
+        
+        Returns:
+            (mode, size, mtime); mode is 0 if the file does not exist
+        """
+        reader, writer = await self._open_sync(serial)
+        try:
+            self._sync_request(writer, b'STAT', path)
+            await writer.drain()
+            reply = await reader.readexactly(16)
+            if reply[:4] != b'STAT':
+                raise AdbProtocolError(f"STAT {path}: unexpected reply {reply[:4]!r}")
+            return struct.unpack('<III', reply[4:])
+        finally:
+            writer.write(b'QUIT' + struct.pack('<I', 0))
+            writer.close()
+    
+    async def pull(self, serial: Optional[str], path: str) -> bytes:
+        """Read a file from the device through the sync protocol
+        
+        Raises:
+            AdbProtocolError: If the device cannot send the file
+        """
+        reader, writer = await self._open_sync(serial)
+        try:
+            self._sync_request(writer, b'RECV', path)
+            await writer.drain()
+            chunks = []
+            while True:
+                packet_id, length = struct.unpack('<4sI', await reader.readexactly(8))
+                if packet_id == b'DONE':
+                    return b''.join(chunks)
+                if packet_id == b'DATA':
+                    chunks.append(await reader.readexactly(length))
+                elif packet_id == b'FAIL':
+                    message = (await reader.readexactly(length)).decode('utf-8', 'replace')
+                    raise AdbProtocolError(f"RECV {path}: {message}")
+                else:
+                    raise AdbProtocolError(f"RECV {path}: unexpected reply {packet_id!r}")
+        finally:
+            writer.write(b'QUIT' + struct.pack('<I', 0))
+            writer.close()
+
+
+class _LoopThread:
+    """Event loop running on a daemon thread, shared by all sync transports"""
+    
+    _instance: Optional["_LoopThread"] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+    
+    @classmethod
+    def get(cls) -> "_LoopThread":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+
+def list_server_devices(client: Optional[AdbServerClient] = None) -> List[str]:
+    """List serials of ready devices by asking the adb server directly
+    
+    Args:
+        client: Client to use, defaults to one for the local adb server
+    
+    Returns:
+        Serials of devices in the ``device`` state
+    """
+    future = asyncio.run_coroutine_threadsafe((client or AdbServerClient()).devices(),
+                                              _LoopThread.get().loop)
+    return [serial for serial, state in future.result() if state == 'device']
+
+
+class AdbServerTransport:
+    """Synchronous shell transport backed by AdbServerClient
+    
+    Offers the same ``run``/``stream``/``close`` interface as
+    AdbShellSession, so PackageManager can use either one. All transports
+    share one background event loop.
+    """
+    
+    def __init__(self, serial: Optional[str] = None, client: Optional[AdbServerClient] = None) -> None:
+        """Initialize the transport
+        
+        Args:
+            serial: Device serial, or None for the only attached device
+            client: Client to use, defaults to one for the local adb server
+        """
+        self.serial = serial
+        self.client = client or AdbServerClient()
+        self._loop = _LoopThread.get().loop
+    
+    def run(self, command: str, timeout: Optional[float] = None) -> str:
+        """Run a shell command and return its complete stdout
+        
+        Joins stream(), so a long command only times out when its output stalls.
+        
+        Args:
+            command: Shell command line
+            timeout: Seconds to wait for each line, or None to wait forever
+        
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero
+            subprocess.TimeoutExpired: If no output arrived in time
+        """
+        lines: List[str] = []
+        try:
+            for line in self.stream(command, timeout):
+                lines.append(line)
+        except subprocess.CalledProcessError as e:
+            e.output = "".join(lines)
+            raise
+        return "".join(lines)
+    
+    def stream(self, command: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Run a shell command and yield its stdout as lines arrive
+        
+        Args:
+            command: Shell command line
+            timeout: Seconds to wait for each line, or None to wait forever
+        
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero
+            subprocess.TimeoutExpired: If no output arrived in time
+        """
+        lines: "queue.Queue[Tuple[bool, object]]" = queue.Queue()
+        
+        async def pump() -> None:
+            try:
+                async for line in self.client.shell_lines(self.serial, command):
+                    lines.put((True, line))
+                lines.put((False, None))
+            except BaseException as e:
+                lines.put((False, e))
+                raise
+        
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                try:
+                    more, item = lines.get(timeout=timeout)
+                except queue.Empty:
+                    raise subprocess.TimeoutExpired(['adb', 'shell', command], timeout)
+                if not more:
+                    if item is not None:
+                        raise item
+                    return
+                yield item
+        finally:
+            future.cancel()
+    
+    def close(self) -> None:
+        """Nothing to release; connections only live for one command"""
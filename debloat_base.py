@@ -1,86 +1,190 @@
 from dataclasses import dataclass
-from enum import Enum, auto
-from typing import Dict, List, Optional
-import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import contextlib
+import posixpath
+import shlex
 import subprocess
+import threading
+import time
 from pathlib import Path
+from debloat_adb import AdbShellSession, ShellTransport
+from debloat_dumpsys import (
+    parse_batterystats_checkin, parse_diskstats, parse_du, parse_dumpsys_packages,
+    parse_meminfo, parse_overlay_list, parse_package_changes, parse_package_paths
+)
+from debloat_graph import DependencyGraph, RemovalPlan, build_dependency_graph, plan_removal
+from debloat_metrics import AdbMetrics, default_metrics
+from debloat_model import Package, PackageCategory, SafetyStatus, PackageState
+from debloat_references import ReferenceIndex
+from debloat_rules import PackageClassifier, rules_fingerprint
+from debloat_scheduler import ADB_ERRORS, CommandScheduler, Watchdog, default_scheduler, is_transient
+from debloat_search import SearchIndex
+from debloat_store import PackageStore, open_store
 
 
-class PackageCategory(Enum):
-    """Categories for Android packages"""
-    SYSTEM = auto()
-    SAMSUNG = auto()
-    GOOGLE = auto()
-    CARRIER = auto()
-    THIRD_PARTY = auto()
-    UNKNOWN = auto()
+class OperationCancelled(Exception):
+    """A long-running operation was stopped through its cancel event"""
 
 
-class SafetyStatus(Enum):
-    """Safety status for package removal"""
-    SAFE_TO_REMOVE = auto()
-    ESSENTIAL = auto()
-    CAUTION = auto()  # Removal may impact some features
-    UNKNOWN = auto()
+@dataclass
+class PackageResult:
+    """Outcome of one package within a batch operation"""
+    name: str
+    success: bool
+    message: str = ""
+    cancelled: bool = False  # Skipped because the batch was cancelled
 
 
-class PackageState(Enum):
-    """Current state of a package"""
-    INSTALLED = auto()
-    REMOVED = auto()
-    DISABLED = auto()
+# Called as progress(result, completed, total) after each package of a batch
+BatchProgress = Callable[[PackageResult, int, int], None]
 
 
 @dataclass
-class Package:
-    """Represents an Android package with metadata"""
-    name: str  # Package identifier (e.g. com.samsung.android.app.camera)
-    description: str
-    category: PackageCategory
-    safety_status: SafetyStatus
-    state: PackageState
-    dependencies: List[str] = None  # List of package names this package depends on
-    dependents: List[str] = None    # List of package names that depend on this package
-    
-    def __post_init__(self) -> None:
-        """Initialize optional fields"""
-        if self.dependencies is None:
-            self.dependencies = []
-        if self.dependents is None:
-            self.dependents = []
+class BatchResult:
+    """Per-package report of a batched removal or restore"""
+    results: List[PackageResult]
+    
+    @property
+    def succeeded(self) -> List[str]:
+        """Names of packages the operation succeeded for"""
+        return [r.name for r in self.results if r.success]
+    
+    @property
+    def failed(self) -> List[str]:
+        """Names of packages the operation was attempted for and failed"""
+        return [r.name for r in self.results if not r.success and not r.cancelled]
+    
+    @property
+    def cancelled(self) -> List[str]:
+        """Names of packages skipped because the batch was cancelled"""
+        return [r.name for r in self.results if r.cancelled]
+
+
+@dataclass
+class ScanDiff:
+    """Changes a rescan found relative to the stored package snapshot"""
+    listed: List[str]   # Every package the device reported, in listing order
+    added: List[str]    # Packages not known before the scan
+    removed: List[str]  # Known packages the device no longer lists at all
+    changed: Dict[str, Tuple[PackageState, PackageState]]  # name -> (old state, new state)
+    
+    @property
+    def unchanged(self) -> bool:
+        """Whether the scan found nothing to update"""
+        return not (self.added or self.removed or self.changed)
+    
+    @property
+    def touched(self) -> List[str]:
+        """Names of every added, removed or state-changed package"""
+        return self.added + self.removed + list(self.changed)
+    
+    def summary(self) -> str:
+        """One-line summary of the scan"""
+        return (f"{len(self.listed)} packages: {len(self.added)} added, "
+                f"{len(self.removed)} removed, {len(self.changed)} state changed")
+    
+    def report(self) -> List[str]:
+        """Change report: the summary followed by one line per change"""
+        lines = [self.summary()]
+        lines.extend(f"+ {name}" for name in sorted(self.added))
+        lines.extend(f"- {name}" for name in sorted(self.removed))
+        lines.extend(
+            f"~ {name}: {old.name} -> {new.name}"
+            for name, (old, new) in sorted(self.changed.items())
+        )
+        return lines
 
 
 class PackageManager:
     """Manages Android packages via ADB"""
     
-    def __init__(self, db_path: Optional[Path] = None) -> None:
+    # Marks the start/end of each command's output in a batch script
+    _BATCH_MARKER = "__DEBLOAT_BATCH__"
+    
+    # Packages per batch script; cancellation takes effect between chunks
+    BATCH_CHUNK_SIZE = 25
+    
+    # Tags the sections of the single-pass package listing
+    _SCAN_MARKER = "__DEBLOAT_SCAN__"
+    
+    # Tags the sections of the storage size collection script
+    _SIZE_MARKER = "__DEBLOAT_SIZES__"
+    
+    # Tags the sections of the resource profiling script
+    _PROFILE_MARKER = "__DEBLOAT_PROFILE__"
+    
+    # Weight of each measured resource in Package.impact
+    IMPACT_WEIGHTS = {'memory_kb': 0.35, 'cpu_ms': 0.3, 'wakelock_ms': 0.2, 'wakeups': 0.15}
+    
+    # Listing flags in priority order, with the state they imply
+    _SCAN_SECTIONS = [
+        ('-e', PackageState.INSTALLED),  # Only enabled packages
+        ('-d', PackageState.DISABLED),   # Only disabled packages
+        ('-u', PackageState.REMOVED)     # All packages, including uninstalled
+    ]
+    
+    # Ways of running shell commands, see __init__
+    TRANSPORTS = ('session', 'subprocess', 'server')
+    
+    # Store metadata key of the references and rules the packages were classified with
+    _CLASSIFICATION_KEY = 'classification'
+    
+    def __init__(self, db_path: Optional[Path] = None, transport: str = 'session',
+                 serial: Optional[str] = None,
+                 references: Optional[ReferenceIndex] = None,
+                 metrics: Optional[AdbMetrics] = None,
+                 scheduler: Optional[CommandScheduler] = None) -> None:
         """Initialize the package manager
         
         Args:
-            db_path: Path to package database JSON file
+            db_path: Path to package database (SQLite, or JSON for a ``.json`` path)
+            transport: How shell commands reach the device: 'session' (one
+                long-lived adb shell), 'subprocess' (one adb process per
+                command) or 'server' (asyncio client talking to the adb server)
+            serial: Device serial to target, or None for adb's default device
+            references: Compiled reference index to share, defaults to one
+                over references.md and the references/ directory
+            metrics: Recorder for adb command timings, defaults to the shared one
+            scheduler: Concurrency limits, timeouts and retries for adb
+                commands, defaults to the shared one
+        
+        Raises:
+            ValueError: If the transport is unknown
         """
+        if transport not in self.TRANSPORTS:
+            raise ValueError(f"Unknown transport: {transport}")
+        self.serial = serial
+        self._adb_args: List[str] = ['-s', serial] if serial else []
+        self.metrics = metrics or default_metrics
+        self.scheduler = scheduler or default_scheduler
         self.packages: Dict[str, Package] = {}
-        self.db_path = db_path or Path("package_db.json")
-        self.reference_data: Dict[str, Dict[str, str]] = {}
-        self._load_reference_data()
+        self.db_path = db_path or Path("package_db.sqlite3")
+        self.store: PackageStore = open_store(self.db_path)
+        self.reference_data: ReferenceIndex = references or ReferenceIndex()
+        self._shell: Optional[ShellTransport] = None
+        if transport == 'session':
+            self._shell = AdbShellSession(self._adb_args)
+        elif transport == 'server':
+            from debloat_adb_async import AdbServerTransport
+            self._shell = AdbServerTransport(serial)
+        self.classifier = PackageClassifier(self.reference_data)
+        self._search_index: Optional[SearchIndex] = None
+        self._graph: Optional[DependencyGraph] = None
         self._load_package_db()
+        self._refresh_classifications()
+    
+    def close(self) -> None:
+        """Close the shell transport, if any, and the package store"""
+        if self._shell is not None:
+            self._shell.close()
+        self.store.close()
+    
+    def __enter__(self) -> "PackageManager":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
         
-    def _load_reference_data(self) -> None:
-        """Load package descriptions from references.md"""
-        try:
-            with open("phone_debloat/references.md", 'r') as f:
-                # Skip header line and parse tab-separated data
-                for line in f.readlines()[1:]:
-                    parts = [p.strip() for p in line.split('\t')]
-                    if len(parts) >= 4 and parts[1]:  # Has package name
-                        self.reference_data[parts[1]] = {
-                            'name': parts[0],
-                            'description': parts[2],  # Extra Information column
-                            'safe': parts[3]
-                        }
-        except FileNotFoundError:
-            print("Warning: references.md not found")
-            
     def _get_package_description(self, package_name: str) -> str:
         """Get package description from reference data
         
@@ -103,70 +207,7 @@ class PackageManager:
         Returns:
             SafetyStatus enum value
         """
-        # Check reference data first
-        if package_name in self.reference_data:
-            safe_value = self.reference_data[package_name]['safe'].upper()
-            if safe_value == 'NO':
-                return SafetyStatus.ESSENTIAL
-            elif safe_value == 'NOT RECOMMENDED':
-                return SafetyStatus.CAUTION
-            elif safe_value == 'YES':
-                return SafetyStatus.SAFE_TO_REMOVE
-        
-        # Known essential packages
-        essential_patterns = [
-            "com.samsung.android.kgclient",  # Knox - DO NOT DISABLE
-            "com.android.phone",             # Phone functionality
-            "com.android.systemui",          # System UI
-            "com.android.settings",          # Settings app
-            "com.android.providers.settings" # Settings provider
-        ]
-        
-        # Known caution packages
-        caution_patterns = [
-            "com.android.mms",              # MMS functionality
-            "com.samsung.advp.imssettings", # IMS Settings
-            ".knox.",                       # Knox security features
-            "com.samsung.android.messaging" # Default messaging
-        ]
-        
-        # Check for exact matches first
-        if any(package_name == pattern for pattern in essential_patterns):
-            return SafetyStatus.ESSENTIAL
-            
-        if any(package_name == pattern for pattern in caution_patterns):
-            return SafetyStatus.CAUTION
-            
-        # Check for pattern matches
-        if any(pattern in package_name for pattern in [
-            "provider",      # Content providers
-            "security",      # Security features
-            "permission",    # Permission handlers
-            "system",        # System components
-            "framework"      # Framework components
-        ]):
-            return SafetyStatus.CAUTION
-            
-        # Common safe-to-remove patterns
-        if any(pattern in package_name for pattern in [
-            "facebook",
-            "game",
-            "theme",
-            "wallpaper",
-            "sticker",
-            "widget",
-            "overlay",
-            "demo",
-            "test",
-            "sample",
-            "bixby",
-            "ar",           # AR features
-            "edge",         # Edge panels
-            "share"         # Sharing features
-        ]):
-            return SafetyStatus.SAFE_TO_REMOVE
-            
-        return SafetyStatus.UNKNOWN
+        return self.classifier.classify(package_name).safety_status
         
     def _classify_category(self, package_name: str) -> PackageCategory:
         """Determine package category based on package name
@@ -177,149 +218,909 @@ class PackageManager:
         Returns:
             PackageCategory enum value
         """
-        if package_name.startswith("com.samsung."):
-            return PackageCategory.SAMSUNG
-        elif package_name.startswith("com.sec."):  # Samsung's other namespace
-            return PackageCategory.SAMSUNG
-        elif package_name.startswith("com.google."):
-            return PackageCategory.GOOGLE
-        elif package_name.startswith("com.android."):
-            return PackageCategory.SYSTEM
-        elif any(package_name.startswith(prefix) for prefix in [
-            "com.verizon.",
-            "com.vzw.",
-            "com.att.",
-            "com.sprint.",
-            "com.tmobile."
-        ]):
-            return PackageCategory.CARRIER
-        elif any(package_name.startswith(prefix) for prefix in [
-            "com.facebook.",
-            "com.microsoft.",
-            "com.spotify.",
-            "com.netflix.",
-            "com.amazon."
-        ]):
-            return PackageCategory.THIRD_PARTY
-            
-        return PackageCategory.UNKNOWN
+        return self.classifier.classify(package_name).category
 
     def _load_package_db(self) -> None:
-        """Load package definitions from JSON database"""
-        if self.db_path.exists():
-            with open(self.db_path, 'r') as f:
-                data = json.load(f)
-                for pkg_data in data:
-                    pkg = Package(
-                        name=pkg_data['name'],
-                        description=pkg_data['description'],
-                        category=PackageCategory[pkg_data['category']],
-                        safety_status=SafetyStatus[pkg_data['safety_status']],
-                        state=PackageState[pkg_data['state']],
-                        dependencies=pkg_data.get('dependencies', []),
-                        dependents=pkg_data.get('dependents', [])
-                    )
-                    self.packages[pkg.name] = pkg
+        """Load package definitions from the package store"""
+        self.packages.update(self.store.load())
 
+    def _refresh_classifications(self) -> List[str]:
+        """Re-derive stored descriptions, categories and safety after a reference or rule change
+        
+        Scans only classify new packages, so the references and rules the
+        stored packages were classified with are recorded in the store. When
+        either changed since, every package is classified again and only the
+        packages whose fields changed are written.
+        
+        Returns:
+            Names of packages whose description, category or safety status changed
+        """
+        fingerprint = f"{self.reference_data.fingerprint()}:{rules_fingerprint()}"
+        if self.store.get_meta(self._CLASSIFICATION_KEY) == fingerprint:
+            return []
+        self.classifier.clear_cache()
+        classifications = self.classifier.classify_batch(self.packages)
+        changed = []
+        for name, pkg in self.packages.items():
+            classification = classifications[name]
+            fields = (self._get_package_description(name), classification.category,
+                      classification.safety_status)
+            if fields != (pkg.description, pkg.category, pkg.safety_status):
+                pkg.description, pkg.category, pkg.safety_status = fields
+                changed.append(name)
+        if changed:
+            self.save_packages(changed)
+        self.store.set_meta(self._CLASSIFICATION_KEY, fingerprint)
+        return changed
+    
     def save_package_db(self) -> None:
-        """Save current package definitions to JSON database"""
-        data = []
-        for pkg in self.packages.values():
-            pkg_data = {
-                'name': pkg.name,
-                'description': pkg.description,
-                'category': pkg.category.name,
-                'safety_status': pkg.safety_status.name,
-                'state': pkg.state.name,
-                'dependencies': pkg.dependencies,
-                'dependents': pkg.dependents
-            }
-            data.append(pkg_data)
+        """Save all current package definitions to the package store"""
+        self.store.save_all(self.packages.values())
+    
+    def save_packages(self, package_names: Iterable[str]) -> None:
+        """Write only the given packages to the package store
+        
+        Args:
+            package_names: Names of packages whose records changed
+        """
+        self.store.update(self.packages[name] for name in package_names)
+    
+    @property
+    def search_index(self) -> SearchIndex:
+        """Search index over all known packages, built on first use"""
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+            self._index_packages(self.packages)
+        return self._search_index
+    
+    def _index_packages(self, package_names: Iterable[str]) -> None:
+        """Refresh the search index entries of the given packages, if it is built"""
+        index = self._search_index
+        if index is None:
+            return
+        for name in package_names:
+            pkg = self.packages.get(name)
+            if pkg is None:
+                index.remove(name)
+            else:
+                index.add(name, pkg.description, self.reference_data.get(name, {}).get('name', ''))
+    
+    @property
+    def graph(self) -> DependencyGraph:
+        """Dependency graph of the known packages, built on first use"""
+        if self._graph is None:
+            self._graph = DependencyGraph.from_packages(self.packages)
+        return self._graph
+    
+    def _is_present(self, package_name: str) -> bool:
+        """Whether a package is known and not removed from the device"""
+        pkg = self.packages.get(package_name)
+        return pkg is not None and pkg.state != PackageState.REMOVED
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Package]:
+        """Find packages whose name, app label or description contain every query term
+        
+        Args:
+            query: Search text, e.g. ``samsung knox``
+            limit: Maximum number of results, or None for all
+        
+        Returns:
+            Matching Package objects, best matches first
+        """
+        return [self.packages[name] for name in self.search_index.search(query, limit)]
+    
+    def filter_packages(self, category: Optional[PackageCategory] = None,
+                        safety_status: Optional[SafetyStatus] = None,
+                        state: Optional[PackageState] = None) -> List[Package]:
+        """Get packages matching all given criteria, using the store's indexes
+        
+        Args:
+            category: Required category, or None for any
+            safety_status: Required safety status, or None for any
+            state: Required state, or None for any
             
-        with open(self.db_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        Returns:
+            List of Package objects sorted by name
+        """
+        names = self.store.query(category, safety_status, state)
+        return [self.packages[name] for name in names if name in self.packages]
 
-    def _execute_adb(self, command: List[str]) -> str:
+    def _execute_adb(self, command: List[str], timeout: Optional[float] = None) -> str:
         """Execute an ADB command and return the output
         
+        ``shell`` commands reuse the shell transport when one is configured;
+        everything else (``devices``, ``version``, ...) runs as its own process.
+        The command waits for a slot of the scheduler and is retried with
+        backoff when it fails transiently (e.g. "device offline").
+        
         Args:
             command: List of command components
+            timeout: Seconds the command may go without output, defaults to
+                the scheduler's timeout
             
         Returns:
             Command output as string
             
         Raises:
             subprocess.CalledProcessError: If command fails
+            subprocess.TimeoutExpired: If the device stopped answering
         """
+        if timeout is None:
+            timeout = self.scheduler.timeout
         try:
-            result = subprocess.run(
-                ['adb'] + command,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout
+            return self.scheduler.call(self.serial, lambda: self._execute_once(command, timeout))
         except subprocess.CalledProcessError as e:
             print(f"ADB command failed: {e.stderr}")
             raise
+    
+    def _execute_once(self, command: List[str], timeout: Optional[float]) -> str:
+        """Run one attempt of an ADB command and record its metrics"""
+        started = time.perf_counter()
+        output = ""
+        status = -1  # Left at -1 if the transport itself failed or timed out
+        try:
+            if self._shell is not None and len(command) > 1 and command[0] == 'shell':
+                # adb joins shell arguments with spaces, so do the same here
+                output = self._shell.run(' '.join(command[1:]), timeout)
+            else:
+                output = subprocess.run(
+                    ['adb'] + self._adb_args + command,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    timeout=timeout
+                ).stdout
+            status = 0
+            return output
+        except subprocess.CalledProcessError as e:
+            status = e.returncode
+            output = e.output or ""
+            raise
+        finally:
+            self.metrics.record(command, self.serial, time.perf_counter() - started,
+                                len(output), status)
 
-    def get_installed_packages(self) -> List[str]:
+    def _stream_adb(self, command: List[str], timeout: Optional[float] = None) -> Iterator[str]:
+        """Execute an ADB command and yield its output line by line
+        
+        Like _execute_adb, the command runs in a scheduler slot, and a
+        transient failure is retried as long as no output was yielded yet.
+        
+        Args:
+            command: List of command components
+            timeout: Seconds the command may go without output, defaults to
+                the scheduler's timeout
+        
+        Yields:
+            Output lines as they arrive from the device
+        
+        Raises:
+            subprocess.CalledProcessError: If command fails
+            subprocess.TimeoutExpired: If the device stopped answering
+        """
+        if timeout is None:
+            timeout = self.scheduler.timeout
+        delays = self.scheduler.retry.delays()
+        while True:
+            started = False
+            try:
+                with self.scheduler.slot(self.serial), \
+                        contextlib.closing(self._stream_once(command, timeout)) as lines:
+                    for line in lines:
+                        started = True
+                        yield line
+                return
+            except ADB_ERRORS as e:
+                delay = next(delays, None)
+                if started or delay is None or not is_transient(e):
+                    if isinstance(e, subprocess.CalledProcessError):
+                        print(f"ADB command failed: {e.stderr}")
+                    raise
+            time.sleep(delay)
+    
+    def _stream_once(self, command: List[str], timeout: Optional[float]) -> Iterator[str]:
+        """Run one attempt of a streamed ADB command and record its metrics"""
+        started = time.perf_counter()
+        nbytes = 0
+        status: Optional[int] = -1
+        proc: Optional[subprocess.Popen] = None
+        try:
+            if self._shell is not None and len(command) > 1 and command[0] == 'shell':
+                lines = self._shell.stream(' '.join(command[1:]), timeout)
+                for line in lines:
+                    nbytes += len(line)
+                    yield line
+            else:
+                args = ['adb'] + self._adb_args + command
+                proc = subprocess.Popen(
+                    args,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+                with Watchdog(timeout, proc.kill) as watchdog:
+                    for line in proc.stdout:
+                        nbytes += len(line)
+                        watchdog.pause()
+                        yield line
+                        watchdog.kick()
+                with proc:
+                    stderr = proc.stderr.read()
+                if watchdog.expired:
+                    raise subprocess.TimeoutExpired(args, timeout, None, stderr)
+                if proc.returncode:
+                    raise subprocess.CalledProcessError(proc.returncode, args, None, stderr)
+            status = 0
+        except GeneratorExit:
+            # The caller stopped reading (e.g. cancelled): let the transport
+            # drain its channel, or stop the process
+            status = None
+            if proc is None:
+                lines.close()
+            else:
+                proc.kill()
+                with proc:
+                    pass
+            raise
+        except subprocess.CalledProcessError as e:
+            status = e.returncode
+            raise
+        finally:
+            self.metrics.record(command, self.serial, time.perf_counter() - started,
+                                nbytes, status)
+    
+    def _parse_package_listing(self, lines: Iterable[str],
+                               cancel: Optional[threading.Event] = None) -> Dict[str, PackageState]:
+        """Parse the tagged output of the single-pass package listing
+        
+        Args:
+            lines: Output lines of the scan script
+            cancel: Event that aborts parsing when set
+        
+        Returns:
+            Mapping of package name to its state on the device
+        
+        Raises:
+            OperationCancelled: If the cancel event is set
+        """
+        section_states = dict(self._SCAN_SECTIONS)
+        marker = self._SCAN_MARKER + " "
+        states: Dict[str, PackageState] = {}
+        state: Optional[PackageState] = None
+        for line in lines:
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("Scan cancelled")
+            if line.startswith(marker):
+                state = section_states.get(line[len(marker):].strip())
+            elif state is not None and line.startswith('package:'):
+                # First section a package appears in wins (enabled > disabled > uninstalled)
+                states.setdefault(line[len('package:'):].strip(), state)
+        return states
+    
+    def rescan(self, cancel: Optional[threading.Event] = None) -> ScanDiff:
+        """List the device's packages and apply only the differences
+        
+        All package states are collected with one shell invocation that emits
+        a tagged section per ``pm list packages`` flag. The listing is compared
+        with the known packages: new packages are classified and added,
+        packages the device no longer lists are dropped, and state changes are
+        applied. Only those packages are written to the database and search
+        index, so rescanning an unchanged device costs little beyond the adb
+        round-trip.
+        
+        Args:
+            cancel: Event that aborts the scan, leaving packages and DB untouched
+        
+        Returns:
+            ScanDiff describing what changed
+        
+        Raises:
+            OperationCancelled: If the cancel event is set before the scan completes
+        """
+        return self.apply_listing(self.list_package_states(cancel))
+    
+    def list_package_states(self, cancel: Optional[threading.Event] = None
+                            ) -> Dict[str, PackageState]:
+        """List every package's state on the device without applying it
+        
+        This is the device half of rescan; it leaves the packages untouched,
+        so it can run on a worker thread while another thread reads them.
+        
+        Args:
+            cancel: Event that aborts the listing
+        
+        Returns:
+            State of every listed package, for apply_listing
+        
+        Raises:
+            OperationCancelled: If the cancel event is set before the listing completes
+        """
+        script = "; ".join(
+            f'echo "{self._SCAN_MARKER} {flag}"; pm list packages {flag}'
+            for flag, _ in self._SCAN_SECTIONS
+        )
+        lines = self._stream_adb(['shell', script])
+        try:
+            return self._parse_package_listing(lines, cancel)
+        finally:
+            lines.close()
+    
+    def refresh_packages(self, package_names: Iterable[str]) -> ScanDiff:
+        """List only some packages and apply their changes
+        
+        Used to follow single-package changes without a full rescan. Each
+        package gets the scan's tagged ``pm list packages`` sections, filtered
+        to its name; packages the device no longer lists are dropped.
+        
+        Args:
+            package_names: Names of packages to re-check
+        
+        Returns:
+            ScanDiff limited to the given packages
+        """
+        names = list(dict.fromkeys(package_names))
+        return self.apply_listing(self.list_packages(names), names)
+    
+    def list_packages(self, package_names: Iterable[str]) -> Dict[str, PackageState]:
+        """List only some packages' states without applying them
+        
+        This is the device half of refresh_packages. It costs one ``pm list``
+        per scan section and package, so a full listing is cheaper for more
+        than a few packages.
+        
+        Args:
+            package_names: Names of packages to check
+        
+        Returns:
+            State of each given package the device still lists
+        """
+        names = list(dict.fromkeys(package_names))
+        if not names:
+            return {}
+        script = "; ".join(
+            f'echo "{self._SCAN_MARKER} {flag}"; pm list packages {flag} {name}'
+            for name in names
+            for flag, _ in self._SCAN_SECTIONS
+        )
+        listed = self._parse_package_listing(self._execute_adb(['shell', script]).splitlines())
+        # The filter matches substrings, so other packages may be listed too
+        wanted = set(names)
+        return {name: state for name, state in listed.items() if name in wanted}
+    
+    def apply_listing(self, states: Dict[str, PackageState],
+                      scope: Optional[List[str]] = None) -> ScanDiff:
+        """Apply a package listing to the packages, DB and search index
+        
+        Packages are added to and dropped from the package dict here, so this
+        must run on the thread that reads them (the Tk thread in the GUI).
+        
+        Args:
+            states: State of every listed package
+            scope: Packages the listing covered, or None for a full listing
+        
+        Returns:
+            ScanDiff describing what changed
+        """
+        packages = self.packages
+        known = packages if scope is None else [name for name in scope if name in packages]
+        added = [name for name in states if name not in packages]
+        removed = [name for name in known if name not in states]
+        changed = {
+            name: (packages[name].state, state) for name, state in states.items()
+            if name in packages and packages[name].state != state
+        }
+        
+        # Only new packages need classifying
+        classifications = self.classifier.classify_batch(added)
+        for pkg_name in added:
+            classification = classifications[pkg_name]
+            packages[pkg_name] = Package(
+                name=pkg_name,
+                description=self._get_package_description(pkg_name),
+                category=classification.category,
+                safety_status=classification.safety_status,
+                state=states[pkg_name]
+            )
+        for pkg_name, (_, state) in changed.items():
+            packages[pkg_name].state = state
+        for pkg_name in removed:
+            del packages[pkg_name]
+        if removed:
+            self._graph = None
+        
+        # Save only the differences
+        if removed:
+            self.store.delete(removed)
+        if added or changed:
+            self.save_packages(added + list(changed))
+        self._index_packages(added + removed)
+        return ScanDiff(list(states), added, removed, changed)
+    
+    def package_changes(self, since: int = 0) -> Tuple[Optional[int], List[str]]:
+        """Ask the device which packages changed after a sequence number
+        
+        Reads the package manager's change log, which numbers every install,
+        uninstall and enable state change since boot.
+        
+        Args:
+            since: Sequence number of the last change already applied
+        
+        Returns:
+            (current sequence number, names of packages changed since), with
+            None as the sequence number if the device keeps no change log
+        """
+        try:
+            output = self._execute_adb(['shell', 'dumpsys package changes'])
+        except subprocess.CalledProcessError:
+            return None, []
+        sequence, changes = parse_package_changes(output.splitlines())
+        return sequence, list(dict.fromkeys(name for number, name in changes if number > since))
+    
+    def reboot(self, timeout: float = 300.0, interval: float = 1.0) -> float:
+        """Reboot the device and wait until it has finished booting
+        
+        The new boot is recognised by the kernel's boot id changing, so a
+        device that has not gone down yet is not mistaken for a booted one.
+        The reboot command itself is never retried.
+        
+        Args:
+            timeout: Seconds to wait for sys.boot_completed
+            interval: Seconds between checks while the device is booting
+        
+        Returns:
+            Seconds from the reboot command until the boot completed
+        
+        Raises:
+            subprocess.TimeoutExpired: If the device did not finish booting in time
+        """
+        check = ['shell', 'cat /proc/sys/kernel/random/boot_id; getprop sys.boot_completed']
+        before = self._execute_adb(check).split()[:1]
+        started = time.monotonic()
+        # The connection usually drops before the command returns
+        with contextlib.suppress(*ADB_ERRORS), self.scheduler.slot(self.serial):
+            self._execute_once(['shell', 'reboot'], self.scheduler.timeout)
+        while time.monotonic() - started < timeout:
+            time.sleep(interval)
+            try:
+                with self.scheduler.slot(self.serial):
+                    fields = self._execute_once(check, max(interval * 10, 10.0)).split()
+            except ADB_ERRORS:
+                continue  # Still down or coming up
+            if fields[:1] != before and fields[1:2] == ['1']:
+                return time.monotonic() - started
+        raise subprocess.TimeoutExpired(['adb', 'reboot'], timeout)
+    
+    def _list_overlays(self) -> Dict[str, str]:
+        """Get the overlay packages and their targets (empty without an overlay service)"""
+        try:
+            output = self._execute_adb(['shell', 'cmd overlay list'])
+        except subprocess.CalledProcessError:
+            return {}
+        return parse_overlay_list(output.splitlines())
+    
+    def harvest_metadata(self, cancel: Optional[threading.Event] = None) -> List[str]:
+        """Fill in version, uid, install and library metadata for all known packages
+        
+        Everything comes from one ``dumpsys package packages`` invocation whose
+        output is parsed as it streams, one package block at a time. The same
+        data, plus the overlay list, rebuilds the dependency graph that fills
+        in ``dependencies`` and ``dependents``.
+        
+        Args:
+            cancel: Event that aborts the harvest, leaving packages and DB untouched
+        
+        Returns:
+            Names of the packages whose metadata changed
+        
+        Raises:
+            OperationCancelled: If the cancel event is set before the harvest completes
+        """
+        found = {}
+        declared: Dict[str, List[str]] = {}
+        requested: Dict[str, List[str]] = {}
+        lines = self._stream_adb(['shell', 'dumpsys package packages'])
+        try:
+            for pkg_name, fields in parse_dumpsys_packages(lines):
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled("Metadata harvest cancelled")
+                declared[pkg_name] = fields.pop('declared_permissions')
+                requested[pkg_name] = fields.pop('requested_permissions')
+                if pkg_name in self.packages:
+                    found[pkg_name] = fields
+        finally:
+            lines.close()
+        overlays = self._list_overlays()
+        
+        changed: Set[str] = set()
+        for pkg_name, fields in found.items():
+            if self.packages[pkg_name].update(**fields):
+                changed.add(pkg_name)
+        
+        graph = build_dependency_graph(self.packages, declared, requested, overlays)
+        for pkg_name, pkg in self.packages.items():
+            if pkg.update(dependencies=sorted(graph.dependencies(pkg_name)),
+                          dependents=sorted(graph.dependents(pkg_name))):
+                changed.add(pkg_name)
+        self._graph = graph
+        
+        if changed:
+            self.save_packages(changed)
+        return sorted(changed)
+    
+    def _capture_sections(self, marker: str, commands: Dict[str, str],
+                          cancel: Optional[threading.Event], message: str) -> Dict[str, List[str]]:
+        """Run several commands as one tagged script and split their output
+        
+        Args:
+            marker: Tag echoed before each command's output
+            commands: Section name -> shell command
+            cancel: Event that aborts reading when set
+            message: OperationCancelled message
+        
+        Returns:
+            Section name -> output lines
+        
+        Raises:
+            OperationCancelled: If the cancel event is set
+        """
+        script = "; ".join(
+            f'echo "{marker} {name}"; {command}' for name, command in commands.items()
+        ) + "; true"
+        sections: Dict[str, List[str]] = {name: [] for name in commands}
+        section: Optional[List[str]] = None
+        lines = self._stream_adb(['shell', script])
+        try:
+            for line in lines:
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled(message)
+                if line.startswith(marker + " "):
+                    section = sections.get(line[len(marker) + 1:].strip())
+                elif section is not None:
+                    section.append(line)
+        finally:
+            lines.close()
+        return sections
+    
+    def collect_sizes(self, cancel: Optional[threading.Event] = None) -> List[str]:
+        """Fill in code, data and cache sizes for all known packages
+        
+        One script lists every package's APK path (``pm list packages -f``)
+        and dumps the system's storage statistics (``dumpsys diskstats``).
+        Packages missing from the statistics get their code size measured
+        with a single ``du`` over all their install locations; their data
+        and cache directories are not readable from the shell.
+        
+        Args:
+            cancel: Event that aborts the collection, leaving packages and DB untouched
+        
+        Returns:
+            Names of the packages whose sizes changed
+        
+        Raises:
+            OperationCancelled: If the cancel event is set before the collection completes
+        """
+        marker = self._SIZE_MARKER
+        sections = self._capture_sections(
+            marker, {'paths': 'pm list packages -f -u', 'diskstats': 'dumpsys diskstats'},
+            cancel, "Size collection cancelled"
+        )
+        apks = parse_package_paths(sections['paths'])
+        sizes = parse_diskstats(sections['diskstats'])
+        
+        # An APK in its own directory is measured with its native libraries
+        # and oat files; one in a shared directory such as /system/framework alone
+        code_paths = {}
+        for pkg_name, apk in apks.items():
+            directory = posixpath.dirname(apk)
+            code_paths[pkg_name] = directory if directory.count('/') >= 3 else apk
+        missing = {
+            code_paths[pkg_name]: pkg_name for pkg_name in self.packages
+            if pkg_name not in sizes and pkg_name in code_paths
+        }
+        if missing:
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("Size collection cancelled")
+            paths = " ".join(shlex.quote(path) for path in missing)
+            output = self._execute_adb(['shell', f'echo "{marker} du"; du -sk {paths} 2>/dev/null; true'])
+            for path, size in parse_du(output.splitlines()).items():
+                if path in missing:
+                    sizes[missing[path]] = (size, 0, 0)
+        
+        changed = []
+        for pkg_name, pkg in self.packages.items():
+            fields = {}
+            if pkg_name in sizes:
+                fields['code_size'], fields['data_size'], fields['cache_size'] = sizes[pkg_name]
+            if not pkg.apk_path and pkg_name in code_paths:
+                fields['apk_path'] = code_paths[pkg_name]
+            if fields and pkg.update(**fields):
+                changed.append(pkg_name)
+        if changed:
+            self.save_packages(changed)
+        return changed
+    
+    def profile_resources(self, cancel: Optional[threading.Event] = None) -> List[str]:
+        """Measure the memory, CPU, wake lock and wakeup cost of all known packages
+        
+        One script captures ``dumpsys meminfo`` (memory of the running
+        processes) and ``dumpsys batterystats --checkin`` (usage since the
+        last full charge). A process counts for the package it is named
+        after; the usage of a uid shared by several packages is split
+        evenly between them. Each measure is scaled by the device's largest
+        value and weighted by IMPACT_WEIGHTS into Package.impact.
+        
+        Args:
+            cancel: Event that aborts the profiling, leaving packages and DB untouched
+        
+        Returns:
+            Names of the packages whose measurements changed
+        
+        Raises:
+            OperationCancelled: If the cancel event is set before the profiling completes
+        """
+        sections = self._capture_sections(
+            self._PROFILE_MARKER,
+            {'meminfo': 'dumpsys meminfo', 'batterystats': 'dumpsys batterystats --checkin'},
+            cancel, "Resource profiling cancelled"
+        )
+        measures = {
+            pkg_name: dict.fromkeys(self.IMPACT_WEIGHTS, 0.0) for pkg_name in self.packages
+        }
+        for process, pss in parse_meminfo(sections['meminfo']).items():
+            pkg_name = process.split(':', 1)[0]
+            if pkg_name in measures:
+                measures[pkg_name]['memory_kb'] += pss
+        
+        # Older devices print no uid table; fall back to the harvested uids
+        owners, usage = parse_batterystats_checkin(sections['batterystats'])
+        listed = set(owners)
+        for pkg_name, pkg in self.packages.items():
+            if pkg.uid and pkg.uid not in listed:
+                owners.setdefault(pkg.uid, []).append(pkg_name)
+        for uid, totals in usage.items():
+            names = [name for name in owners.get(uid, []) if name in measures]
+            for pkg_name in names:
+                for key, value in totals.items():
+                    measures[pkg_name][key] += value / len(names)
+        
+        peaks = {
+            key: max((values[key] for values in measures.values()), default=0.0) or 1.0
+            for key in self.IMPACT_WEIGHTS
+        }
+        changed = []
+        for pkg_name, values in measures.items():
+            impact = 100 * sum(weight * values[key] / peaks[key]
+                               for key, weight in self.IMPACT_WEIGHTS.items())
+            fields = {key: round(value) for key, value in values.items()}
+            if self.packages[pkg_name].update(impact=round(impact, 2), **fields):
+                changed.append(pkg_name)
+        if changed:
+            self.save_packages(changed)
+        return changed
+    
+    def reclaimable_size(self, packages: Optional[Iterable[Package]] = None) -> int:
+        """Total storage removing packages can free
+        
+        Args:
+            packages: Packages to count, defaults to get_removable_packages()
+        
+        Returns:
+            Size in bytes (see Package.reclaimable_size)
+        """
+        if packages is None:
+            packages = self.get_removable_packages()
+        return sum(pkg.reclaimable_size for pkg in packages)
+    
+    def get_installed_packages(self, cancel: Optional[threading.Event] = None) -> List[str]:
         """Get list of all packages from device, including uninstalled and disabled
         
+        Args:
+            cancel: Event that aborts the scan, leaving packages and DB untouched
+        
         Returns:
             List of package names
+        
+        Raises:
+            OperationCancelled: If the cancel event is set before the scan completes
         """
-        # Get packages in each state explicitly
-        enabled = self._execute_adb(['shell', 'pm', 'list', 'packages', '-e'])  # Only enabled packages
-        disabled = self._execute_adb(['shell', 'pm', 'list', 'packages', '-d'])  # Only disabled packages
-        uninstalled = self._execute_adb(['shell', 'pm', 'list', 'packages', '-u'])  # Only uninstalled packages
-        
-        # Helper function to extract package names from adb output
-        def extract_packages(output: str) -> set[str]:
-            return {line.split(':', 1)[1].strip() 
-                   for line in output.splitlines() 
-                   if ':' in line}
-        
-        # Get sets of packages in each state
-        enabled_pkgs = extract_packages(enabled)
-        disabled_pkgs = extract_packages(disabled)
-        uninstalled_pkgs = extract_packages(uninstalled)
-        
-        # Combine all unique packages
-        all_pkgs = enabled_pkgs | disabled_pkgs | uninstalled_pkgs
-        
-        # Process each package
-        for pkg_name in all_pkgs:
-            # Determine state by checking which list it appears in
-            if pkg_name in enabled_pkgs:
-                state = PackageState.INSTALLED
-            elif pkg_name in disabled_pkgs:
-                state = PackageState.DISABLED
-            else:
-                state = PackageState.REMOVED
-            
-            if pkg_name not in self.packages:
-                # Create new package
-                pkg = Package(
-                    name=pkg_name,
-                    description=self._get_package_description(pkg_name),
-                    category=self._classify_category(pkg_name),
-                    safety_status=self._classify_safety(pkg_name),
-                    state=state
-                )
-                self.packages[pkg_name] = pkg
+        return self.rescan(cancel).listed
+    
+    def _run_batch(self, commands: Dict[str, str]) -> Iterator[PackageResult]:
+        """Run one command per package as a single pipelined shell script
+        
+        Args:
+            commands: Mapping of package name to the shell command acting on it
+        
+        Yields:
+            PackageResult for each package as soon as its command finishes
+        """
+        marker = self._BATCH_MARKER
+        script = "; ".join(
+            f'echo "{marker} {name}"; {command} 2>&1; echo "{marker} {name} $?"'
+            for name, command in commands.items()
+        ) + "; true"
+        
+        pending = dict.fromkeys(commands)
+        current: Optional[str] = None
+        lines: List[str] = []
+        try:
+            for line in self._stream_adb(['shell', script]):
+                if not line.startswith(marker + " "):
+                    lines.append(line.rstrip("\n"))
+                    continue
+                fields = line[len(marker) + 1:].split()
+                if len(fields) == 1:
+                    current, lines = fields[0], []
+                elif current is not None and fields[0] == current:
+                    message = "\n".join(lines).strip()
+                    # Older pm versions exit 0 and report failures on stdout
+                    success = fields[1] == "0" and not message.startswith("Failure")
+                    pending.pop(current, None)
+                    yield PackageResult(current, success, message)
+                    current = None
+        except ADB_ERRORS:
+            # Retries are exhausted; report what is left as failed instead
+            # of aborting the whole operation
+            pass
+        
+        for name in pending:
+            yield PackageResult(name, False, "No result from device")
+    
+    def _apply_batch(self, package_names: List[str], commands: Dict[str, str],
+                     rejected: Dict[str, PackageResult], new_state: PackageState,
+                     progress: Optional[BatchProgress],
+                     cancel: Optional[threading.Event],
+                     batches: Optional[List[List[str]]] = None,
+                     requires: Optional[Dict[str, Set[str]]] = None) -> BatchResult:
+        """Run batch commands in chunks and record the new state of successes
+        
+        Commands are sent ``BATCH_CHUNK_SIZE`` packages at a time so that a
+        cancel request stops the remaining chunks. Chunks never span two
+        dependency batches, so a package is only sent once everything it
+        requires has succeeded. All successful packages are written to the
+        DB once at the end, even when cancelled.
+        
+        Args:
+            package_names: Requested package names, in report order
+            commands: Shell command per package that passed validation
+            rejected: Results for packages that failed validation
+            new_state: State to record for packages whose command succeeded
+            progress: Optional callback invoked after each package
+            cancel: Optional event that stops the batch when set
+            batches: Ordered groups of command names, defaults to one group
+            requires: Packages (in earlier batches) that must succeed first
+        
+        Returns:
+            BatchResult with one entry per requested package, in order
+        """
+        results: Dict[str, PackageResult] = {}
+        total = len(set(package_names))
+        
+        def report(result: PackageResult) -> None:
+            results[result.name] = result
+            if progress:
+                progress(result, len(results), total)
+        
+        for result in rejected.values():
+            report(result)
+        
+        names = list(commands)
+        chunks = [
+            batch[start:start + self.BATCH_CHUNK_SIZE]
+            for batch in (batches or [names])
+            for start in range(0, len(batch), self.BATCH_CHUNK_SIZE)
+        ]
+        try:
+            for chunk_names in chunks:
+                if cancel is not None and cancel.is_set():
+                    break
+                chunk = {}
+                for name in chunk_names:
+                    missing = sorted(
+                        other for other in (requires or {}).get(name, ())
+                        if not (other in results and results[other].success)
+                    )
+                    if missing:
+                        report(PackageResult(name, False, f"Skipped, not done: {', '.join(missing)}"))
+                    else:
+                        chunk[name] = commands[name]
+                if not chunk:
+                    continue
+                for result in self._run_batch(chunk):
+                    if result.success:
+                        self.packages[result.name].state = new_state
+                    report(result)
+        finally:
+            changed = [name for name, result in results.items() if result.success]
+            if changed:
+                self.save_packages(changed)
+        
+        for name in names:
+            if name not in results:
+                report(PackageResult(name, False, "Cancelled", cancelled=True))
+        return BatchResult([results[name] for name in package_names])
+    
+    def plan_removal(self, package_names: List[str], expand: bool = False) -> RemovalPlan:
+        """Check a removal set against the dependency graph and order it
+        
+        A package's closure is everything still on the device that depends on
+        it, directly or indirectly. Without ``expand`` a requested package is
+        blocked when its closure reaches beyond the requested set; with it the
+        closure is added to the plan, unless it contains an essential package.
+        Blocking a package also blocks everything whose closure contains it.
+        
+        Args:
+            package_names: Names of packages to remove
+            expand: Pull dependents into the plan instead of blocking
+        
+        Returns:
+            RemovalPlan whose batches list dependents before their dependencies
+        """
+        return plan_removal(self.packages, self.graph, package_names, expand)
+    
+    def remove_packages(self, package_names: List[str],
+                        progress: Optional[BatchProgress] = None,
+                        cancel: Optional[threading.Event] = None,
+                        expand: bool = False) -> BatchResult:
+        """Remove several packages with pipelined device commands and one DB write
+        
+        Packages are removed in dependency order (see plan_removal): a package
+        is only removed once every package in the plan depending on it is gone.
+        
+        Args:
+            package_names: Names of packages to remove
+            progress: Optional callback invoked after each package
+            cancel: Optional event that stops the remaining packages when set
+            expand: Also remove dependents instead of refusing to remove
+        
+        Returns:
+            BatchResult with one entry per requested package (followed by any
+            added dependents), in order
+        """
+        plan = self.plan_removal(package_names, expand)
+        rejected: Dict[str, PackageResult] = {}
+        for name, reason in plan.blocked.items():
+            print(f"Cannot remove {name}: {reason}")
+            rejected[name] = PackageResult(name, False, reason)
+        
+        position = {name: number for number, batch in enumerate(plan.batches) for name in batch}
+        commands = {name: f"pm uninstall -k --user 0 {name}" for name in plan.packages}
+        requires = {
+            name: {other for other in self.graph.dependents(name)
+                   if position.get(other, number) < number}
+            for name, number in position.items()
+        }
+        return self._apply_batch(plan.requested + plan.added, commands, rejected,
+                                 PackageState.REMOVED, progress, cancel,
+                                 plan.batches, requires)
+    
+    def restore_packages(self, package_names: List[str],
+                         progress: Optional[BatchProgress] = None,
+                         cancel: Optional[threading.Event] = None) -> BatchResult:
+        """Restore several removed packages with pipelined device commands and one DB write
+        
+        Args:
+            package_names: Names of packages to restore
+            progress: Optional callback invoked after each package
+            cancel: Optional event that stops the remaining packages when set
+        
+        Returns:
+            BatchResult with one entry per requested package, in order
+        """
+        rejected: Dict[str, PackageResult] = {}
+        commands: Dict[str, str] = {}
+        for name in package_names:
+            if name not in self.packages:
+                print(f"Unknown package: {name}")
+                rejected[name] = PackageResult(name, False, "Unknown package")
             else:
-                # Update existing package
-                pkg = self.packages[pkg_name]
-                pkg.description = self._get_package_description(pkg_name)
-                pkg.category = self._classify_category(pkg_name)
-                pkg.safety_status = self._classify_safety(pkg_name)
-                pkg.state = state
-                
-        # Save changes to database
-        self.save_package_db()
-        return list(all_pkgs)
-
+                commands[name] = f"cmd package install-existing {name}"
+        
+        # Dependencies come back before the packages that need them
+        batches = self.graph.batches(commands, dependents_first=False)
+        return self._apply_batch(package_names, commands, rejected,
+                                 PackageState.INSTALLED, progress, cancel, batches)
+    
     def remove_package(self, package_name: str) -> bool:
         """Remove a package from the device
         
@@ -329,28 +1130,7 @@ class PackageManager:
         Returns:
             True if removal successful, False otherwise
         """
-        if package_name not in self.packages:
-            print(f"Unknown package: {package_name}")
-            return False
-            
-        pkg = self.packages[package_name]
-        
-        # Safety checks
-        if pkg.safety_status == SafetyStatus.ESSENTIAL:
-            print(f"Cannot remove essential package: {package_name}")
-            return False
-            
-        if pkg.dependents:
-            print(f"Package has dependents: {pkg.dependents}")
-            return False
-            
-        try:
-            self._execute_adb(['shell', 'pm', 'uninstall', '-k', '--user', '0', package_name])
-            pkg.state = PackageState.REMOVED
-            self.save_package_db()
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return self.remove_packages([package_name]).results[0].success
 
     def restore_package(self, package_name: str) -> bool:
         """Restore a previously removed package
@@ -361,30 +1141,27 @@ class PackageManager:
         Returns:
             True if restore successful, False otherwise
         """
-        if package_name not in self.packages:
-            print(f"Unknown package: {package_name}")
-            return False
-            
-        try:
-            self._execute_adb(['shell', 'cmd', 'package', 'install-existing', package_name])
-            self.packages[package_name].state = PackageState.INSTALLED
-            self.save_package_db()
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return self.restore_packages([package_name]).results[0].success
 
-    def get_removable_packages(self) -> List[Package]:
+    def get_removable_packages(self, by_impact: bool = False) -> List[Package]:
         """Get list of packages that are safe to remove
         
+        Args:
+            by_impact: Order by measured resource impact, highest first (see
+                profile_resources), instead of the package order
+        
         Returns:
             List of Package objects
         """
-        return [
+        packages = [
             pkg for pkg in self.packages.values()
             if pkg.safety_status == SafetyStatus.SAFE_TO_REMOVE
             and pkg.state == PackageState.INSTALLED
-            and not pkg.dependents
+            and not any(self._is_present(dependent) for dependent in pkg.dependents)
         ]
+        if by_impact:
+            packages.sort(key=lambda pkg: (-pkg.impact, pkg.name))
+        return packages
 
     def get_removed_packages(self) -> List[Package]:
         """Get list of packages that have been removed
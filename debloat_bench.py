@@ -0,0 +1,289 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import argparse
+import contextlib
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from debloat_base import PackageManager
+from debloat_fake_adb import FakeDevice, fake_adb_server
+from debloat_metrics import AdbMetrics
+from debloat_model import PackageState
+from debloat_references import ReferenceIndex
+
+# Version of the baseline file layout
+BASELINE_FORMAT = 1
+
+DEFAULT_SIZES = (700, 5000, 50000)
+
+# Vendor prefixes and name parts of generated packages, so classification
+# sees the same mix of Samsung, Google, carrier and third-party names as on a phone
+_PREFIXES = [
+    'com.samsung.android', 'com.sec.android.app', 'com.google.android', 'com.android',
+    'com.att', 'com.vzw', 'com.tmobile', 'com.facebook', 'com.microsoft', 'com.example',
+]
+_WORDS = [
+    'bixby', 'knox', 'gallery', 'mail', 'music', 'wallet', 'health', 'weather', 'store',
+    'backup', 'sync', 'agent', 'service', 'provider', 'launcher', 'messaging', 'dialer',
+    'camera', 'keyboard', 'game', 'smartthings', 'ar', 'emoji', 'print', 'news',
+]
+_STATES = ['enabled'] * 7 + ['disabled', 'uninstalled', 'uninstalled']
+
+
+def synthetic_packages(count: int, seed: int = 0) -> Dict[str, str]:
+    """Generate a reproducible device package list
+    
+    Args:
+        count: Number of packages
+        seed: Random seed
+    
+    Returns:
+        Mapping of package name to state, as FakeDevice expects
+    """
+    rng = random.Random(seed)
+    packages: Dict[str, str] = {}
+    while len(packages) < count:
+        name = f"{rng.choice(_PREFIXES)}.{rng.choice(_WORDS)}{len(packages)}"
+        packages[name] = rng.choice(_STATES)
+    return packages
+
+
+def _summarize(runs: List[float], errors: int, items: int) -> Dict[str, Any]:
+    """Statistics of one benchmark's timed runs"""
+    if not runs:
+        return {'runs': [], 'errors': errors, 'items': items}
+    median = statistics.median(runs)
+    return {
+        'runs': [round(run, 6) for run in runs],
+        'min': round(min(runs), 6),
+        'median': round(median, 6),
+        'max': round(max(runs), 6),
+        'per_item': round(median / items, 9) if items else None,
+        'errors': errors,
+        'items': items,
+    }
+
+
+def _measure(work: Callable[[], Any], repeat: int, items: int,
+             setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time work() repeat times after an untimed setup()
+    
+    Runs whose setup or work raises an exception count as errors.
+    """
+    runs: List[float] = []
+    errors = 0
+    for _ in range(repeat):
+        try:
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            work()
+        except Exception:
+            errors += 1
+            continue
+        runs.append(time.perf_counter() - started)
+    return _summarize(runs, errors, items)
+
+
+def _filter_benchmark(manager: PackageManager, repeat: int) -> Optional[Dict[str, Any]]:
+    """Time the package list filtering the GUI runs, or None without tkinter"""
+    try:
+        from debloat_gui import PackageListModel
+    except ImportError:
+        return None
+    model = PackageListModel(manager.packages)
+    queries = ['samsung', 'google bixby', 'service', 'com.att', 'zzz']
+    
+    def work() -> None:
+        manager._search_index = None  # Include building the index
+        index = manager.search_index
+        for query in queries:
+            matches = {pkg.name for pkg in manager.filter_packages(state=PackageState.INSTALLED)}
+            matches.intersection_update(index.search(query))
+            model.set_filter(matches)
+        for column in model.COLUMNS:
+            model.sort(column)
+    
+    model.invalidate()
+    return _measure(work, repeat, len(manager.packages))
+
+
+def bench_size(size: int, latency: float = 0.0, failure_rate: float = 0.0,
+               removals: int = 50, repeat: int = 3, seed: int = 0,
+               references: Optional[ReferenceIndex] = None) -> Dict[str, Any]:
+    """Run every benchmark against one simulated device
+    
+    Args:
+        size: Number of packages on the device
+        latency: Seconds added to every adb request
+        failure_rate: Share of adb requests failing as "device offline"
+        removals: Packages removed (and restored) one at a time per run
+        repeat: Timed runs per benchmark
+        seed: Random seed for the package list and failures
+        references: Reference index to classify with
+    
+    Returns:
+        Benchmark name -> timing statistics (seconds)
+    """
+    device = FakeDevice(f"BENCH{size}", synthetic_packages(size, seed),
+                        latency=latency, failure_rate=failure_rate, seed=seed)
+    metrics = AdbMetrics()
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as workdir, fake_adb_server([device]):
+        db_path = Path(workdir) / "bench.sqlite3"
+        
+        def open_manager() -> PackageManager:
+            return PackageManager(db_path=db_path, transport='server', serial=device.serial,
+                                  references=references, metrics=metrics)
+        
+        manager = open_manager()
+        try:
+            def cold_setup() -> None:
+                manager.packages.clear()
+                manager.store.save_all([])
+            
+            results['scan_cold'] = _measure(manager.get_installed_packages, repeat, size, cold_setup)
+            results['scan_warm'] = _measure(manager.get_installed_packages, repeat, size)
+            
+            names = sorted(manager.packages)
+            results['classify'] = _measure(
+                lambda: manager.classifier.classify_batch(names), repeat, size,
+                manager.classifier.clear_cache
+            )
+            results['save_db'] = _measure(manager.save_package_db, repeat, size)
+            results['load_db'] = _measure(manager._load_package_db, repeat, size, manager.packages.clear)
+            
+            candidates = [
+                name for name in names
+                if manager.packages[name].state == PackageState.INSTALLED
+            ][:removals]
+            
+            def remove_loop() -> None:
+                for name in candidates:
+                    manager.remove_package(name)
+            
+            def restore_loop() -> None:
+                # Best effort: with injected failures some restores fail
+                for name in candidates:
+                    with contextlib.suppress(Exception):
+                        manager.restore_package(name)
+            
+            results['remove_loop'] = _measure(remove_loop, repeat, len(candidates), restore_loop)
+            restore_loop()
+            
+            gui_filter = _filter_benchmark(manager, repeat)
+            if gui_filter is not None:
+                results['gui_filter'] = gui_filter
+        finally:
+            manager.close()
+        
+        # Opening a manager loads the stored packages
+        results['open_manager'] = _measure(lambda: open_manager().close(), repeat, size)
+    
+    results['adb_commands'] = sum(count for count, _ in metrics.mark().values())
+    return results
+
+
+def run_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, **options: Any) -> Dict[str, Any]:
+    """Run the benchmark suite for several device sizes
+    
+    Args:
+        sizes: Package counts to simulate
+        options: Passed on to bench_size()
+    
+    Returns:
+        Baseline document (see compare_baselines)
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        references = ReferenceIndex(index_path=Path(workdir) / "references.sqlite3")
+        references.compile()
+        try:
+            results = {
+                str(size): bench_size(size, references=references, **options)
+                for size in sizes
+            }
+        finally:
+            references.close()
+    return {
+        'format': BASELINE_FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': dict(options, sizes=list(sizes)),
+        'results': results,
+    }
+
+
+def compare_baselines(baseline: Dict[str, Any], current: Dict[str, Any],
+                      tolerance: float = 0.25) -> List[str]:
+    """Find benchmarks whose median time grew beyond a tolerance
+    
+    Args:
+        baseline: Earlier run_benchmarks() document
+        current: New run_benchmarks() document
+        tolerance: Allowed slowdown, e.g. 0.25 for 25%
+    
+    Returns:
+        One description per regression
+    """
+    regressions = []
+    for size, benchmarks in current['results'].items():
+        for name, stats in benchmarks.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not isinstance(stats, dict) or not isinstance(before, dict):
+                continue
+            if 'median' not in stats or 'median' not in before:
+                continue
+            if stats['median'] > before['median'] * (1 + tolerance):
+                regressions.append(
+                    f"{name}[{size}]: {before['median']:.4f}s -> {stats['median']:.4f}s "
+                    f"(+{stats['median'] / before['median'] - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the exit status"""
+    parser = argparse.ArgumentParser(description="Benchmark against a simulated adb device")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="package counts to simulate")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds per adb request")
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help="share of adb requests failing as offline")
+    parser.add_argument('--removals', type=int, default=50, help="packages in the remove loop")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=Path("bench_baseline.json"),
+                        help="file to write the results to")
+    parser.add_argument('--compare', type=Path, help="baseline to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+    
+    document = run_benchmarks(
+        args.sizes, latency=args.latency, failure_rate=args.failure_rate,
+        removals=args.removals, repeat=args.repeat, seed=args.seed
+    )
+    args.output.write_text(json.dumps(document, indent=2), encoding='utf-8')
+    for size, benchmarks in document['results'].items():
+        for name, stats in benchmarks.items():
+            if isinstance(stats, dict) and 'median' in stats:
+                print(f"{size:>6} {name:<13} {stats['median'] * 1000:10.2f} ms"
+                      f"  ({stats['errors']} errors)")
+    print(f"Results written to {args.output}")
+    
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        regressions = compare_baselines(baseline, document, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
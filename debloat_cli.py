@@ -0,0 +1,507 @@
+"""Headless command line interface emitting JSON Lines
+
+Usage: ``python -m debloat_cli [--db PATH] [--serial SERIAL] COMMAND ...``
+
+Every command writes one JSON object per line to stdout, each with an
+``event`` key. Modules are imported by the command that needs them, so
+offline commands (list, diff, remove --dry-run, profile without --apply)
+never load the device code and nothing imports tkinter.
+
+With ``--fleet``, scan, remove, restore and profile act on every attached
+device, each with its own database next to ``--db``. Their records carry a
+``serial`` field, ``progress`` records follow each device, and scan, remove
+and restore finish with one ``row`` record per package giving its state on
+every device.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import contextlib
+import json
+import sys
+import threading
+from pathlib import Path
+from debloat_model import PackageCategory, PackageState, SafetyStatus
+
+# Records go to the real stdout; anything else the commands print
+# (e.g. adb error messages) is redirected to stderr by main()
+_records = sys.stdout
+
+# Fleet progress is reported from worker threads
+_records_lock = threading.Lock()
+
+
+def emit(event: str, **fields: Any) -> None:
+    """Write one JSON Lines record"""
+    fields = {'event': event, **fields}
+    with _records_lock:
+        _records.write(json.dumps(fields, separators=(',', ':')) + "\n")
+        _records.flush()
+
+
+def _read_names(names: List[str]) -> List[str]:
+    """Package names from the arguments; ``-`` reads more from stdin (one per line)"""
+    result = []
+    for name in names:
+        if name == '-':
+            result.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            result.append(name)
+    return result
+
+
+def _open_manager(args: argparse.Namespace):
+    from debloat_base import PackageManager
+    return PackageManager(db_path=args.db, transport=args.transport, serial=args.serial)
+
+
+def _open_fleet(args: argparse.Namespace, scanned: bool = False) -> Tuple[Any, int]:
+    """Open a FleetManager over the attached devices
+    
+    Args:
+        args: Parsed arguments; the device databases live next to ``--db``
+        scanned: Only take devices that already have a database, emitting an
+            error for the others (removals need a scan to plan against)
+    
+    Returns:
+        The FleetManager and the exit status so far (1 if a device was left out)
+    """
+    from debloat_fleet import FleetManager
+    fleet = FleetManager(serials=[], db_dir=args.db.parent, transport=args.transport)
+    status = 0
+    try:
+        for serial in fleet.attached_devices():
+            path = fleet.db_path_for(serial)
+            if scanned and not path.exists():
+                emit('error', serial=serial,
+                     message=f"Package database not found: {path} (run scan --fleet first)")
+                status = 1
+            else:
+                fleet.add_device(serial)
+    except Exception:
+        fleet.close()
+        raise
+    return fleet, status
+
+
+def _fleet_snapshots(args: argparse.Namespace) -> Dict[str, Path]:
+    """Per-device databases next to ``--db``, by serial (no device access)
+    
+    Raises:
+        FileNotFoundError: If there are none
+    """
+    from debloat_store import device_databases
+    snapshots = device_databases(args.db.parent)
+    if not snapshots:
+        raise FileNotFoundError(f"No device package databases in {args.db.parent} "
+                                "(run scan --fleet first)")
+    return snapshots
+
+
+def _emit_progress(serial: str, status: str, completed: int, total: int) -> None:
+    """Fleet progress callback"""
+    emit('progress', serial=serial, status=status, completed=completed, total=total)
+
+
+def _emit_fleet(fleet: Any, results: Dict[str, Any], emit_value: Callable[[str, Any], int],
+                package_names: Optional[Iterable[str]] = None, status: int = 0) -> int:
+    """Emit each device's outcome, then the merged package table
+    
+    Args:
+        fleet: FleetManager the results came from
+        results: Mapping of serial to DeviceResult
+        emit_value: Emits a successful device's value; returns its exit status
+        package_names: Table rows to emit, or None for every package
+        status: Exit status so far
+    
+    Returns:
+        The exit status (1 if any device failed)
+    """
+    for serial, device in sorted(results.items()):
+        if not device.success:
+            emit('error', serial=serial, message=device.error)
+            status = 1
+        elif emit_value(serial, device.value):
+            status = 1
+    for row in fleet.merged_table(package_names):
+        emit('row', name=row.pop('name'), category=row.pop('category'),
+             safety_status=row.pop('safety_status'), states=row)
+    return status
+
+
+def _emit_results(results: Iterable[Any], **fields: Any) -> int:
+    """Emit PackageResults with any extra fields; returns the exit status (1 if any failed)"""
+    status = 0
+    for result in results:
+        emit('result', name=result.name, success=result.success,
+             message=result.message, cancelled=result.cancelled, **fields)
+        if not result.success:
+            status = 1
+    return status
+
+
+def _emit_diff(manager: Any, diff: Any, **device: Any) -> None:
+    """Emit the added, removed and changed events of a ScanDiff"""
+    for name in sorted(diff.added):
+        emit('added', name=name, state=manager.packages[name].state.name, **device)
+    for name in sorted(diff.removed):
+        emit('removed', name=name, **device)
+    for name, (old, new) in sorted(diff.changed.items()):
+        emit('changed', name=name, old_state=old.name, state=new.name, **device)
+
+
+def _scan_extras(manager: Any, args: argparse.Namespace) -> List[Tuple[str, Dict[str, Any]]]:
+    """Run the optional scan phases; returns their records as (event, fields)"""
+    records: List[Tuple[str, Dict[str, Any]]] = []
+    if args.details:
+        records.append(('details', {'changed': manager.harvest_metadata()}))
+    if args.sizes:
+        records.append(('sizes', {'changed': manager.collect_sizes(),
+                                  'reclaimable_bytes': manager.reclaimable_size()}))
+    if args.profile:
+        records.append(('profile', {'changed': manager.profile_resources()}))
+    return records
+
+
+def _emit_scan(manager: Any, diff: Any, extras: List[Tuple[str, Dict[str, Any]]],
+               **device: Any) -> None:
+    """Emit a scan's changes, its optional phases and its summary"""
+    _emit_diff(manager, diff, **device)
+    for event, fields in extras:
+        emit(event, **fields, **device)
+    emit('summary', listed=len(diff.listed), added=len(diff.added),
+         removed=len(diff.removed), changed=len(diff.changed), **device)
+
+
+def cmd_scan(args: argparse.Namespace) -> int:
+    """Rescan the device, update the database and emit the changes"""
+    if args.fleet:
+        return _scan_fleet(args)
+    with _open_manager(args) as manager:
+        diff = manager.rescan()
+        _emit_scan(manager, diff, _scan_extras(manager, args))
+    return 0
+
+
+def _scan_fleet(args: argparse.Namespace) -> int:
+    """Rescan every attached device in parallel, filling the per-device databases"""
+    fleet, status = _open_fleet(args)
+    with fleet:
+        scans = fleet.scan(_emit_progress)
+        extras: Dict[str, Any] = {}
+        if args.details or args.sizes or args.profile:
+            extras = fleet.run(lambda manager: _scan_extras(manager, args), _emit_progress)
+        
+        def scanned(serial: str, diff: Any) -> int:
+            extra = extras.get(serial)
+            if extra is not None and not extra.success:
+                emit('error', serial=serial, message=extra.error)
+            _emit_scan(fleet.managers[serial], diff,
+                       extra.value if extra is not None and extra.success else [],
+                       serial=serial)
+            return 0 if extra is None or extra.success else 1
+        
+        return _emit_fleet(fleet, scans, scanned, status=status)
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    """Follow package changes on the device until interrupted"""
+    import threading
+    from debloat_watch import PackageWatcher, WatchEvent
+    
+    def changed(event: WatchEvent) -> None:
+        _emit_diff(manager, event.diff)
+        for name in event.reinstalled:
+            emit('reinstalled', name=name)
+        if event.reapplied is not None:
+            _emit_results(event.reapplied.results)
+    
+    def failed(error: Exception) -> None:
+        emit('error', message=str(error), type=type(error).__name__)
+    
+    with _open_manager(args) as manager:
+        watcher = PackageWatcher(manager, interval=args.interval, enforce=args.enforce,
+                                 on_change=changed, on_error=failed)
+        try:
+            watcher.run(threading.Event())
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def _stored_packages(args: argparse.Namespace) -> Iterator[Any]:
+    """Stored packages matching the list filters, by name or by search rank"""
+    from debloat_store import open_store
+    store = open_store(args.db, create=False)
+    try:
+        packages = store.load()
+        names = store.query(
+            category=PackageCategory[args.category] if args.category else None,
+            safety_status=SafetyStatus[args.safety] if args.safety else None,
+            state=PackageState[args.state] if args.state else None
+        )
+    finally:
+        store.close()
+    if args.search:
+        from debloat_references import ReferenceIndex
+        from debloat_search import SearchIndex
+        references = ReferenceIndex()
+        index = SearchIndex()
+        try:
+            for name in names:
+                index.add(name, packages[name].description,
+                          references.get(name, {}).get('name', ''))
+        finally:
+            references.close()
+        names = index.search(args.search)
+    else:
+        names = sorted(names)
+    for name in names:
+        yield packages[name]
+
+
+def cmd_list(args: argparse.Namespace) -> int:
+    """Emit stored packages, optionally filtered (no device access)"""
+    from debloat_store import package_to_dict
+    if args.removable:
+        # Checked here as opening the manager would create a missing database
+        if not args.db.exists():
+            raise FileNotFoundError(f"Package database not found: {args.db}")
+        with _open_manager(args) as manager:
+            if args.by_impact:
+                packages: Iterable[Any] = manager.get_removable_packages(by_impact=True)
+            else:
+                packages = sorted(manager.get_removable_packages(), key=lambda pkg: pkg.name)
+    elif args.by_impact:
+        packages = sorted(_stored_packages(args), key=lambda pkg: (-pkg.impact, pkg.name))
+    else:
+        packages = _stored_packages(args)
+    for pkg in packages:
+        emit('package', **package_to_dict(pkg))
+    return 0
+
+
+def _plan_snapshot(path: Path, names: List[str], expand: bool, **device: Any) -> int:
+    """Emit the removal plan for a stored database (no device access)
+    
+    Returns:
+        The exit status (1 if a package is blocked)
+    
+    Raises:
+        FileNotFoundError: If the database does not exist
+    """
+    from debloat_graph import DependencyGraph, plan_removal
+    from debloat_store import open_store
+    store = open_store(path, create=False)
+    try:
+        packages = store.load()
+    finally:
+        store.close()
+    plan = plan_removal(packages, DependencyGraph.from_packages(packages), names, expand)
+    for name, reason in sorted(plan.blocked.items()):
+        emit('blocked', name=name, reason=reason, **device)
+    emit('plan', batches=plan.batches, added=plan.added, **device)
+    return 1 if plan.blocked else 0
+
+
+def cmd_remove(args: argparse.Namespace) -> int:
+    """Remove packages in dependency order, or only emit the plan"""
+    names = _read_names(args.names)
+    if args.fleet:
+        return _remove_fleet(args, names)
+    if args.dry_run:
+        return _plan_snapshot(args.db, names, args.expand)
+    with _open_manager(args) as manager:
+        result = manager.remove_packages(names, expand=args.expand)
+        return _emit_results(result.results)
+
+
+def _remove_fleet(args: argparse.Namespace, names: List[str]) -> int:
+    """Remove packages on every scanned device, or plan it from the stored snapshots"""
+    if args.dry_run:
+        status = 0
+        for serial, path in _fleet_snapshots(args).items():
+            status |= _plan_snapshot(path, names, args.expand, serial=serial)
+        return status
+    fleet, status = _open_fleet(args, scanned=True)
+    with fleet:
+        results = fleet.remove(names, _emit_progress, expand=args.expand)
+        return _emit_fleet(fleet, results,
+                           lambda serial, result: _emit_results(result.results, serial=serial),
+                           names, status)
+
+
+def cmd_restore(args: argparse.Namespace) -> int:
+    """Restore removed packages"""
+    names = _read_names(args.names)
+    if args.fleet:
+        fleet, status = _open_fleet(args, scanned=True)
+        with fleet:
+            results = fleet.restore(names, _emit_progress)
+            return _emit_fleet(fleet, results,
+                               lambda serial, result: _emit_results(result.results, serial=serial),
+                               names, status)
+    with _open_manager(args) as manager:
+        result = manager.restore_packages(names)
+        return _emit_results(result.results)
+
+
+def _emit_profile_plan(plan: Any, **device: Any) -> None:
+    """Emit the blocked, plan and risk events of a ProfilePlan"""
+    for name, reason in sorted(plan.removal.blocked.items()):
+        emit('blocked', name=name, reason=reason, **device)
+    emit('plan', profile=plan.profile, batches=plan.removal.batches, added=plan.removal.added,
+         already_removed=plan.already_removed, missing=plan.missing, counts=plan.counts,
+         **device)
+    emit('risk', by_category=plan.by_category, by_safety=plan.by_safety,
+         caution=plan.caution, unknown=plan.unknown,
+         reclaimable_bytes=plan.reclaimable_size, impact=round(plan.impact, 1), **device)
+
+
+def cmd_profile(args: argparse.Namespace) -> int:
+    """Plan a profile against the stored snapshot, or apply it to the device or fleet"""
+    from debloat_profiles import (
+        apply_plan, compile_profile, compile_snapshot, find_profile, load_profile
+    )
+    profile = load_profile(find_profile(args.profile))
+    if args.fleet and not args.apply:
+        plans = {serial: compile_snapshot(profile, path)
+                 for serial, path in _fleet_snapshots(args).items()}
+        for serial, plan in plans.items():
+            _emit_profile_plan(plan, serial=serial)
+        return 1 if any(plan.removal.blocked for plan in plans.values()) else 0
+    if args.fleet:
+        fleet, status = _open_fleet(args, scanned=True)
+        with fleet:
+            for serial, plan in sorted(fleet.plan_profile(profile).items()):
+                _emit_profile_plan(plan, serial=serial)
+            results = fleet.apply_profile(profile, _emit_progress)
+            return _emit_fleet(fleet, results,
+                               lambda serial, result: _emit_results(result.results, serial=serial),
+                               [result.name for device in results.values() if device.success
+                                for result in device.value.results],
+                               status)
+    if not args.apply:
+        plan = compile_snapshot(profile, args.db)
+        _emit_profile_plan(plan)
+        return 1 if plan.removal.blocked else 0
+    # An empty database would make an empty plan; refuse it like planning does
+    if not args.db.exists():
+        raise FileNotFoundError(f"Package database not found: {args.db}")
+    with _open_manager(args) as manager:
+        plan = compile_profile(profile, manager.packages, manager.graph)
+        _emit_profile_plan(plan)
+        return _emit_results(apply_plan(manager, plan).results)
+
+
+def cmd_diff(args: argparse.Namespace) -> int:
+    """Compare two package databases (no device access)"""
+    from debloat_store import open_store, package_to_dict
+    snapshots: List[Dict[str, Dict[str, Any]]] = []
+    for path in (args.old, args.new):
+        store = open_store(path, create=False)
+        try:
+            snapshots.append({name: package_to_dict(pkg) for name, pkg in store.load().items()})
+        finally:
+            store.close()
+    old, new = snapshots
+    for name in sorted(old.keys() | new.keys()):
+        if name not in new:
+            emit('removed', name=name)
+        elif name not in old:
+            emit('added', name=name, state=new[name]['state'])
+        else:
+            changes = {
+                field: [value, new[name][field]] for field, value in old[name].items()
+                if new[name][field] != value
+            }
+            if changes:
+                emit('changed', name=name, changes=changes)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser with one subcommand per operation"""
+    parser = argparse.ArgumentParser(prog="python -m debloat_cli",
+                                     description="Android debloat tool, headless")
+    parser.add_argument('--db', type=Path, default=Path("package_db.sqlite3"),
+                        help="package database (SQLite, or JSON for a .json path)")
+    parser.add_argument('--serial', help="device serial, defaults to adb's only device")
+    parser.add_argument('--transport', choices=('session', 'subprocess', 'server'),
+                        default='session', help="how shell commands reach the device")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    scan = commands.add_parser('scan', help="rescan the device and emit the changes")
+    scan.add_argument('--details', action='store_true', help="also harvest package metadata")
+    scan.add_argument('--sizes', action='store_true', help="also collect package storage sizes")
+    scan.add_argument('--profile', action='store_true',
+                      help="also measure package memory, CPU and wakeup cost")
+    scan.add_argument('--fleet', action='store_true',
+                      help="every attached device, each with its own database next to --db")
+    scan.set_defaults(handler=cmd_scan)
+    
+    watch = commands.add_parser('watch', help="follow package changes until interrupted")
+    watch.add_argument('--interval', type=float, default=2.0, help="seconds between polls")
+    watch.add_argument('--enforce', action='store_true',
+                       help="remove packages again when a removed package reappears")
+    watch.set_defaults(handler=cmd_watch)
+    
+    listing = commands.add_parser('list', help="emit stored packages")
+    listing.add_argument('--category', type=str.upper,
+                         choices=[member.name for member in PackageCategory])
+    listing.add_argument('--safety', type=str.upper,
+                         choices=[member.name for member in SafetyStatus])
+    listing.add_argument('--state', type=str.upper,
+                         choices=[member.name for member in PackageState])
+    listing.add_argument('--search', help="search text, best matches first")
+    listing.add_argument('--removable', action='store_true',
+                         help="installed packages that are safe to remove")
+    listing.add_argument('--by-impact', action='store_true',
+                         help="costliest packages first (see scan --profile)")
+    listing.set_defaults(handler=cmd_list)
+    
+    remove = commands.add_parser('remove', help="remove packages")
+    remove.add_argument('names', nargs='+', help="package names, - reads them from stdin")
+    remove.add_argument('--expand', action='store_true', help="also remove dependent packages")
+    remove.add_argument('--dry-run', action='store_true',
+                        help="only emit the removal plan (from --db, no device access)")
+    remove.add_argument('--fleet', action='store_true',
+                        help="every attached device with a database next to --db "
+                             "(see scan --fleet)")
+    remove.set_defaults(handler=cmd_remove)
+    
+    restore = commands.add_parser('restore', help="restore removed packages")
+    restore.add_argument('names', nargs='+', help="package names, - reads them from stdin")
+    restore.add_argument('--fleet', action='store_true',
+                         help="every attached device with a database next to --db "
+                              "(see scan --fleet)")
+    restore.set_defaults(handler=cmd_restore)
+    
+    profile = commands.add_parser('profile', help="plan or apply a debloat profile")
+    profile.add_argument('profile', help="profile file, or the name of one in profiles/")
+    profile.add_argument('--apply', action='store_true',
+                         help="remove the planned packages (default: only emit the plan)")
+    profile.add_argument('--fleet', action='store_true',
+                         help="every device with a database next to --db (see scan --fleet); "
+                              "only --apply needs the devices attached")
+    profile.set_defaults(handler=cmd_profile)
+    
+    diff = commands.add_parser('diff', help="compare two package databases")
+    diff.add_argument('old', type=Path)
+    diff.add_argument('new', type=Path)
+    diff.set_defaults(handler=cmd_diff)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the exit status"""
+    args = build_parser().parse_args(argv)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.handler(args)
+    except Exception as e:
+        emit('error', message=str(e), type=type(e).__name__)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import re
+
+# Package header inside the "Packages:" section, e.g. "  Package [com.android.chrome] (5c2a1f0):"
+_PACKAGE_HEADER = re.compile(r'^\s+Package \[([^\]]+)\]')
+
+# Single-line fields, mapped to the Package attribute they fill
+_FIELDS = [
+    (re.compile(r'^(?:userId|appId)=(\d+)'), 'uid', int),
+    (re.compile(r'^sharedUser=SharedUserSetting\{\S+ ([^/}]+)'), 'shared_user_id', str),
+    (re.compile(r'^codePath=(.+)'), 'apk_path', str),
+    (re.compile(r'^versionCode=(\d+)'), 'version_code', int),
+    (re.compile(r'^versionName=(.*)'), 'version_name', str),
+    (re.compile(r'^installerPackageName=(.+)'), 'installer', str),
+    (re.compile(r'^firstInstallTime=(.+)'), 'first_install_time', str),
+]
+
+# List headers, mapped to the field collecting their indented entries
+_LISTS = {
+    'usesLibraries:': 'libraries',
+    'usesOptionalLibraries:': 'libraries',
+    'usesStaticLibraries:': 'libraries',
+    'declared permissions:': 'declared_permissions',
+    'requested permissions:': 'requested_permissions',
+}
+
+# Entry of ``cmd overlay list``: "[x] overlay", "[ ] overlay" or "--- overlay"
+_OVERLAY_ENTRY = re.compile(r'^(?:\[[ x]\]|---)\s+(\S+)')
+
+# Lines of ``dumpsys package changes``
+_SEQUENCE = re.compile(r'^Sequence number=(\d+)')
+_CHANGES_USER = re.compile(r'^User (\d+):')
+_CHANGE = re.compile(r'^seq=(\d+), package=(\S+)')
+
+# JSON array lines of ``dumpsys diskstats``, mapped to their position in
+# the (code, data, cache) size triple; sizes are in bytes
+_DISKSTATS_NAMES = 'Package Names:'
+_DISKSTATS_SIZES = {'App Sizes:': 0, 'App Data Sizes:': 1, 'Cache Sizes:': 2}
+
+# Line of ``du -sk``: kilobytes, a tab, the path
+_DU_ENTRY = re.compile(r'^(\d+)\s+(\S.*)$')
+
+# Entry of the "Total PSS by process:" section of ``dumpsys meminfo``,
+# e.g. "    123,456K: com.android.chrome (pid 4321 / activities)"
+_MEMINFO_SECTION = 'Total PSS by process:'
+_MEMINFO_ENTRY = re.compile(r'^([\d,]+)K: (\S+) \(pid \d+')
+
+# ``dumpsys batterystats --checkin`` rows (since last charge) read per uid:
+# CPU time, partial wake lock time and wakeup alarms
+_CHECKIN_USAGE = {'cpu', 'wl', 'wua'}
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def parse_dumpsys_packages(lines: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Parse ``dumpsys package packages`` output one package block at a time
+    
+    Only the "Packages:" section is read; later sections such as "Hidden
+    system packages:" repeat package headers for factory versions and are
+    skipped. Each package is yielded as soon as its block ends, so the
+    output never has to be held in memory.
+    
+    Args:
+        lines: Output lines of ``dumpsys package``
+    
+    Yields:
+        (package name, fields) where fields maps Package attribute names
+        (uid, shared_user_id, apk_path, version_code, version_name, installer,
+        first_install_time, libraries) to the values found, plus the
+        declared_permissions and requested_permissions lists
+    """
+    in_packages = False
+    name: Optional[str] = None
+    fields: Dict[str, Any] = {}
+    lists: Dict[str, List[str]] = {}
+    current: Optional[List[str]] = None  # List being read
+    list_indent = 0                      # Indent of its header
+    
+    def block() -> Tuple[str, Dict[str, Any]]:
+        for attribute in _LISTS.values():
+            fields.setdefault(attribute, lists.get(attribute, []))
+        return name, fields
+    
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+        
+        if not line.startswith(' '):
+            # Top-level section header
+            if name is not None:
+                yield block()
+                name = None
+            in_packages = line.strip() == 'Packages:'
+            continue
+        if not in_packages:
+            continue
+        
+        header = _PACKAGE_HEADER.match(line)
+        if header:
+            if name is not None:
+                yield block()
+            name = header.group(1)
+            fields = {}
+            lists = {}
+            current = None
+            continue
+        if name is None:
+            continue
+        
+        indent = _indent(line)
+        text = line.strip()
+        if current is not None:
+            if indent > list_indent:
+                # Entries may carry details, e.g. "name version:N" or "name: prot=signature"
+                current.append(text.split()[0].rstrip(':'))
+                continue
+            current = None
+        if text in _LISTS:
+            current = lists.setdefault(_LISTS[text], [])
+            list_indent = indent
+            continue
+        
+        for pattern, attribute, convert in _FIELDS:
+            if attribute in fields:
+                continue
+            match = pattern.match(text)
+            if match:
+                fields[attribute] = convert(match.group(1).strip())
+                break
+    
+    if name is not None:
+        yield block()
+
+
+def parse_package_changes(lines: Iterable[str], user: int = 0
+                          ) -> Tuple[Optional[int], List[Tuple[int, str]]]:
+    """Parse ``dumpsys package changes``
+    
+    The package manager numbers every install, uninstall and enable state
+    change since boot; this is the log behind getChangedPackages().
+    
+    Args:
+        lines: Output lines
+        user: User whose changes to return
+    
+    Returns:
+        (current sequence number, [(sequence number, package name), ...]), with
+        None as the sequence number if the device does not report changes
+    """
+    sequence: Optional[int] = None
+    current_user: Optional[int] = None
+    changes: List[Tuple[int, str]] = []
+    for line in lines:
+        text = line.strip()
+        match = _SEQUENCE.match(text)
+        if match:
+            sequence = int(match.group(1))
+            continue
+        match = _CHANGES_USER.match(text)
+        if match:
+            current_user = int(match.group(1))
+            continue
+        match = _CHANGE.match(text)
+        if match and current_user == user:
+            changes.append((int(match.group(1)), match.group(2)))
+    return sequence, changes
+
+
+def parse_diskstats(lines: Iterable[str]) -> Dict[str, Tuple[int, int, int]]:
+    """Parse the per-package sizes of ``dumpsys diskstats``
+    
+    The sizes come from the system's storage statistics cache, which is
+    refreshed about once a day, so recently installed packages can be missing.
+    
+    Args:
+        lines: Output lines
+    
+    Returns:
+        Mapping of package name to (code, data, cache) size in bytes; empty
+        if the device does not report package sizes
+    """
+    names: List[str] = []
+    columns: Dict[int, List[int]] = {}
+    for line in lines:
+        text = line.strip()
+        try:
+            if text.startswith(_DISKSTATS_NAMES):
+                names = json.loads(text[len(_DISKSTATS_NAMES):])
+                continue
+            for prefix, column in _DISKSTATS_SIZES.items():
+                if text.startswith(prefix):
+                    columns[column] = json.loads(text[len(prefix):])
+        except ValueError:
+            continue
+    if len(columns) < len(_DISKSTATS_SIZES) or any(len(values) != len(names)
+                                                   for values in columns.values()):
+        return {}
+    return {
+        name: (columns[0][index], columns[1][index], columns[2][index])
+        for index, name in enumerate(names)
+    }
+
+
+def parse_package_paths(lines: Iterable[str]) -> Dict[str, str]:
+    """Parse ``pm list packages -f``
+    
+    Args:
+        lines: Output lines, e.g. ``package:/system/app/Foo/Foo.apk=com.foo``
+    
+    Returns:
+        Mapping of package name to base APK path
+    """
+    paths: Dict[str, str] = {}
+    for line in lines:
+        text = line.strip()
+        if text.startswith('package:') and '=' in text:
+            path, name = text[len('package:'):].rsplit('=', 1)
+            paths[name] = path
+    return paths
+
+
+def parse_du(lines: Iterable[str]) -> Dict[str, int]:
+    """Parse ``du -sk`` output
+    
+    Args:
+        lines: Output lines
+    
+    Returns:
+        Mapping of path to size in bytes
+    """
+    sizes: Dict[str, int] = {}
+    for line in lines:
+        match = _DU_ENTRY.match(line.strip())
+        if match:
+            sizes[match.group(2)] = int(match.group(1)) * 1024
+    return sizes
+
+
+def parse_meminfo(lines: Iterable[str]) -> Dict[str, int]:
+    """Parse the per-process memory totals of ``dumpsys meminfo``
+    
+    Args:
+        lines: Output lines
+    
+    Returns:
+        Mapping of process name to PSS in kilobytes
+    """
+    processes: Dict[str, int] = {}
+    in_section = False
+    for line in lines:
+        text = line.strip()
+        if text == _MEMINFO_SECTION:
+            in_section = True
+        elif not text:
+            in_section = False
+        elif in_section:
+            match = _MEMINFO_ENTRY.match(text)
+            if match:
+                name = match.group(2)
+                processes[name] = processes.get(name, 0) + int(match.group(1).replace(',', ''))
+    return processes
+
+
+def parse_batterystats_checkin(lines: Iterable[str]
+                               ) -> Tuple[Dict[int, List[str]], Dict[int, Dict[str, int]]]:
+    """Parse the per-uid usage of ``dumpsys batterystats --checkin``
+    
+    Only rows covering the time since the last charge are read.
+    
+    Args:
+        lines: Output lines (comma separated)
+    
+    Returns:
+        (uid -> package names, uid -> {'cpu_ms', 'wakelock_ms', 'wakeups'})
+    """
+    packages: Dict[int, List[str]] = {}
+    usage: Dict[int, Dict[str, int]] = {}
+    for line in lines:
+        fields = line.strip().split(',')
+        if len(fields) < 5:
+            continue
+        try:
+            if fields[2] == 'i' and fields[3] == 'uid' and len(fields) >= 6:
+                packages.setdefault(int(fields[4]), []).append(fields[5])
+                continue
+            if fields[2] != 'l' or fields[3] not in _CHECKIN_USAGE:
+                continue
+            totals = usage.setdefault(int(fields[1]), {'cpu_ms': 0, 'wakelock_ms': 0, 'wakeups': 0})
+            if fields[3] == 'cpu':
+                # cpu,<user ms>,<system ms>,...
+                totals['cpu_ms'] += int(fields[4]) + int(fields[5])
+            elif fields[3] == 'wl' and 'p' in fields[6:]:
+                # wl,<tag>,<full ms>,f,<count>,<cur>,<max>,<total>,<partial ms>,p,...
+                # (older releases omit cur, max and total); each time precedes
+                # its type letter
+                totals['wakelock_ms'] += int(fields[fields.index('p', 6) - 1])
+            elif fields[3] == 'wua':
+                # wua,<alarm tag>,<count>
+                totals['wakeups'] += int(fields[-1])
+        except (ValueError, IndexError):
+            continue
+    return packages, usage
+
+
+def parse_overlay_list(lines: Iterable[str]) -> Dict[str, str]:
+    """Parse ``cmd overlay list`` output
+    
+    Args:
+        lines: Output lines; each target package is followed by its overlays
+    
+    Returns:
+        Mapping of overlay package to target package
+    """
+    overlays: Dict[str, str] = {}
+    target: Optional[str] = None
+    for line in lines:
+        text = line.strip()
+        if not text:
+            continue
+        entry = _OVERLAY_ENTRY.match(text)
+        if entry is None:
+            target = text
+        elif target is not None:
+            overlays[entry.group(1)] = target
+    return overlays
@@ -0,0 +1,575 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+import zlib
+import shlex
+import struct
+from debloat_adb_async import (
+    SHELL_CLOSE_STDIN, SHELL_EXIT, SHELL_STDERR, SHELL_STDOUT, _LoopThread
+)
+
+
+_VARIABLE = re.compile(r'\$(\?|[A-Za-z_][A-Za-z0-9_]*)')
+_ASSIGNMENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*=')
+
+
+class FakeDevice:
+    """In-memory Android device understanding the shell commands this tool sends
+    
+    Commands are interpreted by a small shell emulation supporting ``;``
+    separated statements, variable assignment and expansion (including
+    ``$?``), ``echo``, ``2>&1``, the ``pm`` / ``cmd package`` subcommands
+    used for scanning, removal and restore, ``cmd overlay list``,
+    ``dumpsys package``, ``dumpsys diskstats``, ``dumpsys meminfo`` and
+    ``dumpsys batterystats --checkin`` with metadata, sizes and usage
+    derived from each package name, and ``du -sk``.
+    
+    For device benchmarks it also reboots (going offline for the first half
+    of ``boot_time``) and reports memory, processes, the boot event and app
+    launch times that improve as running packages are removed.
+    
+    For benchmarks the device can answer every service request after a
+    fixed latency and drop a share of them as "device offline".
+    """
+    
+    def __init__(self, serial: str, packages: Optional[Dict[str, str]] = None,
+                 files: Optional[Dict[str, bytes]] = None, latency: float = 0.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None,
+                 boot_time: float = 0.5) -> None:
+        """Initialize the device
+        
+        Args:
+            serial: Device serial
+            packages: Mapping of package name to state ('enabled', 'disabled' or 'uninstalled')
+            files: File contents served through the sync protocol, keyed by path
+            latency: Seconds the server waits before answering a device request
+            failure_rate: Probability (0-1) that a device request fails as offline
+            seed: Seed for the failure draws and timing noise, for reproducible runs
+            boot_time: Seconds a reboot takes until sys.boot_completed is set
+        """
+        self.serial = serial
+        self.packages: Dict[str, str] = dict(packages or {})
+        self.files: Dict[str, bytes] = dict(files or {})
+        self.features = {'shell_v2', 'cmd'}
+        self.overlays: Dict[str, str] = {}  # Overlay package -> target package
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.sequence = 0                      # Package change sequence number
+        self.changes: Dict[str, int] = {}      # Package -> sequence number of its last change
+        self.boot_time = boot_time
+        self.boot_id = str(uuid.uuid4())
+        self._booted_at = time.monotonic()     # When sys.boot_completed is (or was) set
+    
+    def set_state(self, name: str, state: Optional[str]) -> None:
+        """Change a package's state as an install or OTA update would, logging the change
+        
+        Args:
+            name: Package name
+            state: 'enabled', 'disabled', 'uninstalled' or None to delete the package
+        """
+        if state is None:
+            self.packages.pop(name, None)
+        else:
+            self.packages[name] = state
+        self.sequence += 1
+        self.changes[name] = self.sequence
+    
+    def offline(self) -> bool:
+        """Whether the next request fails: rebooting, or drawn from failure_rate"""
+        if time.monotonic() < self._booted_at - self.boot_time / 2:
+            return True
+        return self.failure_rate > 0 and self._random.random() < self.failure_rate
+    
+    def _reboot(self) -> Tuple[str, str, int]:
+        self.boot_id = str(uuid.uuid4())
+        self._booted_at = time.monotonic() + self.boot_time
+        self.sequence = 0
+        self.changes.clear()
+        return "", "", 0
+    
+    def _running(self) -> List[str]:
+        # Every 3rd enabled package (by checksum) is running
+        return [name for name, state in sorted(self.packages.items())
+                if state == 'enabled' and zlib.crc32(name.encode()) % 3 == 0]
+    
+    def _proc_meminfo(self) -> Tuple[str, str, int]:
+        total = 7_812_345
+        used = sum(zlib.crc32(name.encode()) % 200000 for name in self._running())
+        available = max(total - 2_000_000 - used // 4, 100_000)
+        return (f"MemTotal:       {total} kB\nMemFree:         {available // 3} kB\n"
+                f"MemAvailable:   {available} kB\nBuffers:           12345 kB\n"), "", 0
+    
+    def _ps(self) -> Tuple[str, str, int]:
+        lines = ["  PID\n"] + [f"{pid}\n" for pid in range(1, 301 + len(self._running()))]
+        return "".join(lines), "", 0
+    
+    def _boot_events(self) -> Tuple[str, str, int]:
+        enabled = sum(state == 'enabled' for state in self.packages.values())
+        value = 15000 + 20 * enabled + self._random.randint(0, 400)
+        return (f"10-17 08:00:01.234  1412  1412 I boot_progress_enable_screen: {value}\n",
+                "", 0)
+    
+    def _resolve_activity(self, name: str) -> Tuple[str, str, int]:
+        if self.packages.get(name) != 'enabled':
+            return "No activity found\n", "", 0
+        return (f"priority=0 preferredOrder=0 match=0x108000 specificIndex=-1 isDefault=true\n"
+                f"{name}/.MainActivity\n"), "", 0
+    
+    def _am_start(self, component: str) -> Tuple[str, str, int]:
+        name = component.split('/', 1)[0]
+        if self.packages.get(name) != 'enabled':
+            return "", f"Error: Activity class {{{component}}} does not exist.\n", 1
+        total = 300 + len(self._running()) + self._random.randint(0, 60)
+        return (f"Starting: Intent {{ cmp={component} }}\nStatus: ok\nLaunchState: COLD\n"
+                f"Activity: {component}\nTotalTime: {total}\nWaitTime: {total + 12}\nComplete\n"), "", 0
+    
+    @staticmethod
+    def _code_path(name: str) -> str:
+        # Every 4th package (by checksum) is an update installed on /data
+        code = zlib.crc32(name.encode())
+        if code % 4 == 0:
+            return f"/data/app/~~{code:x}/{name}-1"
+        return f"/system/app/{name}"
+    
+    @staticmethod
+    def _sizes(name: str) -> Tuple[int, int, int]:
+        code = zlib.crc32(name.encode())
+        return (code % 50000 + 100) * 1024, code % 20000 * 1024, code % 3000 * 1024
+    
+    def _pm_list(self, flags: List[str]) -> Tuple[str, str, int]:
+        filters = [flag for flag in flags if not flag.startswith('-')]
+        lines = []
+        for name, state in sorted(self.packages.items()):
+            if filters and filters[0] not in name:
+                continue
+            if '-e' in flags and state != 'enabled':
+                continue
+            if '-d' in flags and state != 'disabled':
+                continue
+            if '-u' not in flags and state == 'uninstalled':
+                continue
+            if '-f' in flags:
+                lines.append(f"package:{self._code_path(name)}/base.apk={name}\n")
+            else:
+                lines.append(f"package:{name}\n")
+        return "".join(lines), "", 0
+    
+    def _uninstall(self, name: str) -> Tuple[str, str, int]:
+        if self.packages.get(name) in ('enabled', 'disabled'):
+            self.set_state(name, 'uninstalled')
+            return "Success\n", "", 0
+        return "Failure [not installed for 0]\n", "", 1
+    
+    def _install_existing(self, name: str) -> Tuple[str, str, int]:
+        if name in self.packages:
+            self.set_state(name, 'enabled')
+            return f"Package {name} installed for user: 0\n", "", 0
+        return "", f"Failure [package {name} doesn't exist]\n", 1
+    
+    def _overlay_list(self) -> Tuple[str, str, int]:
+        targets: Dict[str, List[str]] = {}
+        for overlay, target in sorted(self.overlays.items()):
+            targets.setdefault(target, []).append(overlay)
+        lines = []
+        for target, overlays in targets.items():
+            lines.append(f"{target}\n")
+            lines.extend(f"[x] {overlay}\n" for overlay in overlays)
+            lines.append("\n")
+        return "".join(lines), "", 0
+    
+    def _package_changes(self) -> Tuple[str, str, int]:
+        lines = ["Package Changes:\n", f"  Sequence number={self.sequence}\n", "  User 0:\n"]
+        for name, sequence in sorted(self.changes.items(), key=lambda item: item[1]):
+            lines.append(f"    seq={sequence}, package={name}\n")
+        return "".join(lines), "", 0
+    
+    def _diskstats(self) -> Tuple[str, str, int]:
+        # Every 13th package (by checksum) is missing from the statistics
+        # cache, as if installed since it was last refreshed
+        names = [name for name in sorted(self.packages) if zlib.crc32(name.encode()) % 13]
+        sizes = [self._sizes(name) for name in names]
+        lines = [
+            "Latency: 2ms [512B Data Write]\n",
+            "Data-Free: 41235648K / 110941184K total = 37% free\n",
+            "System-Free: 0K / 6442452K total = 0% free\n",
+            f"Package Names: {json.dumps(names, separators=(',', ':'))}\n",
+            f"App Sizes: {json.dumps([size[0] for size in sizes], separators=(',', ':'))}\n",
+            f"App Data Sizes: {json.dumps([size[1] for size in sizes], separators=(',', ':'))}\n",
+            f"Cache Sizes: {json.dumps([size[2] for size in sizes], separators=(',', ':'))}\n",
+        ]
+        return "".join(lines), "", 0
+    
+    def _du(self, paths: List[str]) -> Tuple[str, str, int]:
+        codes = {self._code_path(name): name for name in self.packages}
+        lines = []
+        errors = []
+        for path in paths:
+            name = codes.get(path)
+            if name is None:
+                errors.append(f"du: {path}: No such file or directory\n")
+            else:
+                lines.append(f"{self._sizes(name)[0] // 1024}\t{path}\n")
+        return "".join(lines), "".join(errors), 1 if errors else 0
+    
+    @staticmethod
+    def _uid(index: int) -> int:
+        # Every 10th package runs as the system uid, every 50th (offset 5)
+        # shares a vendor uid
+        if index % 10 == 0:
+            return 1000
+        if index % 50 == 5:
+            return 5005
+        return 10000 + index
+    
+    def _meminfo(self) -> Tuple[str, str, int]:
+        # Every 3rd enabled package (by checksum) is running, every 6th
+        # with a second ":remote" process
+        lines = ["Applications Memory Usage (in Kilobytes):\n", "Uptime: 812345 Realtime: 812345\n",
+                 "\n", "Total PSS by process:\n", "    412,345K: system (pid 1412)\n"]
+        for pid, name in enumerate(sorted(self.packages), 2000):
+            code = zlib.crc32(name.encode())
+            if self.packages[name] != 'enabled' or code % 3:
+                continue
+            lines.append(f"    {code % 200000:,}K: {name} (pid {pid} / activities)\n")
+            if code % 6 == 0:
+                lines.append(f"    {code % 30000:,}K: {name}:remote (pid {pid + 10000})\n")
+        lines += ["\n", "Total PSS by OOM adjustment:\n", "    412,345K: System\n", "\n"]
+        return "".join(lines), "", 0
+    
+    def _batterystats(self) -> Tuple[str, str, int]:
+        lines = ["9,0,i,vers,36,214,UP1A,UP1A\n"]
+        usage = []
+        for index, name in enumerate(sorted(self.packages)):
+            if self.packages[name] == 'uninstalled':
+                continue
+            uid = self._uid(index)
+            code = zlib.crc32(name.encode())
+            lines.append(f"9,0,i,uid,{uid},{name}\n")
+            if code % 2 == 0:
+                usage.append(f"9,{uid},l,cpu,{code % 900000},{code % 300000},0\n")
+            if code % 5 == 0:
+                usage.append(f"9,{uid},l,wl,*job*/{name},0,f,0,0,0,0,"
+                             f"{code % 3600000},p,{code % 90},0,0,{code % 3600000},"
+                             f"0,w,0,0,0,0\n")
+            if code % 7 == 0:
+                usage.append(f"9,{uid},l,wua,*walarm*:{name}.SYNC,{code % 500}\n")
+        return "".join(lines + usage), "", 0
+    
+    def _dumpsys_package(self) -> Tuple[str, str, int]:
+        # Uids follow _uid(), every 20th package declares a permission
+        # requested by the next package and every 7th uses a shared library
+        names = sorted(self.packages)
+        lines = ["Database versions:\n", "  Internal:\n", "    sdkVersion=34\n", "\n", "Packages:\n"]
+        for index, name in enumerate(names):
+            state = self.packages[name]
+            code = zlib.crc32(name.encode())
+            lines.append(f"  Package [{name}] ({code:x}):\n")
+            uid = self._uid(index)
+            lines.append(f"    appId={uid}\n")
+            if uid == 1000:
+                lines.append("    sharedUser=SharedUserSetting{1f2e3d android.uid.system/1000}\n")
+            elif uid == 5005:
+                lines.append("    sharedUser=SharedUserSetting{4c5d6e com.vendor.shared/5005}\n")
+            lines.append(f"    codePath={self._code_path(name)}\n")
+            lines.append(f"    versionCode={code % 100000} minSdk=29 targetSdk=34\n")
+            lines.append(f"    versionName={code % 10}.{code % 7}\n")
+            if index % 7 == 0:
+                lines.append("    usesOptionalLibraries:\n")
+                lines.append("      org.apache.http.legacy\n")
+            if index % 20 == 0:
+                lines.append("    declared permissions:\n")
+                lines.append(f"      {name}.permission.PROVIDER: prot=signature, INSTALLED\n")
+            if index % 20 == 1:
+                lines.append("    requested permissions:\n")
+                lines.append("      android.permission.INTERNET\n")
+                lines.append(f"      {names[index - 1]}.permission.PROVIDER\n")
+            lines.append("    installerPackageName=com.android.vending\n")
+            lines.append(f"    User 0: ceDataInode=0 installed={str(state != 'uninstalled').lower()} "
+                         f"enabled={0 if state != 'disabled' else 3}\n")
+            lines.append("      firstInstallTime=2008-12-31 16:00:00\n")
+        lines.append("\nHidden system packages:\n")
+        return "".join(lines), "", 0
+    
+    def execute(self, argv: List[str]) -> Tuple[str, str, int]:
+        """Run one simple command
+        
+        Returns:
+            (stdout, stderr, exit code)
+        """
+        if not argv:
+            return "", "", 0
+        program, args = argv[0], argv[1:]
+        if program == 'echo':
+            if args[:1] == ['-n']:
+                return " ".join(args[1:]), "", 0
+            return " ".join(args) + "\n", "", 0
+        if program == 'true':
+            return "", "", 0
+        if program == 'reboot':
+            return self._reboot()
+        if program == 'getprop' and args == ['sys.boot_completed']:
+            return ("1\n" if time.monotonic() >= self._booted_at else "\n"), "", 0
+        if program == 'cat' and args == ['/proc/sys/kernel/random/boot_id']:
+            return self.boot_id + "\n", "", 0
+        if program == 'cat' and args == ['/proc/meminfo']:
+            return self._proc_meminfo()
+        if program == 'ps' and args[:1] == ['-A']:
+            return self._ps()
+        if program == 'logcat' and 'boot_progress_enable_screen' in args:
+            return self._boot_events()
+        if program == 'sleep' or program == 'input' and args[:1] == ['keyevent']:
+            return "", "", 0
+        if program == 'am' and args[:1] == ['start'] and '-n' in args:
+            return self._am_start(args[args.index('-n') + 1])
+        if program == 'cmd' and args[:2] == ['package', 'resolve-activity'] and len(args) > 2:
+            return self._resolve_activity(args[-1])
+        if program == 'pm' and args[:2] == ['list', 'packages']:
+            return self._pm_list(args[2:])
+        if program == 'pm' and args[:1] == ['uninstall'] and len(args) > 1:
+            return self._uninstall(args[-1])
+        if program == 'cmd' and args[:2] == ['package', 'install-existing'] and len(args) > 2:
+            return self._install_existing(args[-1])
+        if program == 'cmd' and args[:2] == ['overlay', 'list']:
+            return self._overlay_list()
+        if program == 'dumpsys' and args[:2] == ['package', 'changes']:
+            return self._package_changes()
+        if program == 'dumpsys' and args[:1] == ['package']:
+            return self._dumpsys_package()
+        if program == 'dumpsys' and args[:1] == ['meminfo']:
+            return self._meminfo()
+        if program == 'dumpsys' and args[:2] == ['batterystats', '--checkin']:
+            return self._batterystats()
+        if program == 'dumpsys' and args[:1] == ['diskstats']:
+            return self._diskstats()
+        if program == 'du' and args[:1] == ['-sk']:
+            return self._du(args[1:])
+        return "", f"/system/bin/sh: {program}: inaccessible or not found\n", 127
+    
+    def shell(self, command: str, merge_stderr: bool = False) -> Tuple[str, str, int]:
+        """Interpret a shell command line
+        
+        Args:
+            command: Shell command line
+            merge_stderr: Interleave stderr into stdout, like a shell without protocol v2
+        
+        Returns:
+            (stdout, stderr, exit code of the last statement)
+        """
+        lexer = shlex.shlex(command.replace('\n', ';'), posix=True, punctuation_chars=';')
+        lexer.whitespace_split = True
+        stdout: List[str] = []
+        stderr: List[str] = []
+        variables = {'?': '0'}
+        statement: List[str] = []
+        for token in list(lexer) + [';']:
+            if token != ';':
+                statement.append(token)
+                continue
+            merge = merge_stderr or '2>&1' in statement
+            quiet = '2>/dev/null' in statement
+            argv = [
+                _VARIABLE.sub(lambda m: variables.get(m.group(1), ''), t)
+                for t in statement if t not in ('2>&1', '{', '}', '</dev/null', '2>/dev/null')
+            ]
+            statement = []
+            if len(argv) == 1 and _ASSIGNMENT.match(argv[0]):
+                name, value = argv[0].split('=', 1)
+                variables[name] = value
+                continue
+            if not argv:
+                continue
+            out, err, status = self.execute(argv)
+            variables['?'] = str(status)
+            stdout.append(out + err if merge else out)
+            if not merge and not quiet:
+                stderr.append(err)
+        return "".join(stdout), "".join(stderr), int(variables['?'])
+
+
+class FakeAdbServer:
+    """Local stand-in for the adb server, backed by FakeDevice objects
+    
+    Implements the host services, ``host:transport``, shell protocol v2,
+    the legacy raw shell and the sync STAT/RECV requests.
+    """
+    
+    def __init__(self, devices: List[FakeDevice], host: str = '127.0.0.1', port: int = 0) -> None:
+        """Initialize the server
+        
+        Args:
+            devices: Devices to expose
+            host: Address to listen on
+            port: Port to listen on, 0 for any free port
+        """
+        self.devices = {device.serial: device for device in devices}
+        self.host = host
+        self.port = port
+        self.requests: List[str] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self) -> None:
+        """Start listening; ``port`` holds the bound port afterwards"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self) -> None:
+        """Stop listening"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+    
+    async def __aenter__(self) -> "FakeAdbServer":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+    
+    @staticmethod
+    def _string(text: str) -> bytes:
+        data = text.encode('utf-8')
+        return b'%04x' % len(data) + data
+    
+    def _fail(self, writer: asyncio.StreamWriter, message: str) -> None:
+        writer.write(b'FAIL' + self._string(message))
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            device: Optional[FakeDevice] = None
+            while True:
+                length = int(await reader.readexactly(4), 16)
+                request = (await reader.readexactly(length)).decode('utf-8')
+                self.requests.append(request)
+                if device is None:
+                    device = self._host_request(request, writer)
+                    if device is None:
+                        break
+                    writer.write(b'OKAY')
+                    continue
+                await self._device_request(device, request, reader, writer)
+                break
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    def _host_request(self, request: str, writer: asyncio.StreamWriter) -> Optional[FakeDevice]:
+        """Answer a host service; returns the device when switching transport"""
+        if request == 'host:version':
+            writer.write(b'OKAY' + self._string('0029'))
+        elif request == 'host:devices':
+            writer.write(b'OKAY' + self._string(
+                "".join(f"{serial}\tdevice\n" for serial in self.devices)
+            ))
+        elif request.startswith('host-serial:') and request.endswith(':features'):
+            serial = request[len('host-serial:'):-len(':features')]
+            if serial in self.devices:
+                writer.write(b'OKAY' + self._string(','.join(sorted(self.devices[serial].features))))
+            else:
+                self._fail(writer, f"device '{serial}' not found")
+        elif request == 'host:features':
+            if len(self.devices) == 1:
+                device = next(iter(self.devices.values()))
+                writer.write(b'OKAY' + self._string(','.join(sorted(device.features))))
+            else:
+                self._fail(writer, "more than one device/emulator")
+        elif request == 'host:transport-any':
+            if len(self.devices) == 1:
+                return next(iter(self.devices.values()))
+            self._fail(writer, "more than one device/emulator")
+        elif request.startswith('host:transport:'):
+            serial = request[len('host:transport:'):]
+            if serial not in self.devices:
+                self._fail(writer, f"device '{serial}' not found")
+            elif self.devices[serial].offline():
+                self._fail(writer, "device offline")
+            else:
+                return self.devices[serial]
+        else:
+            self._fail(writer, f"unknown host service {request}")
+        return None
+    
+    async def _device_request(self, device: FakeDevice, request: str,
+                              reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer a service on a device transport"""
+        if device.latency:
+            await asyncio.sleep(device.latency)
+        if request.startswith('shell,v2,raw:') or request.startswith('shell,v2:'):
+            if 'shell_v2' not in device.features:
+                self._fail(writer, "shell protocol v2 not supported")
+                return
+            writer.write(b'OKAY')
+            await writer.drain()
+            # Consume stdin until the client closes it; unread input would
+            # make closing the socket reset the connection
+            while True:
+                packet_id, length = struct.unpack('<BI', await reader.readexactly(5))
+                await reader.readexactly(length)
+                if packet_id == SHELL_CLOSE_STDIN:
+                    break
+            out, err, status = device.shell(request.split(':', 1)[1])
+            for packet_id, data in ((SHELL_STDOUT, out.encode()), (SHELL_STDERR, err.encode())):
+                if data:
+                    writer.write(struct.pack('<BI', packet_id, len(data)) + data)
+            writer.write(struct.pack('<BI', SHELL_EXIT, 1) + bytes([status & 0xff]))
+        elif request.startswith('shell:'):
+            out, _, _ = device.shell(request[len('shell:'):], merge_stderr=True)
+            writer.write(b'OKAY' + out.encode())
+        elif request == 'sync:':
+            writer.write(b'OKAY')
+            await self._sync(device, reader, writer)
+        else:
+            self._fail(writer, f"unknown device service {request}")
+    
+    async def _sync(self, device: FakeDevice, reader: asyncio.StreamReader,
+                    writer: asyncio.StreamWriter) -> None:
+        """Serve sync protocol requests until QUIT"""
+        while True:
+            command, length = struct.unpack('<4sI', await reader.readexactly(8))
+            if command == b'QUIT':
+                return
+            path = (await reader.readexactly(length)).decode('utf-8')
+            data = device.files.get(path)
+            if command == b'STAT':
+                if data is None:
+                    writer.write(b'STAT' + struct.pack('<III', 0, 0, 0))
+                else:
+                    writer.write(b'STAT' + struct.pack('<III', 0o100644, len(data), 0))
+            elif command == b'RECV':
+                if data is None:
+                    message = b'No such file or directory'
+                    writer.write(b'FAIL' + struct.pack('<I', len(message)) + message)
+                else:
+                    for offset in range(0, len(data), 65536):
+                        chunk = data[offset:offset + 65536]
+                        writer.write(b'DATA' + struct.pack('<I', len(chunk)) + chunk)
+                    writer.write(b'DONE' + struct.pack('<I', 0))
+            else:
+                return
+            await writer.drain()
+
+
+@contextlib.contextmanager
+def fake_adb_server(devices: List[FakeDevice]):
+    """Serve fake devices and point new adb server clients at them"""
+    server = FakeAdbServer(devices)
+    loop = _LoopThread.get().loop
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    previous = os.environ.get('ANDROID_ADB_SERVER_PORT')
+    os.environ['ANDROID_ADB_SERVER_PORT'] = str(server.port)
+    try:
+        yield server
+    finally:
+        if previous is None:
+            del os.environ['ANDROID_ADB_SERVER_PORT']
+        else:
+            os.environ['ANDROID_ADB_SERVER_PORT'] = previous
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
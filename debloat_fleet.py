@@ -0,0 +1,245 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import threading
+import time
+from pathlib import Path
+from debloat_adb import list_devices
+from debloat_base import PackageManager
+from debloat_profiles import Profile, ProfilePlan, apply_profile, compile_profile
+from debloat_references import ReferenceIndex
+from debloat_store import device_db_path
+
+# Called as progress(serial, status, completed_devices, total_devices)
+ProgressCallback = Callable[[str, str, int, int], None]
+
+
+@dataclass
+class DeviceResult:
+    """Outcome of one fleet operation on one device"""
+    serial: str
+    success: bool
+    value: Any = None     # Operation return value (package list, BatchResult, ...)
+    error: str = ""
+    elapsed: float = 0.0  # Wall time in seconds
+
+
+class FleetManager:
+    """Runs PackageManager operations on many attached devices concurrently"""
+    
+    def __init__(self, serials: Optional[List[str]] = None, db_dir: Optional[Path] = None,
+                 max_workers: Optional[int] = None, transport: str = 'session') -> None:
+        """Initialize the fleet
+        
+        Args:
+            serials: Device serials to manage, or None to discover attached devices
+            db_dir: Directory holding one package database per device
+            max_workers: Thread pool size, defaults to one thread per device
+            transport: Shell transport passed to each PackageManager
+        """
+        self.db_dir = db_dir or Path(".")
+        self.max_workers = max_workers
+        self.transport = transport
+        self.managers: Dict[str, PackageManager] = {}
+        self.references = ReferenceIndex()
+        self._lock = threading.Lock()
+        for serial in (self.attached_devices() if serials is None else serials):
+            self.add_device(serial)
+    
+    def attached_devices(self) -> List[str]:
+        """List the serials of attached devices that are ready for commands
+        
+        The 'server' transport asks the adb server directly; the others run
+        ``adb devices``.
+        
+        Returns:
+            Serials of devices in the ``device`` state
+        """
+        if self.transport == 'server':
+            from debloat_adb_async import list_server_devices
+            return list_server_devices()
+        return list_devices()
+    
+    def db_path_for(self, serial: str) -> Path:
+        """Get the package database path used for a device
+        
+        Args:
+            serial: Device serial
+        
+        Returns:
+            Path of the device's SQLite database
+        """
+        return device_db_path(self.db_dir, serial)
+    
+    def add_device(self, serial: str) -> PackageManager:
+        """Start managing a device (no-op if already managed)
+        
+        Args:
+            serial: Device serial
+        
+        Returns:
+            The device's PackageManager
+        """
+        with self._lock:
+            if serial not in self.managers:
+                self.managers[serial] = PackageManager(
+                    db_path=self.db_path_for(serial),
+                    transport=self.transport,
+                    serial=serial,
+                    references=self.references
+                )
+            return self.managers[serial]
+    
+    def discover(self) -> List[str]:
+        """Add every newly attached device to the fleet
+        
+        Returns:
+            Serials of the devices that were added
+        """
+        added = [serial for serial in self.attached_devices() if serial not in self.managers]
+        for serial in added:
+            self.add_device(serial)
+        return added
+    
+    def run(self, operation: Callable[[PackageManager], Any],
+            progress: Optional[ProgressCallback] = None) -> Dict[str, DeviceResult]:
+        """Apply an operation to every device in parallel
+        
+        Args:
+            operation: Function called with each device's PackageManager
+            progress: Optional callback receiving per-device status updates
+        
+        Returns:
+            Mapping of serial to DeviceResult
+        """
+        managers = dict(self.managers)
+        total = len(managers)
+        results: Dict[str, DeviceResult] = {}
+        if not managers:
+            return results
+        
+        def execute(serial: str, manager: PackageManager) -> DeviceResult:
+            if progress:
+                progress(serial, "running", len(results), total)
+            start = time.monotonic()
+            try:
+                value = operation(manager)
+                return DeviceResult(serial, True, value, elapsed=time.monotonic() - start)
+            except Exception as e:
+                return DeviceResult(serial, False, error=str(e), elapsed=time.monotonic() - start)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers or total) as pool:
+            futures = [pool.submit(execute, serial, manager) for serial, manager in managers.items()]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.serial] = result
+                if progress:
+                    progress(result.serial, "done" if result.success else "failed",
+                             len(results), total)
+        return results
+    
+    def scan(self, progress: Optional[ProgressCallback] = None) -> Dict[str, DeviceResult]:
+        """Rescan packages on every device, updating each device's database
+        
+        Returns:
+            Mapping of serial to DeviceResult holding the device's ScanDiff
+        """
+        return self.run(lambda manager: manager.rescan(), progress)
+    
+    def remove(self, package_names: List[str], progress: Optional[ProgressCallback] = None,
+               expand: bool = False) -> Dict[str, DeviceResult]:
+        """Apply a removal plan to every device
+        
+        Packages unknown to a device (not present in its last scan) are
+        reported as failures in that device's BatchResult.
+        
+        Args:
+            package_names: Names of packages to remove
+            expand: Also remove dependents instead of refusing to remove
+        
+        Returns:
+            Mapping of serial to DeviceResult holding a BatchResult
+        """
+        return self.run(lambda manager: manager.remove_packages(package_names, expand=expand),
+                        progress)
+    
+    def restore(self, package_names: List[str],
+                progress: Optional[ProgressCallback] = None) -> Dict[str, DeviceResult]:
+        """Restore packages on every device
+        
+        Args:
+            package_names: Names of packages to restore
+        
+        Returns:
+            Mapping of serial to DeviceResult holding a BatchResult
+        """
+        return self.run(lambda manager: manager.restore_packages(package_names), progress)
+    
+    def plan_profile(self, profile: Profile) -> Dict[str, ProfilePlan]:
+        """Compile a profile against every device's stored snapshot (no device access)
+        
+        Args:
+            profile: Profile to compile
+        
+        Returns:
+            Mapping of serial to the device's ProfilePlan
+        """
+        return {
+            serial: compile_profile(profile, manager.packages, manager.graph)
+            for serial, manager in self.managers.items()
+        }
+    
+    def apply_profile(self, profile: Profile,
+                      progress: Optional[ProgressCallback] = None) -> Dict[str, DeviceResult]:
+        """Apply a profile to every device, as one batched removal per device
+        
+        Each device's plan is compiled against its own snapshot.
+        
+        Args:
+            profile: Profile to apply
+        
+        Returns:
+            Mapping of serial to DeviceResult holding a BatchResult
+        """
+        return self.run(lambda manager: apply_profile(manager, profile), progress)
+    
+    def merged_table(self, package_names: Optional[Iterable[str]] = None
+                     ) -> List[Dict[str, str]]:
+        """Merge the package snapshots of all devices into one table
+        
+        Args:
+            package_names: Only include these packages, or None for all
+        
+        Returns:
+            One row per package name with its category, safety status and
+            the state on each device (empty when the device lacks it)
+        """
+        rows: Dict[str, Dict[str, str]] = {}
+        serials = sorted(self.managers)
+        wanted = None if package_names is None else set(package_names)
+        for serial in serials:
+            for pkg in self.managers[serial].packages.values():
+                if wanted is not None and pkg.name not in wanted:
+                    continue
+                row = rows.get(pkg.name)
+                if row is None:
+                    row = rows[pkg.name] = {
+                        'name': pkg.name,
+                        'category': pkg.category.name,
+                        'safety_status': pkg.safety_status.name
+                    }
+                    row.update((s, "") for s in serials)
+                row[serial] = pkg.state.name
+        return [rows[name] for name in sorted(rows)]
+    
+    def close(self) -> None:
+        """Close every device's PackageManager"""
+        for manager in self.managers.values():
+            manager.close()
+        self.references.close()
+    
+    def __enter__(self) -> "FleetManager":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,317 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import re
+from debloat_model import Package, PackageState, SafetyStatus
+
+# Shared users of the platform itself (android.uid.system, android.media, ...)
+# group unrelated components, so they do not imply a dependency
+_PLATFORM_SHARED_USER = re.compile(r'^android\.')
+
+# Static shared libraries are installed as "<library>_<version>" packages
+_STATIC_LIBRARY = re.compile(r'^(.+)_(\d+)$')
+
+# The OS package declares the platform permissions every app requests
+_PLATFORM_PACKAGE = "android"
+
+
+class DependencyGraph:
+    """Package dependency graph; an edge A -> B means A depends on B
+    
+    Both directions are kept as adjacency sets, so dependencies, dependents
+    and closures are answered in time proportional to the edges visited.
+    """
+    
+    def __init__(self) -> None:
+        """Initialize an empty graph"""
+        self._dependencies: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        """Number of edges"""
+        return sum(len(targets) for targets in self._dependencies.values())
+    
+    def add(self, dependent: str, dependency: str) -> None:
+        """Record that one package depends on another (self edges are ignored)"""
+        if dependent != dependency:
+            self._dependencies.setdefault(dependent, set()).add(dependency)
+            self._dependents.setdefault(dependency, set()).add(dependent)
+    
+    def dependencies(self, name: str) -> Set[str]:
+        """Packages a package depends on directly"""
+        return self._dependencies.get(name, set())
+    
+    def dependents(self, name: str) -> Set[str]:
+        """Packages depending directly on a package"""
+        return self._dependents.get(name, set())
+    
+    @classmethod
+    def from_packages(cls, packages: Dict[str, Package]) -> "DependencyGraph":
+        """Rebuild a graph from the stored ``dependencies`` of each package"""
+        graph = cls()
+        for pkg in packages.values():
+            for dependency in pkg.dependencies:
+                graph.add(pkg.name, dependency)
+        return graph
+    
+    def closure(self, names: Iterable[str],
+                follow: Optional[Callable[[str], bool]] = None) -> Set[str]:
+        """Everything that would break if the given packages went away
+        
+        Args:
+            names: Starting packages (included in the result)
+            follow: Optional predicate; dependents failing it are not visited
+                (e.g. packages that are already removed)
+        
+        Returns:
+            The packages plus all their direct and indirect dependents
+        """
+        seen = set(names)
+        queue = deque(seen)
+        while queue:
+            for dependent in self._dependents.get(queue.popleft(), ()):
+                if dependent not in seen and (follow is None or follow(dependent)):
+                    seen.add(dependent)
+                    queue.append(dependent)
+        return seen
+    
+    def components(self, names: Iterable[str]) -> List[List[str]]:
+        """Strongly connected components of the subgraph induced by some packages
+        
+        Packages depending on each other (e.g. through a shared UID) end up
+        in one component and have to be handled together.
+        
+        Returns:
+            Components as sorted name lists
+        """
+        nodes = set(names)
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        result: List[List[str]] = []
+        
+        # Iterative Tarjan, so deep chains cannot hit the recursion limit
+        for root in sorted(nodes):
+            if root in index:
+                continue
+            work = [(root, iter(sorted(self.dependencies(root) & nodes)))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.dependencies(child) & nodes))))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        result.append(sorted(component))
+        return result
+    
+    def batches(self, names: Iterable[str], dependents_first: bool = True) -> List[List[str]]:
+        """Order packages into batches that can each run without ordering constraints
+        
+        Only edges between the given packages count. With
+        ``dependents_first`` (the removal order) a package comes after every
+        package depending on it; otherwise (the restore order) it comes
+        before them. Mutually dependent packages share a batch.
+        
+        Returns:
+            Batches of sorted package names
+        """
+        components = self.components(names)
+        owner = {name: number for number, component in enumerate(components) for name in component}
+        
+        # blockers[c]: components that must be handled before component c
+        blockers: List[Set[int]] = [set() for _ in components]
+        for number, component in enumerate(components):
+            for name in component:
+                related = self.dependents(name) if dependents_first else self.dependencies(name)
+                blockers[number].update(
+                    owner[other] for other in related if other in owner and owner[other] != number
+                )
+        
+        unblocks: List[List[int]] = [[] for _ in components]
+        for number, before in enumerate(blockers):
+            for other in before:
+                unblocks[other].append(number)
+        pending = [len(before) for before in blockers]
+        level = [number for number, count in enumerate(pending) if count == 0]
+        batches = []
+        while level:
+            batches.append(sorted(name for number in level for name in components[number]))
+            following = []
+            for number in level:
+                for other in unblocks[number]:
+                    pending[other] -= 1
+                    if pending[other] == 0:
+                        following.append(other)
+            level = following
+        return batches
+
+
+def build_dependency_graph(packages: Dict[str, Package],
+                           declared_permissions: Optional[Dict[str, List[str]]] = None,
+                           requested_permissions: Optional[Dict[str, List[str]]] = None,
+                           overlays: Optional[Dict[str, str]] = None) -> DependencyGraph:
+    """Derive package dependencies from harvested device data
+    
+    Edges come from:
+    
+    - shared UIDs: members of a non-platform shared user depend on each other
+    - uses-library entries resolving to an installed library package
+    - overlays, which depend on the package they target
+    - custom permissions, which guard the providers and services a package
+      exposes: requesting one depends on the package declaring it
+    
+    Args:
+        packages: Known packages with harvested metadata
+        declared_permissions: Permissions declared per package
+        requested_permissions: Permissions requested per package
+        overlays: Mapping of overlay package to target package
+    
+    Returns:
+        DependencyGraph over the known packages
+    """
+    graph = DependencyGraph()
+    
+    shared_users: Dict[str, List[str]] = {}
+    static_libraries: Dict[str, List[str]] = {}
+    for pkg in packages.values():
+        if pkg.shared_user_id and not _PLATFORM_SHARED_USER.match(pkg.shared_user_id):
+            shared_users.setdefault(pkg.shared_user_id, []).append(pkg.name)
+        match = _STATIC_LIBRARY.match(pkg.name)
+        if match:
+            static_libraries.setdefault(match.group(1), []).append(pkg.name)
+    
+    for members in shared_users.values():
+        for member in members:
+            for other in members:
+                graph.add(member, other)
+    
+    for pkg in packages.values():
+        for library in pkg.libraries:
+            providers = [library] if library in packages else static_libraries.get(library, [])
+            for provider in providers:
+                graph.add(pkg.name, provider)
+    
+    for overlay, target in (overlays or {}).items():
+        if overlay in packages and target in packages:
+            graph.add(overlay, target)
+    
+    owners = {
+        permission: owner
+        for owner, permissions in (declared_permissions or {}).items()
+        if owner != _PLATFORM_PACKAGE and owner in packages
+        for permission in permissions
+    }
+    for name, permissions in (requested_permissions or {}).items():
+        if name not in packages:
+            continue
+        for permission in permissions:
+            owner = owners.get(permission)
+            if owner is not None:
+                graph.add(name, owner)
+    
+    return graph
+
+
+@dataclass
+class RemovalPlan:
+    """Removal set expanded or reduced by dependency closure, in execution order"""
+    requested: List[str]
+    batches: List[List[str]] = field(default_factory=list)  # Dependents before dependencies
+    added: List[str] = field(default_factory=list)          # Dependents pulled in by the closure
+    blocked: Dict[str, str] = field(default_factory=dict)   # Requested name -> reason
+    
+    @property
+    def packages(self) -> List[str]:
+        """Every package to remove, in execution order"""
+        return [name for batch in self.batches for name in batch]
+
+
+def plan_removal(packages: Dict[str, Package], graph: DependencyGraph,
+                 package_names: Iterable[str], expand: bool = False) -> RemovalPlan:
+    """Check a removal set against the dependency graph and order it
+    
+    A package's closure is everything still on the device that depends on
+    it, directly or indirectly. Without ``expand`` a requested package is
+    blocked when its closure reaches beyond the requested set; with it the
+    closure is added to the plan, unless it contains an essential package.
+    Blocking a package also blocks everything whose closure contains it.
+    Only the package states are read, so a stored snapshot can be planned
+    without a device.
+    
+    Args:
+        packages: Known packages by name
+        graph: Dependency graph of those packages
+        package_names: Names of packages to remove
+        expand: Pull dependents into the plan instead of blocking
+    
+    Returns:
+        RemovalPlan whose batches list dependents before their dependencies
+    """
+    plan = RemovalPlan(list(package_names))
+    requested = set(plan.requested)
+    closures: Dict[str, Set[str]] = {}
+    
+    def present(name: str) -> bool:
+        pkg = packages.get(name)
+        return pkg is not None and pkg.state != PackageState.REMOVED
+    
+    for name in plan.requested:
+        pkg = packages.get(name)
+        
+        # Safety checks
+        if pkg is None:
+            plan.blocked[name] = "Unknown package"
+            continue
+        if pkg.safety_status == SafetyStatus.ESSENTIAL:
+            plan.blocked[name] = "Essential package"
+            continue
+        closure = graph.closure([name], follow=present)
+        extra = sorted(closure - requested)
+        essential = [
+            other for other in extra
+            if packages[other].safety_status == SafetyStatus.ESSENTIAL
+        ]
+        if extra and not expand:
+            plan.blocked[name] = f"Package has dependents: {', '.join(extra)}"
+        elif essential:
+            plan.blocked[name] = f"Needed by essential packages: {', '.join(essential)}"
+        else:
+            closures[name] = closure
+    
+    # Removing a package would break requested packages that were blocked
+    blocked_any = True
+    while blocked_any:
+        blocked_any = False
+        for name, closure in list(closures.items()):
+            hit = sorted(closure.intersection(plan.blocked))
+            if hit:
+                plan.blocked[name] = f"Needed by blocked packages: {', '.join(hit)}"
+                del closures[name]
+                blocked_any = True
+    
+    accepted = set().union(*closures.values())
+    plan.added = sorted(accepted - requested)
+    plan.batches = graph.batches(accepted)
+    return plan
@@ -1,23 +1,319 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from typing import List, Optional
+from tkinter import ttk, messagebox, filedialog
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
 import json
+import queue
 import subprocess
+import threading
 from pathlib import Path
-from debloat_base import Package, PackageManager, PackageCategory, SafetyStatus, PackageState
+from debloat_adb import parse_devices
+from debloat_base import (
+    BatchResult, OperationCancelled, Package, PackageManager, PackageCategory,
+    PackageResult, SafetyStatus, PackageState, ScanDiff
+)
+from debloat_metrics import AdbMetrics
+from debloat_watch import PackageListing, PackageWatcher, WatchEvent
+
+# Called by background work as report(completed, total, text)
+ProgressReport = Callable[[int, int, str], None]
+
+
+def format_size(size: int) -> str:
+    """Human readable storage size, e.g. ``12.3 MB`` (empty for 0, i.e. unknown)"""
+    if not size:
+        return ""
+    value = float(size)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.2f} GB"
+
+
+class JobPanel(ttk.Frame):
+    """Progress bar and Cancel button for work running on a background thread
+    
+    Work runs on a worker thread and reports back through a queue that is
+    polled with ``after``, so Tk widgets are only touched from the main thread.
+    When finished, the label shows the adb commands the job ran and their time.
+    """
+    
+    POLL_MS = 50
+    
+    def __init__(self, parent: tk.Widget, metrics: Optional[AdbMetrics] = None) -> None:
+        """Initialize the job panel
+        
+        Args:
+            parent: Parent widget
+            metrics: adb command recorder to summarize each job from
+        """
+        super().__init__(parent)
+        self.label_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.label_var).pack(side=tk.LEFT, padx=5)
+        self.progress = ttk.Progressbar(self, mode="determinate", length=200)
+        self.progress.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(self, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        
+        self._events: "queue.Queue[tuple]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._running = False
+        self._abandoned = False
+        self.started = 0  # Number of jobs started so far
+        self._on_done: Optional[Callable[[Any], None]] = None
+        self._on_error: Optional[Callable[[Exception], None]] = None
+        self._metrics = metrics
+        self._title = ""
+        self._mark: Dict[str, Tuple[int, float]] = {}
+    
+    @property
+    def busy(self) -> bool:
+        """Whether a job is currently running"""
+        return self._running
+    
+    def start(self, title: str, work: Callable[[ProgressReport, threading.Event], Any],
+              on_done: Callable[[Any], None],
+              on_error: Optional[Callable[[Exception], None]] = None) -> bool:
+        """Run work on a worker thread
+        
+        Args:
+            title: Text shown next to the progress bar
+            work: Called on the worker as work(report, cancel_event)
+            on_done: Called on the Tk thread with the work's return value
+            on_error: Called on the Tk thread with any exception the work raised
+        
+        Returns:
+            True if the job started, False if another job is still running
+        """
+        if self._running:
+            messagebox.showwarning("Busy", "Another operation is still running")
+            return False
+        
+        self._running = True
+        self.started += 1
+        self._abandoned = False
+        self._cancel = threading.Event()
+        self._on_done = on_done
+        self._on_error = on_error
+        self._title = title
+        if self._metrics is not None:
+            self._mark = self._metrics.mark()
+        self.label_var.set(title)
+        self.progress.configure(mode="indeterminate", value=0)
+        self.progress.start(10)
+        self.cancel_btn.configure(state=tk.NORMAL)
+        
+        threading.Thread(target=self._worker, args=(work, self._cancel), daemon=True).start()
+        self.after(self.POLL_MS, self._poll)
+        return True
+    
+    def cancel(self) -> None:
+        """Ask the running job to stop after its current item"""
+        if self._running:
+            self._cancel.set()
+            self.label_var.set("Cancelling...")
+            self.cancel_btn.configure(state=tk.DISABLED)
+    
+    def abandon(self) -> None:
+        """Cancel the running job and discard its outcome (e.g. when closing)
+        
+        ``busy`` stays True until the worker has finished.
+        """
+        self.cancel()
+        self._abandoned = True
+    
+    def _worker(self, work: Callable[[ProgressReport, threading.Event], Any],
+                cancel: threading.Event) -> None:
+        """Run the work and queue its events (worker thread)"""
+        def report(completed: int, total: int, text: str = "") -> None:
+            self._events.put(("progress", (completed, total, text)))
+        
+        try:
+            result = work(report, cancel)
+        except Exception as e:
+            self._events.put(("error", e))
+        else:
+            self._events.put(("done", result))
+    
+    def _poll(self) -> None:
+        """Apply queued worker events to the widgets (Tk thread)"""
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                completed, total, text = payload
+                if str(self.progress.cget("mode")) != "determinate":
+                    self.progress.stop()
+                    self.progress.configure(mode="determinate")
+                self.progress.configure(maximum=max(total, 1), value=completed)
+                if text and not self._cancel.is_set():
+                    self.label_var.set(text)
+                continue
+            
+            self._running = False
+            self.progress.stop()
+            self.progress.configure(mode="determinate", value=0)
+            self.cancel_btn.configure(state=tk.DISABLED)
+            if self._metrics is not None:
+                self.label_var.set(f"{self._title}: {self._metrics.summary(since=self._mark)}")
+            else:
+                self.label_var.set("")
+            if self._abandoned:
+                return
+            if kind == "done":
+                self._on_done(payload)
+            elif self._on_error is not None:
+                self._on_error(payload)
+            else:
+                messagebox.showerror("Error", str(payload))
+            return
+        self.after(self.POLL_MS, self._poll)
+
+
+class PackageListModel:
+    """Filtered, sorted package rows behind the virtual package list
+    
+    One presorted array of package names is kept per column, built on first
+    use and dropped when the packages change. Sorting by a column therefore
+    only re-applies the current filter to an existing order (and without a
+    filter reuses the array as is) instead of sorting rows.
+    """
+    
+    COLUMNS = ("name", "category", "safety", "state", "code", "data", "cache", "impact")
+    
+    # Size and impact columns sort by their numbers, largest first
+    SIZE_ATTRIBUTES = {"code": "code_size", "data": "data_size", "cache": "cache_size"}
+    NUMERIC_ATTRIBUTES = dict(SIZE_ATTRIBUTES, impact="impact")
+    
+    def __init__(self, packages: Dict[str, Package]) -> None:
+        """Initialize the model
+        
+        Args:
+            packages: Package manager's package mapping, shared not copied
+        """
+        self.packages = packages
+        self.sort_column = "name"
+        self.rows: List[str] = []
+        self._sorted: Dict[str, List[str]] = {}
+        self._matches: Optional[Set[str]] = None
+        self._refresh_rows()
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __contains__(self, name: str) -> bool:
+        if self._matches is None:
+            return name in self.packages
+        return name in self._matches
+    
+    @staticmethod
+    def row_values(pkg: Package) -> Tuple[str, ...]:
+        """Treeview column values for a package"""
+        return (
+            pkg.name,
+            pkg.category.name,
+            pkg.safety_status.name,
+            pkg.state.name,
+            format_size(pkg.code_size),
+            format_size(pkg.data_size),
+            format_size(pkg.cache_size),
+            f"{pkg.impact:.1f}" if pkg.impact else ""
+        )
+    
+    def _sort_key(self, column: str) -> Callable[[str], Tuple[Any, str]]:
+        """Key ordering package names by a column, ties broken by name"""
+        packages = self.packages
+        attribute = self.NUMERIC_ATTRIBUTES.get(column)
+        if attribute is not None:
+            return lambda name: (-getattr(packages[name], attribute), name)
+        index = self.COLUMNS.index(column)
+        return lambda name: (self.row_values(packages[name])[index], name)
+    
+    def _presorted(self, column: str) -> List[str]:
+        """All package names ordered by a column"""
+        names = self._sorted.get(column)
+        if names is None:
+            names = self._sorted[column] = sorted(self.packages, key=self._sort_key(column))
+        return names
+    
+    def _refresh_rows(self) -> None:
+        names = self._presorted(self.sort_column)
+        matches = self._matches
+        self.rows = names if matches is None else [name for name in names if name in matches]
+    
+    def invalidate(self) -> None:
+        """Drop the presorted arrays after packages were added, removed or changed"""
+        self._sorted.clear()
+        self._refresh_rows()
+    
+    def update(self, names: Iterable[str]) -> None:
+        """Re-place a few added, removed or changed packages in the presorted arrays
+        
+        Each array is rebuilt by merging the untouched names with the sorted
+        touched ones, which is linear instead of a full sort.
+        """
+        touched = set(names)
+        for column, presorted in self._sorted.items():
+            key = self._sort_key(column)
+            kept = [name for name in presorted if name not in touched]
+            fresh = sorted((name for name in touched if name in self.packages), key=key)
+            self._sorted[column] = list(heapq.merge(kept, fresh, key=key))
+        self._refresh_rows()
+    
+    def set_filter(self, matches: Optional[Iterable[str]]) -> None:
+        """Show only the given packages, or every package for None"""
+        self._matches = None if matches is None else set(matches)
+        self._refresh_rows()
+    
+    def narrow(self, rows: List[str]) -> None:
+        """Replace the rows with a subset of the current rows, already in order"""
+        self._matches = set(rows)
+        self.rows = rows
+    
+    def sort(self, column: str) -> None:
+        """Order the rows by a column"""
+        self.sort_column = column
+        self._refresh_rows()
+
 
 class PackageListFrame(ttk.Frame):
-    """Frame containing the package list and filter controls"""
+    """Frame containing the package list and filter controls
     
-    def __init__(self, parent: tk.Widget, package_manager: PackageManager) -> None:
+    The list is virtual: the treeview only holds enough rows to fill its
+    height, and scrolling rewrites their values from a window of the
+    PackageListModel. Selection is therefore tracked by package name.
+    """
+    
+    # Delay after the last keystroke before the search filter runs
+    FILTER_DELAY_MS = 150
+    
+    def __init__(self, parent: tk.Widget, package_manager: PackageManager,
+                 jobs: JobPanel) -> None:
         """Initialize the package list frame
         
         Args:
             parent: Parent widget
             package_manager: PackageManager instance
+            jobs: Panel running bulk operations in the background
         """
         super().__init__(parent)
         self.package_manager = package_manager
+        self.jobs = jobs
+        
+        # List state: the row model, the first model row shown, the
+        # treeview rows (pool) and the package names they currently show,
+        # the selected package names and the filter behind the model rows
+        self.model = PackageListModel(package_manager.packages)
+        self._first = 0
+        self._page = 20
+        self._pool: List[str] = []
+        self._shown: List[str] = []
+        self._selected: Set[str] = set()
+        self._last_filter: Optional[Tuple[str, str, str, str]] = None
+        self._filter_job: Optional[str] = None
         
         # Filter controls
         filter_frame = ttk.LabelFrame(self, text="Filters")
@@ -59,7 +355,7 @@ class PackageListFrame(ttk.Frame):
         # Search entry
         ttk.Label(filter_frame, text="Search:").pack(side=tk.LEFT, padx=5)
         self.search_var = tk.StringVar()
-        self.search_var.trace_add("write", lambda *args: self._apply_filters())
+        self.search_var.trace_add("write", lambda *args: self._schedule_filters())
         search_entry = ttk.Entry(filter_frame, textvariable=self.search_var)
         search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
@@ -82,7 +378,7 @@ class PackageListFrame(ttk.Frame):
         # Package list
         self.tree = ttk.Treeview(
             self,
-            columns=("name", "category", "safety", "state"),
+            columns=PackageListModel.COLUMNS,
             show="headings",
             selectmode="extended"
         )
@@ -92,24 +388,41 @@ class PackageListFrame(ttk.Frame):
         self.tree.heading("category", text="Category", command=lambda: self._sort_column("category"))
         self.tree.heading("safety", text="Safety", command=lambda: self._sort_column("safety"))
         self.tree.heading("state", text="State", command=lambda: self._sort_column("state"))
+        self.tree.heading("code", text="Code Size", command=lambda: self._sort_column("code"))
+        self.tree.heading("data", text="Data Size", command=lambda: self._sort_column("data"))
+        self.tree.heading("cache", text="Cache", command=lambda: self._sort_column("cache"))
+        self.tree.heading("impact", text="Impact", command=lambda: self._sort_column("impact"))
         
         self.tree.column("name", width=300)
         self.tree.column("category", width=100)
         self.tree.column("safety", width=100)
         self.tree.column("state", width=100)
+        for column in PackageListModel.SIZE_ATTRIBUTES:
+            self.tree.column(column, width=80, anchor=tk.E)
+        self.tree.column("impact", width=60, anchor=tk.E)
         
         # Bind tooltip events
         self.tooltip = None
         self.tree.bind("<Motion>", self._show_tooltip)
         self.tree.bind("<Leave>", self._hide_tooltip)
         
+        # Virtual scrolling and name-based selection
+        self._row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", self._on_wheel)
+        self.tree.bind("<Button-5>", self._on_wheel)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>"):
+            self.tree.bind(key, self._on_key)
+        
         # Scrollbar
-        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._yview)
         
         # Pack list and scrollbar
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
         
         # Bind double-click to show details
         self.tree.bind("<Double-1>", self._show_package_details)
@@ -167,44 +480,150 @@ class PackageListFrame(ttk.Frame):
             self.tooltip = None
     
     def _load_packages(self) -> None:
-        """Load packages into the treeview"""
-        self.tree.delete(*self.tree.get_children())
-        for pkg in self.package_manager.packages.values():
-            self.tree.insert(
-                "",
-                tk.END,
-                values=(
-                    pkg.name,
-                    pkg.category.name,
-                    pkg.safety_status.name,
-                    pkg.state.name
-                )
-            )
+        """Rebuild the list model from the package manager and re-apply filters"""
+        self.model.invalidate()
+        self._last_filter = None
+        self._apply_filters()
+    
+    def _update_packages(self, package_names: Iterable[str]) -> None:
+        """Refresh only the given packages' rows and re-apply filters
+        
+        Args:
+            package_names: Names of packages that were added, removed or changed
+        """
+        self.model.update(package_names)
+        self._last_filter = None
+        self._apply_filters()
+    
+    def _schedule_filters(self) -> None:
+        """Debounce search keystrokes into a single filter pass"""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(self.FILTER_DELAY_MS, self._apply_filters)
     
     def _apply_filters(self, *args) -> None:
         """Apply current filters to package list"""
-        self.tree.delete(*self.tree.get_children())
-        
+        self._filter_job = None
         category_filter = self.category_var.get()
         safety_filter = self.safety_var.get()
         state_filter = self.state_var.get()
         search_text = self.search_var.get().lower()
+        current = (category_filter, safety_filter, state_filter, search_text)
+        if current == self._last_filter:
+            return
         
-        for pkg in self.package_manager.packages.values():
-            if (category_filter == "All" or pkg.category.name == category_filter) and \
-               (safety_filter == "All" or pkg.safety_status.name == safety_filter) and \
-               (state_filter == "All" or pkg.state.name == state_filter) and \
-               (search_text in pkg.name.lower() or search_text in pkg.description.lower()):
-                self.tree.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        pkg.name,
-                        pkg.category.name,
-                        pkg.safety_status.name,
-                        pkg.state.name
-                    )
-                )
+        index = self.package_manager.search_index
+        last = self._last_filter
+        if last is not None and last[:3] == current[:3] and last[3] in search_text:
+            # Query was extended: results can only narrow from the last ones
+            self.model.narrow(index.filter(self.model.rows, search_text))
+        else:
+            # Combo filters run as indexed queries against the package store,
+            # search text against the package search index
+            matches = {pkg.name for pkg in self.package_manager.filter_packages(
+                category=None if category_filter == "All" else PackageCategory[category_filter],
+                safety_status=None if safety_filter == "All" else SafetyStatus[safety_filter],
+                state=None if state_filter == "All" else PackageState[state_filter]
+            )}
+            if index.terms(search_text):
+                matches.intersection_update(index.search(search_text))
+            self.model.set_filter(matches)
+        
+        self._selected = {name for name in self._selected if name in self.model}
+        self._first = 0
+        self._redraw()
+        self._last_filter = current
+    
+    def _redraw(self) -> None:
+        """Show the model rows of the current window in the treeview's row pool
+        
+        Only the pool rows are touched, so the cost depends on the list's
+        height, not on the number of packages.
+        """
+        rows = self.model.rows
+        self._first = max(0, min(self._first, len(rows) - self._page))
+        shown = rows[self._first:self._first + self._page]
+        while len(self._pool) < len(shown):
+            self._pool.append(self.tree.insert("", tk.END))
+        
+        packages = self.package_manager.packages
+        attached = set(self.tree.get_children(""))
+        for position, (iid, name) in enumerate(zip(self._pool, shown)):
+            self.tree.item(iid, values=self.model.row_values(packages[name]))
+            # Pool rows detached by a shorter list may sit anywhere, so every
+            # shown row is put back at its position
+            self.tree.move(iid, "", position)
+        unused = [iid for iid in self._pool[len(shown):] if iid in attached]
+        if unused:
+            self.tree.detach(*unused)
+        self._shown = shown
+        self.tree.selection_set([
+            iid for iid, name in zip(self._pool, shown) if name in self._selected
+        ])
+        
+        if rows:
+            self.scrollbar.set(self._first / len(rows), (self._first + len(shown)) / len(rows))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def _yview(self, *args) -> None:
+        """Scrollbar command: move the window over the model rows"""
+        if args[0] == "moveto":
+            self._first = int(float(args[1]) * len(self.model.rows))
+        elif args[0] == "scroll":
+            self._first += int(args[1]) * (self._page if args[2] == "pages" else 1)
+        self._redraw()
+    
+    def _on_resize(self, event) -> None:
+        """Fit the number of pooled rows to the treeview's height"""
+        page = max(1, event.height // self._row_height - 1)
+        if page != self._page:
+            self._page = page
+            self._redraw()
+    
+    def _on_wheel(self, event) -> str:
+        """Scroll the window by mouse wheel"""
+        step = 3 if event.num == 5 or event.delta < 0 else -3
+        self._yview("scroll", step, "units")
+        return "break"
+    
+    def _on_key(self, event) -> Optional[str]:
+        """Move the selection by keyboard, scrolling the window past its edges"""
+        focus = self.tree.focus()
+        rows = self.model.rows
+        if focus not in self._pool or not rows:
+            return None
+        step = {"Up": -1, "Down": 1, "Prior": -self._page, "Next": self._page}[event.keysym]
+        target = max(0, min(self._first + self._pool.index(focus) + step, len(rows) - 1))
+        if target < self._first:
+            self._first = target
+        elif target >= self._first + self._page:
+            self._first = target - self._page + 1
+        self._selected = {rows[target]}
+        self._redraw()
+        row = self._pool[target - self._first]
+        self.tree.focus(row)
+        return "break"
+    
+    def _on_click(self, event) -> None:
+        """A plain click on a row starts a new selection, including rows scrolled out of view"""
+        if event.state & 0x0005:  # Shift or Control extends the selection
+            return
+        if self.tree.identify_region(event.x, event.y) in ("cell", "tree"):
+            self._selected.clear()
+    
+    def _on_select(self, event) -> None:
+        """Mirror the treeview selection of the shown rows into the selected names"""
+        selection = set(self.tree.selection())
+        for iid, name in zip(self._pool, self._shown):
+            if iid in selection:
+                self._selected.add(name)
+            else:
+                self._selected.discard(name)
+    
+    def _selected_names(self) -> List[str]:
+        """Selected package names, in display order"""
+        return [name for name in self.model.rows if name in self._selected]
     
     def _sort_column(self, column: str) -> None:
         """Sort treeview by column
@@ -212,11 +631,8 @@ class PackageListFrame(ttk.Frame):
         Args:
             column: Column identifier to sort by
         """
-        items = [(self.tree.set(item, column), item) for item in self.tree.get_children("")]
-        items.sort()
-        
-        for index, (_, item) in enumerate(items):
-            self.tree.move(item, "", index)
+        self.model.sort(column)
+        self._redraw()
     
     def _show_package_details(self, event) -> None:
         """Show details for selected package"""
@@ -242,6 +658,43 @@ class PackageListFrame(ttk.Frame):
         ttk.Label(info_frame, text=f"Safety Status: {pkg.safety_status.name}").pack(anchor=tk.W)
         ttk.Label(info_frame, text=f"Current State: {pkg.state.name}").pack(anchor=tk.W)
         
+        # Metadata from the last harvest
+        if pkg.version_code or pkg.apk_path:
+            ttk.Label(info_frame, text=f"Version: {pkg.version_name} ({pkg.version_code})").pack(anchor=tk.W)
+            uid_text = f"UID: {pkg.uid}"
+            if pkg.shared_user_id:
+                uid_text += f" (shared: {pkg.shared_user_id})"
+            ttk.Label(info_frame, text=uid_text).pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"APK Path: {pkg.apk_path}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"Installer: {pkg.installer or 'unknown'}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"First Installed: {pkg.first_install_time}").pack(anchor=tk.W)
+        
+        # Storage from the last size collection
+        if pkg.code_size or pkg.data_size or pkg.cache_size:
+            ttk.Label(
+                info_frame,
+                text=f"Storage: code {format_size(pkg.code_size) or '0 B'}, "
+                     f"data {format_size(pkg.data_size) or '0 B'}, "
+                     f"cache {format_size(pkg.cache_size) or '0 B'} "
+                     f"(reclaimable {format_size(pkg.reclaimable_size) or '0 B'})"
+            ).pack(anchor=tk.W)
+        
+        # Resource usage from the last profiling
+        if pkg.impact:
+            ttk.Label(
+                info_frame,
+                text=f"Impact: {pkg.impact:.1f} (memory {pkg.memory_kb:,} KB, "
+                     f"CPU {pkg.cpu_ms / 1000:,.0f} s, wake locks {pkg.wakelock_ms / 1000:,.0f} s, "
+                     f"{pkg.wakeups:,} wakeups)"
+            ).pack(anchor=tk.W)
+        
+        # Shared libraries
+        if pkg.libraries:
+            lib_frame = ttk.LabelFrame(details, text="Uses Libraries")
+            lib_frame.pack(fill=tk.X, padx=5, pady=5)
+            for library in pkg.libraries:
+                ttk.Label(lib_frame, text=library).pack(anchor=tk.W)
+        
         # Dependencies
         if pkg.dependencies:
             dep_frame = ttk.LabelFrame(details, text="Dependencies")
@@ -284,23 +737,41 @@ class PackageListFrame(ttk.Frame):
             f"Are you sure you want to remove {pkg.name}?\n\n" +
             "This will uninstall the package from your device."
         ):
-            if self.package_manager.remove_package(pkg.name):
-                messagebox.showinfo("Success", f"Package {pkg.name} removed successfully")
-                self._load_packages()
-            else:
-                messagebox.showerror("Error", f"Failed to remove package {pkg.name}")
+            def work(report: ProgressReport, cancel: threading.Event) -> BatchResult:
+                return self.package_manager.remove_packages([pkg.name], cancel=cancel)
+            
+            self.jobs.start(
+                f"Removing {pkg.name}",
+                work,
+                lambda result: self._show_package_result(result, pkg.name, "removed", "remove")
+            )
+    
+    def _show_package_result(self, result: BatchResult, name: str,
+                             done_verb: str, verb: str) -> None:
+        """Report the outcome of a single-package operation and refresh the list
+        
+        Args:
+            result: Report of the operation
+            name: Package the operation was run for
+            done_verb: Past tense of the operation (e.g. "removed")
+            verb: The operation (e.g. "remove")
+        """
+        if result.results[0].success:
+            messagebox.showinfo("Success", f"Package {name} {done_verb} successfully")
+        else:
+            messagebox.showerror("Error", f"Failed to {verb} package {name}")
+        self._load_packages()
     
     def _remove_selected(self) -> None:
         """Remove all selected packages"""
-        selection = self.tree.selection()
+        selection = self._selected_names()
         if not selection:
             messagebox.showwarning("Warning", "No packages selected")
             return
             
         # Get selected packages
         packages = []
-        for item in selection:
-            pkg_name = self.tree.item(item)["values"][0]
+        for pkg_name in selection:
             pkg = self.package_manager.packages[pkg_name]
             if pkg.safety_status == SafetyStatus.ESSENTIAL:
                 messagebox.showwarning(
@@ -310,27 +781,60 @@ class PackageListFrame(ttk.Frame):
                 return
             packages.append(pkg)
             
+        # Check dependencies: dependents still on the device go too
+        plan = self.package_manager.plan_removal([pkg.name for pkg in packages], expand=True)
+        if plan.blocked:
+            messagebox.showwarning(
+                "Warning",
+                "Cannot remove:\n" + "\n".join(
+                    f"{name}: {reason}" for name, reason in plan.blocked.items()
+                )
+            )
+            return
+        extra = ""
+        if plan.added:
+            extra = (f"\n\n{len(plan.added)} dependent packages will also be removed:\n" +
+                     "\n".join(plan.added[:10]) + ("\n..." if len(plan.added) > 10 else ""))
+        
         # Confirm removal
         if not messagebox.askyesno(
             "Confirm Removal",
             f"Remove {len(packages)} selected packages?\n\n" +
-            "This will uninstall these packages from your device."
+            "This will uninstall these packages from your device." + extra
         ):
             return
             
-        # Remove packages
-        success = []
-        failed = []
-        for pkg in packages:
-            if self.package_manager.remove_package(pkg.name):
-                success.append(pkg.name)
-            else:
-                failed.append(pkg.name)
-                
+        # Remove packages in one batch on the worker thread
+        names = plan.packages
+        
+        def work(report: ProgressReport, cancel: threading.Event) -> BatchResult:
+            def progress(result: PackageResult, completed: int, total: int) -> None:
+                report(completed, total, f"Removing {completed}/{total}")
+            return self.package_manager.remove_packages(names, progress=progress, cancel=cancel)
+        
+        self.jobs.start(
+            f"Removing {len(names)} packages",
+            work,
+            lambda result: self._show_batch_result(result, "removed", "remove")
+        )
+    
+    def _show_batch_result(self, result: BatchResult, done_verb: str, verb: str) -> None:
+        """Report the outcome of a bulk operation and refresh the list
+        
+        Args:
+            result: Report of the batch operation
+            done_verb: Past tense of the operation (e.g. "removed")
+            verb: The operation (e.g. "remove")
+        """
+        success = result.succeeded
+        failed = result.failed
+        
         # Show results
-        message = f"Successfully removed {len(success)} packages"
+        message = f"Successfully {done_verb} {len(success)} packages"
         if failed:
-            message += f"\nFailed to remove {len(failed)} packages"
+            message += f"\nFailed to {verb} {len(failed)} packages"
+        if result.cancelled:
+            message += f"\nCancelled before {len(result.cancelled)} packages"
             
         if success:
             messagebox.showinfo("Operation Complete", message)
@@ -341,15 +845,14 @@ class PackageListFrame(ttk.Frame):
     
     def _restore_selected(self) -> None:
         """Restore all selected packages"""
-        selection = self.tree.selection()
+        selection = self._selected_names()
         if not selection:
             messagebox.showwarning("Warning", "No packages selected")
             return
             
         # Get selected packages
         packages = []
-        for item in selection:
-            pkg_name = self.tree.item(item)["values"][0]
+        for pkg_name in selection:
             pkg = self.package_manager.packages[pkg_name]
             if pkg.state != PackageState.REMOVED:
                 messagebox.showwarning(
@@ -366,26 +869,19 @@ class PackageListFrame(ttk.Frame):
         ):
             return
             
-        # Restore packages
-        success = []
-        failed = []
-        for pkg in packages:
-            if self.package_manager.restore_package(pkg.name):
-                success.append(pkg.name)
-            else:
-                failed.append(pkg.name)
-                
-        # Show results
-        message = f"Successfully restored {len(success)} packages"
-        if failed:
-            message += f"\nFailed to restore {len(failed)} packages"
-            
-        if success:
-            messagebox.showinfo("Operation Complete", message)
-        else:
-            messagebox.showerror("Operation Failed", message)
+        # Restore packages in one batch on the worker thread
+        names = [pkg.name for pkg in packages]
+        
+        def work(report: ProgressReport, cancel: threading.Event) -> BatchResult:
+            def progress(result: PackageResult, completed: int, total: int) -> None:
+                report(completed, total, f"Restoring {completed}/{total}")
+            return self.package_manager.restore_packages(names, progress=progress, cancel=cancel)
             
-        self._load_packages()
+        self.jobs.start(
+            f"Restoring {len(names)} packages",
+            work,
+            lambda result: self._show_batch_result(result, "restored", "restore")
+        )
     
     def _restore_package(self, pkg: Package) -> None:
         """Restore selected package
@@ -397,11 +893,14 @@ class PackageListFrame(ttk.Frame):
             "Confirm Restore",
             f"Are you sure you want to restore {pkg.name}?"
         ):
-            if self.package_manager.restore_package(pkg.name):
-                messagebox.showinfo("Success", f"Package {pkg.name} restored successfully")
-                self._load_packages()
-            else:
-                messagebox.showerror("Error", f"Failed to restore package {pkg.name}")
+            def work(report: ProgressReport, cancel: threading.Event) -> BatchResult:
+                return self.package_manager.restore_packages([pkg.name], cancel=cancel)
+            
+            self.jobs.start(
+                f"Restoring {pkg.name}",
+                work,
+                lambda result: self._show_package_result(result, pkg.name, "restored", "restore")
+            )
 
 
 class DebloatGUI:
@@ -416,6 +915,20 @@ class DebloatGUI:
         # Initialize package manager
         self.package_manager = PackageManager()
         
+        # Status bar with background job progress
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var = tk.StringVar()
+        status_bar = ttk.Label(
+            status_frame,
+            textvariable=self.status_var,
+            relief=tk.SUNKEN,
+            anchor=tk.W
+        )
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.jobs = JobPanel(status_frame, self.package_manager.metrics)
+        self.jobs.pack(side=tk.RIGHT)
+        
         # Create main frame
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -449,19 +962,56 @@ class DebloatGUI:
         )
         scan_btn.pack(side=tk.LEFT, padx=5)
         
+        # Harvest package metadata button
+        details_btn = ttk.Button(
+            toolbar,
+            text="Load Details",
+            command=self._harvest_metadata
+        )
+        details_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Resource profiling button
+        profile_btn = ttk.Button(
+            toolbar,
+            text="Profile Resources",
+            command=self._profile_resources
+        )
+        profile_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Export adb command metrics button
+        metrics_btn = ttk.Button(
+            toolbar,
+            text="Export Metrics",
+            command=self._export_metrics
+        )
+        metrics_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Live package change watching
+        self.watcher: Optional[PackageWatcher] = None
+        self._watch_events: "queue.Queue[Any]" = queue.Queue()
+        self._watch_after: Optional[str] = None
+        self.watch_var = tk.BooleanVar(value=False)
+        watch_check = ttk.Checkbutton(
+            toolbar,
+            text="Watch Device",
+            variable=self.watch_var,
+            command=self._toggle_watch
+        )
+        watch_check.pack(side=tk.LEFT, padx=5)
+        self.enforce_var = tk.BooleanVar(value=False)
+        enforce_check = ttk.Checkbutton(
+            toolbar,
+            text="Re-remove Reinstalled",
+            variable=self.enforce_var
+        )
+        enforce_check.pack(side=tk.LEFT, padx=5)
+        
         # Add package list
-        self.package_list = PackageListFrame(main_frame, self.package_manager)
+        self.package_list = PackageListFrame(main_frame, self.package_manager, self.jobs)
         self.package_list.pack(fill=tk.BOTH, expand=True)
         
-        # Status bar
-        self.status_var = tk.StringVar()
-        status_bar = ttk.Label(
-            self.root,
-            textvariable=self.status_var,
-            relief=tk.SUNKEN,
-            anchor=tk.W
-        )
-        status_bar.pack(fill=tk.X)
+        # Close the adb shell session together with the window
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         
         # Check initial device connection
         self._check_device_connection()
@@ -485,13 +1035,13 @@ class DebloatGUI:
                 
             # Check for connected devices
             output = self.package_manager._execute_adb(['devices'])
-            devices = [
-                line.split()[0] for line in output.splitlines()[1:]
-                if line.strip() and not line.strip().startswith('*')
-            ]
+            devices = [serial for serial, _ in parse_devices(output)]
             
             if devices:
-                self.connection_var.set(f"Connected: {devices[0]}")
+                status = f"Connected: {devices[0]}"
+                if len(devices) > 1:
+                    status += f" (+{len(devices) - 1} more)"
+                self.connection_var.set(status)
                 return True
             else:
                 self.connection_var.set("No device connected")
@@ -528,46 +1078,220 @@ class DebloatGUI:
             messagebox.showerror("Error", "No device connected")
             return
             
-        try:
-            installed_packages = self.package_manager.get_installed_packages()
-            
-            # Package scanning and state determination is now handled by get_installed_packages()
-            # We don't need to modify packages here as they're already properly updated
-            
-            # Save updated package database
-            self.package_manager.save_package_db()
-            
-            # Write scan results to file
-            self._write_scan_results(installed_packages)
+        def work(report: ProgressReport, cancel: threading.Event) -> Dict[str, PackageState]:
+            # Only the device listing runs here; the package list, DB and
+            # search index are updated in _scan_finished on the Tk thread,
+            # which reads them while the job runs
+            return self.package_manager.list_package_states(cancel=cancel)
             
-            # Refresh display
-            self.package_list._load_packages()
-            self._update_status()
-            
-            messagebox.showinfo(
-                "Success",
-                f"Found {len(installed_packages)} installed packages"
-            )
-            
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror(
-                "Error",
-                f"Failed to scan packages: {str(e)}"
+        self.jobs.start("Scanning packages", work, self._scan_finished, self._scan_failed)
+    
+    def _scan_finished(self, states: Dict[str, PackageState]) -> None:
+        """Apply a completed scan and show its results
+        
+        Args:
+            states: State of every package the device listed
+        """
+        diff = self.package_manager.apply_listing(states)
+        
+        # Write scan results to file
+        self._write_scan_results(diff.listed, diff)
+        
+        # Refresh only the rows that changed
+        if not diff.unchanged:
+            self.package_list._update_packages(diff.touched)
+        self._update_status()
+        
+        # New packages also get their metadata and sizes
+        if diff.added:
+            self._harvest_metadata()
+        
+        messagebox.showinfo(
+            "Success",
+            f"Found {len(diff.listed)} installed packages\n{diff.summary()}"
+        )
+    
+    def _harvest_metadata(self) -> None:
+        """Load version, install, library and storage details for all packages"""
+        if not self._check_device_connection():
+            messagebox.showerror("Error", "No device connected")
+            return
+        
+        def work(report: ProgressReport, cancel: threading.Event) -> List[str]:
+            changed = set(self.package_manager.harvest_metadata(cancel=cancel))
+            report(0, 0, "Measuring package sizes")
+            changed.update(self.package_manager.collect_sizes(cancel=cancel))
+            return sorted(changed)
+        
+        def done(changed: List[str]) -> None:
+            self.package_list._update_packages(changed)
+            reclaimable = format_size(self.package_manager.reclaimable_size()) or "0 B"
+            self.status_var.set(
+                f"Loaded details for {len(changed)} packages | Reclaimable: {reclaimable}"
             )
+        
+        self.jobs.start("Loading package details", work, done, self._scan_failed)
+    
+    def _profile_resources(self) -> None:
+        """Measure memory, CPU, wake lock and wakeup cost of all packages"""
+        if not self._check_device_connection():
+            messagebox.showerror("Error", "No device connected")
+            return
+        
+        def work(report: ProgressReport, cancel: threading.Event) -> List[str]:
+            return self.package_manager.profile_resources(cancel=cancel)
+        
+        def done(changed: List[str]) -> None:
+            self.package_list._update_packages(changed)
+            top = self.package_manager.get_removable_packages(by_impact=True)[:3]
+            message = f"Profiled {len(changed)} packages"
+            if top and top[0].impact:
+                message += " | Costliest removable: " + ", ".join(
+                    f"{pkg.name} ({pkg.impact:.1f})" for pkg in top
+                )
+            self.status_var.set(message)
+        
+        self.jobs.start("Profiling resources", work, done, self._scan_failed)
     
-    def _write_scan_results(self, installed_packages: List[str]) -> None:
+    def _export_metrics(self) -> None:
+        """Save the adb command metrics as JSON or Prometheus text"""
+        path = filedialog.asksaveasfilename(
+            title="Export ADB Metrics",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus text", "*.prom")]
+        )
+        if not path:
+            return
+        metrics = self.package_manager.metrics
+        text = metrics.to_prometheus() if path.endswith(".prom") else metrics.to_json()
+        try:
+            Path(path).write_text(text, encoding='utf-8')
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export metrics: {str(e)}")
+            return
+        self.status_var.set(f"Metrics exported to {path}")
+    
+    def _toggle_watch(self) -> None:
+        """Start or stop following package changes on the device"""
+        if not self.watch_var.get():
+            self._stop_watch()
+            self.status_var.set("Stopped watching the device")
+            return
+        if not self._check_device_connection():
+            self.watch_var.set(False)
+            messagebox.showerror("Error", "No device connected")
+            return
+        # The watcher thread only reads the device; its listings are applied
+        # on the Tk thread by _poll_watch_events
+        self.watcher = PackageWatcher(
+            self.package_manager,
+            on_error=self._watch_events.put,
+            can_poll=lambda: not self.jobs.busy,
+            on_listing=self._watch_events.put,
+            generation=lambda: self.jobs.started
+        )
+        self.watcher.start()
+        self.status_var.set("Watching the device for package changes")
+        self._poll_watch_events()
+    
+    def _stop_watch(self) -> None:
+        """Stop the watcher and its event polling"""
+        if self._watch_after is not None:
+            self.root.after_cancel(self._watch_after)
+            self._watch_after = None
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        # Unapplied listings are dropped; a new watcher starts with a full listing
+        self._watch_events = queue.Queue()
+    
+    def _poll_watch_events(self) -> None:
+        """Apply the listings the watcher read since the last call
+        
+        Listings wait while a job runs, as its worker may be reading the
+        packages. A listing whose check started before the latest job is
+        dropped, as applying it would undo the states the job wrote.
+        """
+        while not self.jobs.busy:
+            try:
+                event = self._watch_events.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(event, PackageListing):
+                if event.generation != self.jobs.started:
+                    self.watcher.resync()
+                    continue
+                applied = self.watcher.apply(event)
+                if applied is not None:
+                    self._show_watch_event(applied)
+            else:
+                self.status_var.set(f"Watching failed: {str(event)}")
+        self._watch_after = self.root.after(500, self._poll_watch_events)
+    
+    def _show_watch_event(self, event: WatchEvent) -> None:
+        """Refresh changed rows, report the change and re-remove reinstalled packages
+        
+        Args:
+            event: Changes applied from the watcher's listing
+        """
+        self.package_list._update_packages(event.diff.touched)
+        message = f"Device changed: {event.diff.summary()}"
+        if event.reinstalled:
+            message += f" | {len(event.reinstalled)} removed packages reinstalled"
+        self.status_var.set(message)
+        if not event.reinstalled or not self.enforce_var.get():
+            return
+        
+        names = event.reinstalled
+        
+        def work(report: ProgressReport, cancel: threading.Event) -> BatchResult:
+            return self.package_manager.remove_packages(names, cancel=cancel)
+        
+        def done(result: BatchResult) -> None:
+            self.package_list._update_packages(names)
+            self.status_var.set(f"{message} | re-removed {len(result.succeeded)} reinstalled")
+        
+        self.jobs.start("Re-removing reinstalled packages", work, done)
+    
+    def _scan_failed(self, error: Exception) -> None:
+        """Report a scan that failed or was cancelled
+        
+        Args:
+            error: Exception raised by the scan
+        """
+        if isinstance(error, OperationCancelled):
+            self.status_var.set("Scan cancelled")
+            return
+        messagebox.showerror(
+            "Error",
+            f"Failed to scan packages: {str(error)}"
+        )
+    
+    def _write_scan_results(self, installed_packages: List[str],
+                            diff: Optional[ScanDiff] = None) -> None:
         """Write scan results to output file
         
         Args:
             installed_packages: List of package names found on device
+            diff: Changes found by the scan, written as a change report
         """
         from datetime import datetime
         
         output = []
         output.append("# Android Package Scan Results\n")
         output.append(f"Scan Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        reclaimable = self.package_manager.reclaimable_size()
+        if reclaimable:
+            output.append(f"Reclaimable Storage (safe to remove): {format_size(reclaimable)}\n")
         output.append(f"Total Packages Found: {len(installed_packages)}\n\n")
         
+        if diff is not None:
+            summary, *changes = diff.report()
+            output.append("## Changes Since Last Scan\n")
+            output.append(f"{summary}\n")
+            output.extend(f"- `{line}`\n" for line in changes)
+            output.append("\n")
+        
         # Group packages by category
         packages_by_category = {}
         for pkg_name in installed_packages:
@@ -584,6 +1308,10 @@ class DebloatGUI:
                 output.append(f"  - Description: {pkg.description}\n")
                 output.append(f"  - Safety Status: {pkg.safety_status.name}\n")
                 output.append(f"  - State: {pkg.state.name}\n")
+                if pkg.code_size or pkg.data_size or pkg.cache_size:
+                    output.append(f"  - Size: code {format_size(pkg.code_size) or '0 B'}, "
+                                  f"data {format_size(pkg.data_size) or '0 B'}, "
+                                  f"cache {format_size(pkg.cache_size) or '0 B'}\n")
             output.append("\n")
             
         # Write to file
@@ -594,12 +1322,29 @@ class DebloatGUI:
         """Update status bar with package counts"""
         total = len(self.package_manager.packages)
         removed = len(self.package_manager.get_removed_packages())
+        reclaimable = format_size(self.package_manager.reclaimable_size()) or "0 B"
         self.status_var.set(
             f"Total Packages: {total} | " +
             f"Removed: {removed} | " +
-            f"Installed: {total - removed}"
+            f"Installed: {total - removed} | " +
+            f"Reclaimable: {reclaimable}"
         )
     
+    def _on_close(self) -> None:
+        """Release device resources and close the window
+        
+        A running job is cancelled and the window hidden; the package manager
+        is only closed once the job's worker has finished with it.
+        """
+        self.jobs.abandon()
+        self._stop_watch()
+        if self.jobs.busy:
+            self.root.withdraw()
+            self.root.after(JobPanel.POLL_MS, self._on_close)
+            return
+        self.package_manager.close()
+        self.root.destroy()
+    
     def run(self) -> None:
         """Start the GUI application"""
         self.root.mainloop()
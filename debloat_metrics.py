@@ -0,0 +1,242 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+import bisect
+import json
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" values)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Shell command keywords identifying a command type, checked in order
+_KINDS = [
+    ('__DEBLOAT_SCAN__', 'list'),
+    ('__DEBLOAT_SIZES__', 'sizes'),
+    ('__DEBLOAT_PROFILE__', 'profile'),
+    ('pm list packages', 'list'),
+    ('pm uninstall', 'uninstall'),
+    ('install-existing', 'install-existing'),
+    ('dumpsys package', 'dumpsys'),
+    ('cmd overlay', 'overlay'),
+]
+
+
+def command_kind(command: Sequence[str]) -> str:
+    """Classify an adb command for aggregation
+    
+    Args:
+        command: adb arguments, e.g. ``['shell', 'pm list packages -u']``
+    
+    Returns:
+        'devices', 'list', 'sizes', 'profile', 'uninstall',
+        'install-existing', 'dumpsys', 'overlay', 'shell' for other shell
+        commands, or the adb subcommand
+    """
+    if not command:
+        return 'unknown'
+    if command[0] != 'shell':
+        return command[0]
+    text = ' '.join(command[1:])
+    for keyword, kind in _KINDS:
+        if keyword in text:
+            return kind
+    return 'shell'
+
+
+@dataclass
+class CommandRecord:
+    """One finished adb command"""
+    kind: str
+    serial: str
+    started: float            # time.time() when the command started
+    seconds: float            # Wall time
+    output_bytes: int
+    exit_status: Optional[int]  # None if the caller stopped reading early
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+    
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Initialize an empty histogram
+        
+        Args:
+            bounds: Ascending bucket upper bounds; an implicit +Inf bucket follows
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        """Add one observation"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations at or below it) pairs, ending with +Inf"""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower = 0.0
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.bounds[-1]
+
+
+class _Series:
+    """Counters and latency histogram of one (command type, serial) pair"""
+    
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.failed = 0
+        self.aborted = 0
+        self.output_bytes = 0
+
+
+class AdbMetrics:
+    """Thread-safe recorder and aggregator of adb command metrics
+    
+    Every command is kept in a bounded list of recent records and folded
+    into per (command type, serial) counters and latency histograms, which
+    can be exported as JSON or Prometheus text.
+    """
+    
+    def __init__(self, recent: int = 1000) -> None:
+        """Initialize an empty recorder
+        
+        Args:
+            recent: Number of individual command records to keep
+        """
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self.recent: Deque[CommandRecord] = deque(maxlen=recent)
+    
+    def record(self, command: Sequence[str], serial: Optional[str], seconds: float,
+               output_bytes: int, exit_status: Optional[int]) -> None:
+        """Record a finished command
+        
+        Args:
+            command: adb arguments
+            serial: Device serial, or None for adb's default device
+            seconds: Wall time
+            output_bytes: Size of the output read
+            exit_status: Exit status, or None if the output was not read to the end
+        """
+        kind = command_kind(command)
+        entry = CommandRecord(kind, serial or "", time.time() - seconds, seconds,
+                              output_bytes, exit_status)
+        with self._lock:
+            self.recent.append(entry)
+            series = self._series.get((kind, entry.serial))
+            if series is None:
+                series = self._series[(kind, entry.serial)] = _Series()
+            series.latency.observe(seconds)
+            series.output_bytes += output_bytes
+            if exit_status is None:
+                series.aborted += 1
+            elif exit_status != 0:
+                series.failed += 1
+    
+    def mark(self) -> Dict[str, Tuple[int, float]]:
+        """Snapshot of the (count, total seconds) per command type, for summary()"""
+        totals: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for (kind, _), series in self._series.items():
+                count, seconds = totals.get(kind, (0, 0.0))
+                totals[kind] = (count + series.latency.count, seconds + series.latency.sum)
+        return totals
+    
+    def summary(self, since: Optional[Dict[str, Tuple[int, float]]] = None) -> str:
+        """Short text summary, e.g. ``3 adb commands, 1.24s (list 1x 0.81s, ...)``
+        
+        Args:
+            since: Result of an earlier mark(); only later commands are counted
+        """
+        since = since or {}
+        parts = []
+        total_count = 0
+        total_seconds = 0.0
+        for kind, (count, seconds) in sorted(self.mark().items()):
+            before_count, before_seconds = since.get(kind, (0, 0.0))
+            count -= before_count
+            seconds -= before_seconds
+            if count:
+                parts.append(f"{kind} {count}x {seconds:.2f}s")
+                total_count += count
+                total_seconds += seconds
+        if not total_count:
+            return "no adb commands"
+        return f"{total_count} adb commands, {total_seconds:.2f}s ({', '.join(parts)})"
+    
+    def to_json(self) -> str:
+        """Export the aggregates as a JSON document"""
+        series = []
+        with self._lock:
+            for (kind, serial), data in sorted(self._series.items()):
+                latency = data.latency
+                series.append({
+                    'kind': kind,
+                    'serial': serial,
+                    'count': latency.count,
+                    'failed': data.failed,
+                    'aborted': data.aborted,
+                    'output_bytes': data.output_bytes,
+                    'seconds_sum': round(latency.sum, 6),
+                    'seconds_p50': round(latency.quantile(0.5), 6),
+                    'seconds_p95': round(latency.quantile(0.95), 6),
+                    'buckets': {
+                        ('+Inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in latency.cumulative()
+                    }
+                })
+        return json.dumps({'commands': series}, indent=2)
+    
+    def to_prometheus(self) -> str:
+        """Export the aggregates in the Prometheus text exposition format"""
+        latency_lines = [
+            "# HELP debloat_adb_command_seconds Wall time of adb commands",
+            "# TYPE debloat_adb_command_seconds histogram",
+        ]
+        count_lines = [
+            "# HELP debloat_adb_commands_total adb commands by outcome",
+            "# TYPE debloat_adb_commands_total counter",
+        ]
+        byte_lines = [
+            "# HELP debloat_adb_output_bytes_total Output read from adb commands",
+            "# TYPE debloat_adb_output_bytes_total counter",
+        ]
+        with self._lock:
+            for (kind, serial), data in sorted(self._series.items()):
+                labels = f'kind="{kind}",serial="{serial}"'
+                latency = data.latency
+                for bound, count in latency.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    latency_lines.append(f'debloat_adb_command_seconds_bucket{{{labels},le="{le}"}} {count}')
+                latency_lines.append(f'debloat_adb_command_seconds_sum{{{labels}}} {latency.sum:.6f}')
+                latency_lines.append(f'debloat_adb_command_seconds_count{{{labels}}} {latency.count}')
+                succeeded = latency.count - data.failed - data.aborted
+                for outcome, count in (('ok', succeeded), ('failed', data.failed),
+                                       ('aborted', data.aborted)):
+                    count_lines.append(f'debloat_adb_commands_total{{{labels},outcome="{outcome}"}} {count}')
+                byte_lines.append(f'debloat_adb_output_bytes_total{{{labels}}} {data.output_bytes}')
+        return "\n".join(latency_lines + count_lines + byte_lines) + "\n"
+
+
+# Recorder shared by every PackageManager unless one is passed in
+default_metrics = AdbMetrics()
@@ -0,0 +1,211 @@
+from enum import Enum, auto
+from typing import Any, Iterable, Optional, Tuple
+import sys
+
+
+class PackageCategory(Enum):
+    """Categories for Android packages"""
+    SYSTEM = auto()
+    SAMSUNG = auto()
+    GOOGLE = auto()
+    CARRIER = auto()
+    THIRD_PARTY = auto()
+    UNKNOWN = auto()
+
+
+class SafetyStatus(Enum):
+    """Safety status for package removal"""
+    SAFE_TO_REMOVE = auto()
+    ESSENTIAL = auto()
+    CAUTION = auto()  # Removal may impact some features
+    UNKNOWN = auto()
+
+
+class PackageState(Enum):
+    """Current state of a package"""
+    INSTALLED = auto()
+    REMOVED = auto()
+    DISABLED = auto()
+
+
+# Enum members by code; a Package stores the three codes packed into one small int
+_CATEGORIES = tuple(PackageCategory)
+_SAFETY = tuple(SafetyStatus)
+_STATES = tuple(PackageState)
+_CODE = {member: code for members in (_CATEGORIES, _SAFETY, _STATES)
+         for code, member in enumerate(members)}
+
+# Shared by every package without dependencies, dependents or libraries
+EMPTY: Tuple[str, ...] = ()
+
+
+def _names(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Package or library names as an interned tuple (EMPTY when there are none)"""
+    return tuple(sys.intern(value) for value in values) if values else EMPTY
+
+
+class Package:
+    """Represents an Android package with metadata
+    
+    Packages are kept for every device of a fleet, so instances are slotted:
+    strings are interned (the same name, description or installer is shared
+    by all devices), the category, safety status and state are packed into
+    one small int, and name lists are tuples sharing one empty tuple.
+    """
+    
+    __slots__ = (
+        'name', 'description', '_codes', 'dependencies', 'dependents',
+        'version_name', 'version_code', 'uid', 'shared_user_id', 'apk_path',
+        'installer', 'first_install_time', 'libraries', 'code_size', 'data_size',
+        'cache_size', 'memory_kb', 'cpu_ms', 'wakelock_ms', 'wakeups', 'impact'
+    )
+    
+    # Attributes in constructor order, for __repr__, __eq__ and update()
+    FIELDS = (
+        'name', 'description', 'category', 'safety_status', 'state', 'dependencies',
+        'dependents', 'version_name', 'version_code', 'uid', 'shared_user_id', 'apk_path',
+        'installer', 'first_install_time', 'libraries', 'code_size', 'data_size', 'cache_size',
+        'memory_kb', 'cpu_ms', 'wakelock_ms', 'wakeups', 'impact'
+    )
+    
+    _STRINGS = frozenset(('name', 'description', 'version_name', 'shared_user_id',
+                          'apk_path', 'installer', 'first_install_time'))
+    _TUPLES = frozenset(('dependencies', 'dependents', 'libraries'))
+    
+    def __init__(self, name: str, description: str, category: PackageCategory,
+                 safety_status: SafetyStatus, state: PackageState,
+                 dependencies: Optional[Iterable[str]] = None,
+                 dependents: Optional[Iterable[str]] = None,
+                 version_name: str = "", version_code: int = 0, uid: int = 0,
+                 shared_user_id: str = "", apk_path: str = "", installer: str = "",
+                 first_install_time: str = "",
+                 libraries: Optional[Iterable[str]] = None,
+                 code_size: int = 0, data_size: int = 0, cache_size: int = 0,
+                 memory_kb: int = 0, cpu_ms: int = 0, wakelock_ms: int = 0,
+                 wakeups: int = 0, impact: float = 0.0) -> None:
+        """Initialize the package
+        
+        Args:
+            name: Package identifier (e.g. com.samsung.android.app.camera)
+            description: Package description
+            category: Package category
+            safety_status: Removal safety
+            state: Current state on the device
+            dependencies: Names of packages this package depends on
+            dependents: Names of packages that depend on this package
+            version_name: Version name from dumpsys package (empty until harvested)
+            version_code: Version code (0 until harvested)
+            uid: Linux user id (0 until harvested)
+            shared_user_id: Shared user, e.g. android.uid.system
+            apk_path: Install location (codePath)
+            installer: Installer package name
+            first_install_time: As printed by dumpsys, e.g. 2008-12-31 16:00:00
+            libraries: Shared libraries from uses-library entries
+            code_size: Bytes taken by the APKs and native code (0 until collected)
+            data_size: Bytes of app data
+            cache_size: Bytes of app cache
+            memory_kb: Memory (PSS) of the package's running processes (0 until profiled)
+            cpu_ms: CPU time since the last full charge
+            wakelock_ms: Partial wake lock time since the last full charge
+            wakeups: Wakeup alarms since the last full charge
+            impact: Resource score from 0 to 100 relative to the device's other packages
+        """
+        intern = sys.intern
+        self.name = intern(name)
+        self.description = intern(description)
+        self._codes = _CODE[category] | _CODE[safety_status] << 4 | _CODE[state] << 8
+        self.dependencies = _names(dependencies)
+        self.dependents = _names(dependents)
+        self.version_name = intern(version_name)
+        self.version_code = version_code
+        self.uid = uid
+        self.shared_user_id = intern(shared_user_id)
+        self.apk_path = intern(apk_path)
+        self.installer = intern(installer)
+        self.first_install_time = intern(first_install_time)
+        self.libraries = _names(libraries)
+        self.code_size = code_size
+        self.data_size = data_size
+        self.cache_size = cache_size
+        self.memory_kb = memory_kb
+        self.cpu_ms = cpu_ms
+        self.wakelock_ms = wakelock_ms
+        self.wakeups = wakeups
+        self.impact = impact
+    
+    @property
+    def category(self) -> PackageCategory:
+        """Package category"""
+        return _CATEGORIES[self._codes & 0xF]
+    
+    @category.setter
+    def category(self, value: PackageCategory) -> None:
+        self._codes = self._codes & ~0xF | _CODE[value]
+    
+    @property
+    def safety_status(self) -> SafetyStatus:
+        """Removal safety"""
+        return _SAFETY[self._codes >> 4 & 0xF]
+    
+    @safety_status.setter
+    def safety_status(self, value: SafetyStatus) -> None:
+        self._codes = self._codes & ~0xF0 | _CODE[value] << 4
+    
+    @property
+    def state(self) -> PackageState:
+        """Current state on the device"""
+        return _STATES[self._codes >> 8]
+    
+    @state.setter
+    def state(self, value: PackageState) -> None:
+        self._codes = self._codes & 0xFF | _CODE[value] << 8
+    
+    @property
+    def reclaimable_size(self) -> int:
+        """Bytes removing the package can free
+        
+        Data and cache always count; code only when it was installed on the
+        data partition (updates and user apps), as the system image is read-only.
+        """
+        size = self.data_size + self.cache_size
+        if self.apk_path.startswith('/data/'):
+            size += self.code_size
+        return size
+    
+    def update(self, **fields: Any) -> bool:
+        """Set attributes, interning strings and storing name lists as tuples
+        
+        Args:
+            fields: Attribute values by name
+        
+        Returns:
+            True if any attribute changed
+        """
+        changed = False
+        for attribute, value in fields.items():
+            if attribute in self._STRINGS:
+                value = sys.intern(value)
+            elif attribute in self._TUPLES:
+                value = _names(value)
+            if getattr(self, attribute) != value:
+                setattr(self, attribute, value)
+                changed = True
+        return changed
+    
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+    
+    __hash__ = None  # Mutable, like the dataclass it replaced
+    
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{self.__class__.__name__}({values})"
+    
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+    
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
@@ -0,0 +1,329 @@
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import argparse
+import json
+import math
+import platform
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from debloat_base import PackageManager
+
+# Version of the report file layout
+REPORT_FORMAT = 1
+
+# Tags the sections of the measurement scripts
+_MARKER = "__DEBLOAT_PERF__"
+
+# Seconds between app launches, so one launch's teardown does not slow the next
+LAUNCH_PAUSE = 2
+
+_MEM_AVAILABLE = re.compile(r'^MemAvailable:\s+(\d+) kB')
+_BOOT_EVENT = re.compile(r'boot_progress_enable_screen: \[?(\d+)')
+_TOTAL_TIME = re.compile(r'^TotalTime: (\d+)')
+_LAUNCH_SECTION = 'launch '
+
+# Metrics that improve when they grow; every other metric improves when it shrinks
+_HIGHER_IS_BETTER = {'mem_available_kb'}
+
+# Two-sided 95% critical values of Student's t distribution for 1-30
+# degrees of freedom; 1.96 (the normal value) is used beyond
+_T_CRITICAL = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+@dataclass
+class DeviceSample:
+    """Measurements of one benchmark run, taken after a reboot"""
+    boot_seconds: float                     # Reboot command to sys.boot_completed (host clock)
+    boot_enable_screen_ms: Optional[int]    # boot_progress_enable_screen event (device clock)
+    mem_available_kb: int                   # MemAvailable once the device settled
+    processes: int                          # Running processes once the device settled
+    launch_ms: Dict[str, int]               # App -> cold start TotalTime; failed launches are missing
+    
+    def metrics(self) -> Dict[str, float]:
+        """Flat metric name -> value, launch times as ``launch_ms:<app>``"""
+        values: Dict[str, float] = {
+            'boot_seconds': self.boot_seconds,
+            'mem_available_kb': self.mem_available_kb,
+            'processes': self.processes,
+        }
+        if self.boot_enable_screen_ms is not None:
+            values['boot_enable_screen_ms'] = self.boot_enable_screen_ms
+        for app, millis in self.launch_ms.items():
+            values[f'launch_ms:{app}'] = millis
+        return values
+
+
+def resolve_launchers(manager: PackageManager, apps: Sequence[str]) -> Dict[str, str]:
+    """Find the launcher activity of each app with one shell script
+    
+    Args:
+        manager: PackageManager of the device
+        apps: Package names, or components (``package/.Activity``) used as they are
+    
+    Returns:
+        App -> component; apps without a launcher activity are missing
+    """
+    components = {app: app for app in apps if '/' in app}
+    packages = [app for app in apps if '/' not in app]
+    if packages:
+        sections = manager._capture_sections(_MARKER, {
+            app: f'cmd package resolve-activity --brief -c android.intent.category.LAUNCHER {app}'
+            for app in packages
+        }, None, "Launcher lookup cancelled")
+        for app, lines in sections.items():
+            found = [line.strip() for line in lines if '/' in line]
+            if found:
+                components[app] = found[-1]
+    return components
+
+
+def measure(manager: PackageManager, components: Dict[str, str],
+            boot_seconds: float) -> DeviceSample:
+    """Measure memory, processes, the boot event and app launch times
+    
+    The device state is read with one script, then a second script cold
+    starts the apps (``am start -W -S``) one after another, pausing
+    LAUNCH_PAUSE seconds between them.
+    
+    Args:
+        manager: PackageManager of the device
+        components: App -> launcher component, see resolve_launchers()
+        boot_seconds: Boot time measured by the caller
+    
+    Returns:
+        DeviceSample of the current boot
+    """
+    state = manager._capture_sections(_MARKER, {
+        'meminfo': 'cat /proc/meminfo',
+        'ps': 'ps -A -o PID',
+        'events': 'logcat -b events -d -s boot_progress_enable_screen',
+    }, None, "Measurement cancelled")
+    available = 0
+    for line in state['meminfo']:
+        match = _MEM_AVAILABLE.match(line.strip())
+        if match:
+            available = int(match.group(1))
+    processes = sum(1 for line in state['ps'] if line.strip().isdigit())
+    boot_event = None
+    for line in state['events']:
+        match = _BOOT_EVENT.search(line)
+        if match:
+            boot_event = int(match.group(1))  # Last one is the current boot
+    
+    launch_ms: Dict[str, int] = {}
+    if components:
+        launches = manager._capture_sections(_MARKER, {
+            f'{_LAUNCH_SECTION}{app}':
+                f'am start -W -S -n {component} 2>&1; input keyevent 3; sleep {LAUNCH_PAUSE}'
+            for app, component in components.items()
+        }, None, "Measurement cancelled")
+        for section, lines in launches.items():
+            for line in lines:
+                match = _TOTAL_TIME.match(line.strip())
+                if match:
+                    launch_ms[section[len(_LAUNCH_SECTION):]] = int(match.group(1))
+    return DeviceSample(boot_seconds, boot_event, available, processes, launch_ms)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Any]:
+    """Descriptive statistics of one metric's runs"""
+    if not values:
+        return {'n': 0}
+    return {
+        'n': len(values),
+        'mean': round(statistics.fmean(values), 3),
+        'stdev': round(statistics.stdev(values), 3) if len(values) > 1 else None,
+        'median': round(statistics.median(values), 3),
+        'min': min(values),
+        'max': max(values),
+    }
+
+
+def _welch(before: Sequence[float], after: Sequence[float]) -> Tuple[Optional[float], bool]:
+    """Welch's t statistic and whether the difference is significant at 95%"""
+    if len(before) < 2 or len(after) < 2:
+        return None, False
+    difference = statistics.fmean(after) - statistics.fmean(before)
+    var_before = statistics.variance(before) / len(before)
+    var_after = statistics.variance(after) / len(after)
+    if var_before + var_after == 0:
+        return None, difference != 0
+    t = difference / math.sqrt(var_before + var_after)
+    df = (var_before + var_after) ** 2 / (
+        var_before ** 2 / (len(before) - 1) + var_after ** 2 / (len(after) - 1)
+    )
+    critical = _T_CRITICAL[max(int(df), 1) - 1] if df < len(_T_CRITICAL) + 1 else 1.96
+    return round(t, 3), abs(t) > critical
+
+
+def compare(before: List[DeviceSample], after: List[DeviceSample]) -> Dict[str, Dict[str, Any]]:
+    """Compare every metric between the baseline and the debloated runs
+    
+    Args:
+        before: Baseline samples
+        after: Samples after the removal
+    
+    Returns:
+        Metric -> before/after statistics, change of the means, Welch's t,
+        whether the change is significant at 95% and whether it is an improvement
+    """
+    names: Dict[str, None] = {}
+    for sample in before + after:
+        names.update(dict.fromkeys(sample.metrics()))
+    comparison = {}
+    for name in names:
+        old = [sample.metrics()[name] for sample in before if name in sample.metrics()]
+        new = [sample.metrics()[name] for sample in after if name in sample.metrics()]
+        entry: Dict[str, Any] = {'before': summarize(old), 'after': summarize(new)}
+        if old and new:
+            delta = statistics.fmean(new) - statistics.fmean(old)
+            mean_before = statistics.fmean(old)
+            entry['delta'] = round(delta, 3)
+            entry['change_pct'] = round(100 * delta / mean_before, 2) if mean_before else None
+            entry['t'], entry['significant'] = _welch(old, new)
+            entry['improved'] = delta > 0 if name in _HIGHER_IS_BETTER else delta < 0
+        comparison[name] = entry
+    return comparison
+
+
+def _run_series(manager: PackageManager, components: Dict[str, str], runs: int,
+                settle: float, boot_timeout: float,
+                progress: Callable[[str], None], label: str) -> List[DeviceSample]:
+    """Reboot and measure the device several times"""
+    samples = []
+    for run in range(runs):
+        progress(f"{label} run {run + 1}/{runs}: rebooting")
+        boot_seconds = manager.reboot(timeout=boot_timeout)
+        progress(f"{label} run {run + 1}/{runs}: booted in {boot_seconds:.1f}s, "
+                 f"settling for {settle:.0f}s")
+        time.sleep(settle)
+        samples.append(measure(manager, components, boot_seconds))
+    return samples
+
+
+def run_benchmark(manager: PackageManager, removals: List[str], apps: Sequence[str],
+                  runs: int = 3, settle: float = 30.0, boot_timeout: float = 300.0,
+                  restore: bool = False,
+                  progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Measure the device before and after removing packages
+    
+    Each run reboots the device, waits for the boot to complete and for
+    boot-time work to settle, then measures it. The baseline runs come
+    first, then the packages are removed in one batch and the runs repeat.
+    
+    Args:
+        manager: PackageManager of the device
+        removals: Packages to remove between the two series
+        apps: Apps to cold start in every run (see resolve_launchers)
+        runs: Runs per series
+        settle: Seconds to wait after each boot before measuring
+        boot_timeout: Seconds a reboot may take
+        restore: Restore the removed packages afterwards
+        progress: Called with a status message before each step
+    
+    Returns:
+        Report document with both series and their comparison
+    """
+    progress = progress or (lambda message: None)
+    manager.rescan()
+    components = resolve_launchers(manager, apps)
+    missing = [app for app in apps if app not in components]
+    if missing:
+        progress(f"No launcher activity for: {', '.join(missing)}")
+    
+    before = _run_series(manager, components, runs, settle, boot_timeout, progress, "Baseline")
+    progress(f"Removing {len(removals)} packages")
+    removal = manager.remove_packages(removals)
+    after = _run_series(manager, components, runs, settle, boot_timeout, progress, "Debloated")
+    if restore and removal.succeeded:
+        progress(f"Restoring {len(removal.succeeded)} packages")
+        manager.restore_packages(removal.succeeded)
+    
+    return {
+        'format': REPORT_FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'serial': manager.serial,
+        'host': platform.platform(),
+        'config': {'runs': runs, 'settle': settle, 'apps': list(apps), 'restore': restore},
+        'removal': {
+            'requested': len(removals),
+            'succeeded': removal.succeeded,
+            'failed': removal.failed,
+        },
+        'before': [asdict(sample) for sample in before],
+        'after': [asdict(sample) for sample in after],
+        'comparison': compare(before, after),
+    }
+
+
+def format_report(document: Dict[str, Any]) -> List[str]:
+    """Text table of a run_benchmark() comparison"""
+    removal = document['removal']
+    lines = [
+        f"Removed {len(removal['succeeded'])}/{removal['requested']} packages, "
+        f"{document['config']['runs']} runs per series",
+        f"{'metric':<40} {'before':>12} {'after':>12} {'change':>9}  significant",
+    ]
+    for name, entry in document['comparison'].items():
+        if 'delta' not in entry:
+            lines.append(f"{name:<40} {'(missing in one series)':>35}")
+            continue
+        change = f"{entry['change_pct']:+.1f}%" if entry['change_pct'] is not None else ""
+        verdict = "yes" if entry['significant'] else "no"
+        if entry['significant']:
+            verdict += " (better)" if entry['improved'] else " (worse)"
+        lines.append(f"{name:<40} {entry['before']['mean']:>12.1f} {entry['after']['mean']:>12.1f} "
+                     f"{change:>9}  {verdict}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the exit status"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark a device before and after removing packages (reboots the device)"
+    )
+    parser.add_argument('--serial', help="device serial, defaults to adb's only device")
+    parser.add_argument('--transport', choices=PackageManager.TRANSPORTS, default='session')
+    parser.add_argument('--db', type=Path, default=Path("package_db.sqlite3"))
+    parser.add_argument('--apps', nargs='*', default=[],
+                        help="packages or components to cold start in every run")
+    parser.add_argument('--remove', nargs='*', default=[], help="packages to remove")
+    parser.add_argument('--remove-file', type=Path, help="file listing packages to remove, one per line")
+    parser.add_argument('--removable', type=int, metavar='N',
+                        help="remove the N removable packages with the highest measured impact")
+    parser.add_argument('--runs', type=int, default=3, help="reboots per series")
+    parser.add_argument('--settle', type=float, default=30.0,
+                        help="seconds to wait after boot before measuring")
+    parser.add_argument('--boot-timeout', type=float, default=300.0)
+    parser.add_argument('--restore', action='store_true', help="restore the packages afterwards")
+    parser.add_argument('--output', type=Path, default=Path("perf_report.json"),
+                        help="file to write the report to")
+    args = parser.parse_args(argv)
+    
+    removals = list(args.remove)
+    if args.remove_file is not None:
+        removals += [line.strip() for line in args.remove_file.read_text(encoding='utf-8').splitlines()
+                     if line.strip() and not line.startswith('#')]
+    with PackageManager(db_path=args.db, transport=args.transport, serial=args.serial) as manager:
+        if args.removable:
+            removals += [pkg.name for pkg in manager.get_removable_packages(by_impact=True)[:args.removable]]
+        if not removals:
+            parser.error("nothing to remove: use --remove, --remove-file or --removable")
+        document = run_benchmark(manager, removals, args.apps, runs=args.runs, settle=args.settle,
+                                 boot_timeout=args.boot_timeout, restore=args.restore, progress=print)
+    args.output.write_text(json.dumps(document, indent=2), encoding='utf-8')
+    for line in format_report(document):
+        print(line)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Pattern, Set
+import fnmatch
+import json
+import re
+import threading
+from pathlib import Path
+from debloat_graph import DependencyGraph, RemovalPlan, plan_removal
+from debloat_model import Package, PackageCategory, PackageState, SafetyStatus
+from debloat_store import open_store
+
+if TYPE_CHECKING:
+    # Only annotations need the device code; planning stays offline
+    from debloat_base import BatchProgress, BatchResult, PackageManager
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Directory searched for profiles given by name instead of path
+PROFILE_DIR = Path("profiles")
+
+# Profile file suffixes, in lookup order
+PROFILE_SUFFIXES = ['.yaml', '.yml', '.json']
+
+# Rule keys, mapped to the enum their values name (None for free text)
+_RULE_KEYS = {
+    'categories': PackageCategory,
+    'safety': SafetyStatus,
+    'states': PackageState,
+    'patterns': None,
+    'packages': None,
+}
+
+_PROFILE_KEYS = {'name', 'description', 'include', 'exclude', 'expand'}
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _compile_pattern(pattern: str) -> Pattern[str]:
+    """Compile a glob, or a regular expression given as ``re:<expression>``"""
+    if pattern.startswith('re:'):
+        return re.compile(pattern[3:])
+    return re.compile(r'\A' + fnmatch.translate(pattern))
+
+
+@dataclass
+class ProfileRule:
+    """Package filter; a package matches when it meets every given criterion"""
+    categories: Set[PackageCategory] = field(default_factory=set)
+    safety: Set[SafetyStatus] = field(default_factory=set)
+    states: Set[PackageState] = field(default_factory=set)
+    patterns: List[Pattern[str]] = field(default_factory=list)
+    packages: Set[str] = field(default_factory=set)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProfileRule":
+        """Build a rule from its profile entry
+        
+        Args:
+            data: Mapping of rule key to a value or list of values
+        
+        Returns:
+            ProfileRule instance
+        
+        Raises:
+            ValueError: If a key or enum name is unknown, or a pattern is invalid
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"Profile rule must be a mapping: {data!r}")
+        rule = cls()
+        for key, value in data.items():
+            if key not in _RULE_KEYS:
+                raise ValueError(f"Unknown profile rule key: {key}")
+            values = [str(item) for item in _as_list(value)]
+            enum = _RULE_KEYS[key]
+            if enum is not None:
+                try:
+                    getattr(rule, key).update(enum[item.upper()] for item in values)
+                except KeyError as e:
+                    raise ValueError(f"Unknown {key} value in profile rule: {e.args[0]}")
+            elif key == 'patterns':
+                try:
+                    rule.patterns.extend(_compile_pattern(item) for item in values)
+                except re.error as e:
+                    raise ValueError(f"Invalid profile pattern: {e}")
+            else:
+                rule.packages.update(values)
+        return rule
+    
+    def matches(self, pkg: Package) -> bool:
+        """Whether a package meets every criterion of the rule"""
+        return ((not self.packages or pkg.name in self.packages)
+                and (not self.categories or pkg.category in self.categories)
+                and (not self.safety or pkg.safety_status in self.safety)
+                and (not self.states or pkg.state in self.states)
+                and (not self.patterns or any(p.search(pkg.name) for p in self.patterns)))
+
+
+@dataclass
+class Profile:
+    """Named, declarative package selection
+    
+    A profile file (YAML or JSON) holds a mapping such as::
+        
+        name: carrier-cleanup
+        description: Carrier apps and Samsung extras
+        include:
+          - categories: [CARRIER]
+            safety: [SAFE_TO_REMOVE, CAUTION]
+          - patterns: ['com.samsung.android.game.*', 're:\\.bixby\\.']
+          - packages: [com.facebook.katana]
+        exclude:
+          - packages: [com.samsung.android.game.gos]
+        expand: false
+    
+    Each include or exclude entry is a rule: rule keys must all match, any
+    value of a key may. A package is selected when an include rule matches
+    and no exclude rule does. Patterns are globs over the package name, or
+    regular expressions when prefixed with ``re:``. ``expand`` pulls
+    dependents into the plan instead of blocking their dependencies.
+    """
+    name: str
+    description: str = ""
+    include: List[ProfileRule] = field(default_factory=list)
+    exclude: List[ProfileRule] = field(default_factory=list)
+    expand: bool = False
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], name: str = "") -> "Profile":
+        """Build a profile from its parsed file contents
+        
+        Args:
+            data: Profile mapping
+            name: Name used when the mapping has none
+        
+        Returns:
+            Profile instance
+        
+        Raises:
+            ValueError: If the mapping is malformed
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Profile must be a mapping")
+        unknown = sorted(set(data) - _PROFILE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown profile keys: {', '.join(unknown)}")
+        return cls(
+            name=str(data.get('name') or name),
+            description=str(data.get('description') or ""),
+            include=[ProfileRule.from_dict(rule) for rule in _as_list(data.get('include'))],
+            exclude=[ProfileRule.from_dict(rule) for rule in _as_list(data.get('exclude'))],
+            expand=bool(data.get('expand', False))
+        )
+    
+    @property
+    def listed_packages(self) -> Set[str]:
+        """Package names the include rules list explicitly"""
+        return set().union(*(rule.packages for rule in self.include))
+    
+    def select(self, packages: Iterable[Package]) -> List[str]:
+        """Names of the packages the profile selects, sorted
+        
+        Args:
+            packages: Packages to filter
+        """
+        return sorted(
+            pkg.name for pkg in packages
+            if any(rule.matches(pkg) for rule in self.include)
+            and not any(rule.matches(pkg) for rule in self.exclude)
+        )
+
+
+def load_profile(path: Path) -> Profile:
+    """Load a profile from a YAML or JSON file
+    
+    Args:
+        path: Profile file; ``.yaml`` and ``.yml`` files are read as YAML,
+            anything else as JSON
+    
+    Returns:
+        Profile named after the file unless it sets a name
+    
+    Raises:
+        RuntimeError: If the file is YAML and PyYAML is not installed
+        ValueError: If the file is malformed
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix in ('.yaml', '.yml'):
+            if yaml is None:
+                raise RuntimeError("PyYAML is required for YAML profiles (pip install pyyaml)")
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Invalid profile {path}: {e}")
+        else:
+            data = json.load(f)
+    return Profile.from_dict(data, name=path.stem)
+
+
+def find_profile(name: str, directory: Optional[Path] = None) -> Path:
+    """Locate a profile given as a path or as a name in the profile directory
+    
+    Args:
+        name: File path, or profile name such as ``carrier-cleanup``
+        directory: Directory holding named profiles, defaults to PROFILE_DIR
+    
+    Returns:
+        Path of the profile file
+    
+    Raises:
+        FileNotFoundError: If no profile matches
+    """
+    path = Path(name)
+    if path.is_file():
+        return path
+    for suffix in PROFILE_SUFFIXES:
+        candidate = (directory or PROFILE_DIR) / f"{name}{suffix}"
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError(f"Profile not found: {name}")
+
+
+@dataclass
+class ProfilePlan:
+    """Exact removal a profile makes on one package snapshot"""
+    profile: str
+    expand: bool
+    removal: RemovalPlan          # Selected packages still on the device, in execution order
+    already_removed: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)  # Listed explicitly but unknown
+    by_category: Dict[str, int] = field(default_factory=dict)  # Packages to remove
+    by_safety: Dict[str, int] = field(default_factory=dict)
+    caution: List[str] = field(default_factory=list)  # Packages to remove that may break features
+    unknown: List[str] = field(default_factory=list)  # Packages to remove of unknown safety
+    reclaimable_size: int = 0     # Bytes the removal can free
+    impact: float = 0.0           # Summed impact scores of the packages to remove
+    
+    @property
+    def counts(self) -> Dict[str, int]:
+        """Number of packages in each part of the plan"""
+        return {
+            'selected': len(self.removal.requested) + len(self.already_removed),
+            'remove': len(self.removal.packages),
+            'added': len(self.removal.added),
+            'blocked': len(self.removal.blocked),
+            'already_removed': len(self.already_removed),
+            'missing': len(self.missing),
+        }
+
+
+def compile_profile(profile: Profile, packages: Dict[str, Package],
+                    graph: Optional[DependencyGraph] = None) -> ProfilePlan:
+    """Plan a profile against a package snapshot without device access
+    
+    The plan runs the same dependency and safety checks as
+    PackageManager.remove_packages, so applying it to a device whose
+    snapshot it was compiled from removes exactly the planned packages.
+    
+    Args:
+        profile: Profile to compile
+        packages: Package snapshot by name
+        graph: Dependency graph of the snapshot, built when not given
+    
+    Returns:
+        ProfilePlan with counts and a risk summary
+    """
+    selected = profile.select(packages.values())
+    already_removed = [name for name in selected if packages[name].state == PackageState.REMOVED]
+    requested = [name for name in selected if packages[name].state != PackageState.REMOVED]
+    removal = plan_removal(packages, graph or DependencyGraph.from_packages(packages),
+                           requested, profile.expand)
+    plan = ProfilePlan(profile.name, profile.expand, removal, already_removed,
+                       sorted(profile.listed_packages - packages.keys()))
+    for name in removal.packages:
+        pkg = packages[name]
+        plan.by_category[pkg.category.name] = plan.by_category.get(pkg.category.name, 0) + 1
+        plan.by_safety[pkg.safety_status.name] = plan.by_safety.get(pkg.safety_status.name, 0) + 1
+        if pkg.safety_status == SafetyStatus.CAUTION:
+            plan.caution.append(name)
+        elif pkg.safety_status == SafetyStatus.UNKNOWN:
+            plan.unknown.append(name)
+        plan.reclaimable_size += pkg.reclaimable_size
+        plan.impact += pkg.impact
+    return plan
+
+
+def compile_snapshot(profile: Profile, db_path: Path) -> ProfilePlan:
+    """Plan a profile against a stored package database
+    
+    Args:
+        profile: Profile to compile
+        db_path: Package database (SQLite, or JSON for a ``.json`` path)
+    
+    Returns:
+        ProfilePlan for the stored snapshot
+    
+    Raises:
+        FileNotFoundError: If the database does not exist
+    """
+    store = open_store(db_path, create=False)
+    try:
+        packages = store.load()
+    finally:
+        store.close()
+    return compile_profile(profile, packages)
+
+
+def apply_plan(manager: "PackageManager", plan: ProfilePlan,
+               progress: Optional["BatchProgress"] = None,
+               cancel: Optional[threading.Event] = None) -> "BatchResult":
+    """Execute a compiled plan on a device as one pipelined batch
+    
+    Args:
+        manager: PackageManager of the device the plan was compiled for
+        plan: Plan from compile_profile
+        progress: Optional callback invoked after each package
+        cancel: Optional event that stops the remaining packages when set
+    
+    Returns:
+        BatchResult of the removal; blocked packages are reported as failed
+    """
+    return manager.remove_packages(plan.removal.requested, progress, cancel, plan.expand)
+
+
+def apply_profile(manager: "PackageManager", profile: Profile,
+                  progress: Optional["BatchProgress"] = None,
+                  cancel: Optional[threading.Event] = None) -> "BatchResult":
+    """Compile a profile against a device's snapshot and execute it
+    
+    Args:
+        manager: Device's PackageManager
+        profile: Profile to apply
+        progress: Optional callback invoked after each package
+        cancel: Optional event that stops the remaining packages when set
+    
+    Returns:
+        BatchResult of the removal
+    """
+    return apply_plan(manager, compile_profile(profile, manager.packages, manager.graph),
+                      progress, cancel)
@@ -0,0 +1,289 @@
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+# Directory holding references.md and the optional references/ source lists
+REFERENCE_DIR = Path(__file__).resolve().parent
+
+# Compiled index shared by every working directory
+DEFAULT_INDEX_PATH = REFERENCE_DIR / "references_index.sqlite3"
+
+# Column headers of delimited lists, mapped to reference fields
+_HEADER_ALIASES = {
+    'app name': 'name',
+    'name': 'name',
+    'label': 'name',
+    'package name': 'package',
+    'package': 'package',
+    'id': 'package',
+    'extra information': 'description',
+    'description': 'description',
+    'safe to disable?': 'safe',
+    'safe': 'safe',
+    'removal': 'safe',
+}
+
+# Universal Android Debloater removal levels, as references.md safety values
+_UAD_REMOVAL = {
+    'recommended': 'Yes',
+    'advanced': 'Not Recommended',
+    'expert': 'Not Recommended',
+    'unsafe': 'No',
+}
+
+Reference = Dict[str, str]
+
+
+def _read_delimited(path: Path, delimiter: str) -> Iterator[Tuple[str, Reference]]:
+    """Read a list with a header row (references.md is tab separated)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        # Tab separated lists are not quoted; descriptions contain stray quotes
+        quoting = csv.QUOTE_NONE if delimiter == '\t' else csv.QUOTE_MINIMAL
+        rows = csv.reader(f, delimiter=delimiter, quoting=quoting)
+        header = next(rows, [])
+        fields = [_HEADER_ALIASES.get(column.strip().lower(), '') for column in header]
+        if 'package' not in fields:
+            # Unknown header: assume the references.md column order
+            fields = ['name', 'package', 'description', 'safe']
+        for row in rows:
+            values = dict(zip(fields, (value.strip() for value in row)))
+            package = values.pop('package', '')
+            values.pop('', None)
+            if package:
+                yield package, values
+
+
+def _read_uad(path: Path) -> Iterator[Tuple[str, Reference]]:
+    """Read a Universal Android Debloater JSON list (keyed or list form)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data.items() if isinstance(data, dict) else ((entry.get('id', ''), entry) for entry in data)
+    for package, entry in entries:
+        if not package:
+            continue
+        labels = entry.get('labels') or []
+        yield package, {
+            'name': labels[0] if labels else '',
+            'description': (entry.get('description') or '').strip(),
+            'safe': _UAD_REMOVAL.get(str(entry.get('removal', '')).lower(), ''),
+        }
+
+
+def read_source(path: Path) -> Iterator[Tuple[str, Reference]]:
+    """Read one reference list
+    
+    ``.md``/``.tsv`` files are tab separated, ``.csv`` comma separated (both
+    with a header row) and ``.json`` files use the Universal Android
+    Debloater format.
+    
+    Args:
+        path: Source list
+    
+    Yields:
+        (package name, {'name', 'description', 'safe'}) pairs
+    """
+    if path.suffix == '.json':
+        yield from _read_uad(path)
+    else:
+        yield from _read_delimited(path, ',' if path.suffix == '.csv' else '\t')
+
+
+def default_sources() -> List[Path]:
+    """references.md followed by any lists in the references/ directory"""
+    extra = REFERENCE_DIR / "references"
+    sources = [REFERENCE_DIR / "references.md"]
+    if extra.is_dir():
+        sources.extend(
+            path for path in sorted(extra.iterdir())
+            if path.suffix in ('.md', '.tsv', '.csv', '.json')
+        )
+    return sources
+
+
+class ReferenceIndex(Mapping[str, Reference]):
+    """Compiled reference database, keyed by package name
+    
+    The source lists are merged (earlier sources win, later ones only fill
+    empty fields) into an SQLite index file recording the format version and
+    each source's mtime, size and SHA-256. Nothing is opened until the first
+    lookup; the index is then memory-mapped and only recompiled when a source
+    was added, removed or its content changed. Lookups are cached.
+    """
+    
+    FORMAT_VERSION = 1
+    
+    def __init__(self, index_path: Optional[Path] = None,
+                 sources: Optional[List[Path]] = None) -> None:
+        """Initialize the index (no files are touched yet)
+        
+        Args:
+            index_path: Compiled index file, defaults to DEFAULT_INDEX_PATH next
+                to the sources
+            sources: Reference lists in precedence order, defaults to default_sources()
+        """
+        self.index_path = index_path or DEFAULT_INDEX_PATH
+        self.sources = sources if sources is not None else default_sources()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cache: Dict[str, Optional[Reference]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _fingerprint(path: Path, with_hash: bool) -> Dict[str, object]:
+        stat = path.stat()
+        fingerprint = {'path': str(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        if with_hash:
+            fingerprint['sha256'] = hashlib.sha256(path.read_bytes()).hexdigest()
+        return fingerprint
+    
+    def _stored_fingerprints(self, conn: sqlite3.Connection) -> Optional[List[Dict[str, object]]]:
+        """Source fingerprints of a compiled index, or None if it is unusable"""
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.DatabaseError:
+            return None
+        if meta.get('format') != str(self.FORMAT_VERSION):
+            return None
+        return json.loads(meta.get('sources', '[]'))
+    
+    def _is_current(self, conn: sqlite3.Connection) -> bool:
+        """Check a compiled index against the sources, refreshing moved mtimes
+        
+        Unchanged mtimes and sizes are trusted; otherwise the content hash
+        decides, so touching a file does not force a recompile.
+        """
+        stored = self._stored_fingerprints(conn)
+        existing = [path for path in self.sources if path.exists()]
+        if stored is None or [entry['path'] for entry in stored] != [str(path) for path in existing]:
+            return False
+        refreshed = []
+        for entry, path in zip(stored, existing):
+            current = self._fingerprint(path, with_hash=False)
+            if (current['mtime_ns'], current['size']) != (entry['mtime_ns'], entry['size']):
+                current = self._fingerprint(path, with_hash=True)
+                if current['sha256'] != entry['sha256']:
+                    return False
+            else:
+                current['sha256'] = entry['sha256']
+            refreshed.append(current)
+        if refreshed != stored:
+            with conn:
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'sources'", (json.dumps(refreshed),))
+        return True
+    
+    def compile(self) -> int:
+        """Merge the sources and write a fresh index file
+        
+        The index is built in a temporary file that replaces the old one, so
+        readers never see a half-written index.
+        
+        Returns:
+            Number of packages in the index
+        """
+        merged: Dict[str, Reference] = {}
+        origin: Dict[str, str] = {}
+        fingerprints = []
+        for path in self.sources:
+            if not path.exists():
+                continue
+            fingerprints.append(self._fingerprint(path, with_hash=True))
+            for package, reference in read_source(path):
+                entry = merged.setdefault(package, {'name': '', 'description': '', 'safe': ''})
+                origin.setdefault(package, path.name)
+                for key, value in reference.items():
+                    if value and not entry.get(key):
+                        entry[key] = value
+        if not fingerprints:
+            print("Warning: references.md not found")
+        
+        temporary = self.index_path.with_name(self.index_path.name + ".tmp")
+        if temporary.exists():
+            temporary.unlink()
+        conn = sqlite3.connect(str(temporary))
+        try:
+            with conn:
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                conn.execute(
+                    "CREATE TABLE refs (package TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                    "description TEXT NOT NULL, safe TEXT NOT NULL, source TEXT NOT NULL) WITHOUT ROWID"
+                )
+                conn.executemany(
+                    "INSERT INTO refs VALUES (?, ?, ?, ?, ?)",
+                    ((package, entry['name'], entry['description'], entry['safe'], origin[package])
+                     for package, entry in merged.items())
+                )
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ('format', str(self.FORMAT_VERSION)),
+                    ('sources', json.dumps(fingerprints)),
+                ])
+        finally:
+            conn.close()
+        os.replace(temporary, self.index_path)
+        return len(merged)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Open the index on first use, compiling it if missing or stale"""
+        if self._conn is None:
+            conn = None
+            if self.index_path.exists():
+                conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+                if not self._is_current(conn):
+                    conn.close()
+                    conn = None
+            if conn is None:
+                self.compile()
+                conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+            conn.execute("PRAGMA mmap_size = 16777216")
+            self._conn = conn
+        return self._conn
+    
+    def fingerprint(self) -> str:
+        """Identify the compiled content, compiling the index if it is stale
+        
+        Returns:
+            SHA-256 over the format version and the sources' content hashes;
+            it changes whenever a lookup could return something different
+        """
+        with self._lock:
+            sources = self._stored_fingerprints(self._connection()) or []
+        content = [self.FORMAT_VERSION, [entry['sha256'] for entry in sources]]
+        return hashlib.sha256(json.dumps(content).encode('utf-8')).hexdigest()
+    
+    def __getitem__(self, package: str) -> Reference:
+        try:
+            reference = self._cache[package]
+        except KeyError:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT name, description, safe FROM refs WHERE package = ?", (package,)
+                ).fetchone()
+            reference = dict(zip(('name', 'description', 'safe'), row)) if row else None
+            self._cache[package] = reference
+        if reference is None:
+            raise KeyError(package)
+        return reference
+    
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._connection().execute("SELECT package FROM refs ORDER BY package").fetchall()
+        return (row[0] for row in rows)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+    
+    def close(self) -> None:
+        """Close the index file"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+if __name__ == "__main__":
+    index = ReferenceIndex()
+    print(f"Compiled {index.compile()} packages into {index.index_path}")
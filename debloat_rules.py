@@ -0,0 +1,234 @@
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterable, List, Mapping, Optional, Tuple, TypeVar
+import hashlib
+import json
+import re
+from debloat_model import PackageCategory, SafetyStatus
+
+T = TypeVar('T')
+
+
+# Package name prefixes per category
+CATEGORY_PREFIXES: List[Tuple[str, PackageCategory]] = [
+    ("com.samsung.", PackageCategory.SAMSUNG),
+    ("com.sec.", PackageCategory.SAMSUNG),  # Samsung's other namespace
+    ("com.google.", PackageCategory.GOOGLE),
+    ("com.android.", PackageCategory.SYSTEM),
+    ("com.verizon.", PackageCategory.CARRIER),
+    ("com.vzw.", PackageCategory.CARRIER),
+    ("com.att.", PackageCategory.CARRIER),
+    ("com.sprint.", PackageCategory.CARRIER),
+    ("com.tmobile.", PackageCategory.CARRIER),
+    ("com.facebook.", PackageCategory.THIRD_PARTY),
+    ("com.microsoft.", PackageCategory.THIRD_PARTY),
+    ("com.spotify.", PackageCategory.THIRD_PARTY),
+    ("com.netflix.", PackageCategory.THIRD_PARTY),
+    ("com.amazon.", PackageCategory.THIRD_PARTY)
+]
+
+# Known essential packages (exact match)
+ESSENTIAL_PACKAGES = [
+    "com.samsung.android.kgclient",  # Knox - DO NOT DISABLE
+    "com.android.phone",             # Phone functionality
+    "com.android.systemui",          # System UI
+    "com.android.settings",          # Settings app
+    "com.android.providers.settings" # Settings provider
+]
+
+# Known caution packages (exact match)
+CAUTION_PACKAGES = [
+    "com.android.mms",              # MMS functionality
+    "com.samsung.advp.imssettings", # IMS Settings
+    ".knox.",                       # Knox security features
+    "com.samsung.android.messaging" # Default messaging
+]
+
+# Substrings that make removal risky
+CAUTION_PATTERNS = [
+    "provider",      # Content providers
+    "security",      # Security features
+    "permission",    # Permission handlers
+    "system",        # System components
+    "framework"      # Framework components
+]
+
+# Common safe-to-remove substrings
+SAFE_PATTERNS = [
+    "facebook",
+    "game",
+    "theme",
+    "wallpaper",
+    "sticker",
+    "widget",
+    "overlay",
+    "demo",
+    "test",
+    "sample",
+    "bixby",
+    "ar",           # AR features
+    "edge",         # Edge panels
+    "share"         # Sharing features
+]
+
+# Reference list "Safe To Disable?" values
+REFERENCE_SAFETY = {
+    'NO': SafetyStatus.ESSENTIAL,
+    'NOT RECOMMENDED': SafetyStatus.CAUTION,
+    'YES': SafetyStatus.SAFE_TO_REMOVE
+}
+
+
+def rules_fingerprint() -> str:
+    """SHA-256 of every classification rule table
+    
+    Stored classifications made under a different fingerprint are stale.
+    """
+    rules = [
+        [(prefix, category.name) for prefix, category in CATEGORY_PREFIXES],
+        ESSENTIAL_PACKAGES, CAUTION_PACKAGES, CAUTION_PATTERNS, SAFE_PATTERNS,
+        sorted((value, status.name) for value, status in REFERENCE_SAFETY.items()),
+    ]
+    return hashlib.sha256(json.dumps(rules).encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class Classification:
+    """Result of classifying a package name, with the rules that matched"""
+    category: PackageCategory
+    safety_status: SafetyStatus
+    category_rule: str = ""  # Matched prefix, empty if none matched
+    safety_rule: str = ""    # e.g. "reference:YES" or "caution:provider"
+
+
+class PrefixTrie(Generic[T]):
+    """Character trie answering longest-prefix lookups in O(len(key))"""
+    
+    def __init__(self, entries: Iterable[Tuple[str, T]] = ()) -> None:
+        """Initialize the trie
+        
+        Args:
+            entries: (prefix, value) pairs; the first value wins for duplicate prefixes
+        """
+        self._root: Dict[str, dict] = {}
+        for prefix, value in entries:
+            self.insert(prefix, value)
+    
+    def insert(self, prefix: str, value: T) -> None:
+        """Add a prefix unless it is already present"""
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, (prefix, value))
+    
+    def longest_match(self, key: str) -> Optional[Tuple[str, T]]:
+        """Find the longest stored prefix of a key
+        
+        Args:
+            key: String to match
+        
+        Returns:
+            (prefix, value) of the longest matching prefix, or None
+        """
+        node = self._root
+        match = node.get(None)
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(None, match)
+        return match
+
+
+def _compile_patterns(patterns: Iterable[str]) -> re.Pattern:
+    """Compile substrings into one alternation regex, longest first"""
+    ordered = sorted(set(patterns), key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in ordered))
+
+
+class PackageClassifier:
+    """Compiled category and safety rules for package names
+    
+    Rules are compiled once into a prefix trie (categories), exact-match
+    dicts and one combined regex per substring tier (safety), so each name
+    is classified in a single pass. Results are memoized per name.
+    """
+    
+    def __init__(self, reference_data: Optional[Mapping[str, Mapping[str, str]]] = None) -> None:
+        """Initialize the classifier
+        
+        Args:
+            reference_data: Reference entries keyed by package name (with a 'safe' value)
+        """
+        self.reference_data = reference_data if reference_data is not None else {}
+        self._categories: PrefixTrie[PackageCategory] = PrefixTrie(CATEGORY_PREFIXES)
+        self._exact: Dict[str, Tuple[SafetyStatus, str]] = {}
+        for name in CAUTION_PACKAGES:
+            self._exact[name] = (SafetyStatus.CAUTION, f"caution:{name}")
+        for name in ESSENTIAL_PACKAGES:
+            self._exact[name] = (SafetyStatus.ESSENTIAL, f"essential:{name}")
+        # Substring tiers in priority order
+        self._tiers = [
+            (_compile_patterns(CAUTION_PATTERNS), SafetyStatus.CAUTION, "caution"),
+            (_compile_patterns(SAFE_PATTERNS), SafetyStatus.SAFE_TO_REMOVE, "safe")
+        ]
+        self._cache: Dict[str, Classification] = {}
+    
+    def clear_cache(self) -> None:
+        """Forget memoized results (call after reference data changes)"""
+        self._cache.clear()
+    
+    def _classify_category(self, package_name: str) -> Tuple[PackageCategory, str]:
+        """Look up the category of a package name by prefix"""
+        match = self._categories.longest_match(package_name)
+        if match is None:
+            return PackageCategory.UNKNOWN, ""
+        prefix, category = match
+        return category, prefix
+    
+    def _classify_safety(self, package_name: str) -> Tuple[SafetyStatus, str]:
+        """Look up the safety status of a package name"""
+        # Check reference data first
+        reference = self.reference_data.get(package_name)
+        if reference is not None:
+            safe_value = reference['safe'].upper()
+            if safe_value in REFERENCE_SAFETY:
+                return REFERENCE_SAFETY[safe_value], f"reference:{safe_value}"
+        
+        if package_name in self._exact:
+            return self._exact[package_name]
+        
+        for regex, status, tier in self._tiers:
+            match = regex.search(package_name)
+            if match:
+                return status, f"{tier}:{match.group(0)}"
+        
+        return SafetyStatus.UNKNOWN, ""
+    
+    def classify(self, package_name: str) -> Classification:
+        """Classify a single package name
+        
+        Args:
+            package_name: Package identifier
+        
+        Returns:
+            Classification with category, safety status and matched rules
+        """
+        result = self._cache.get(package_name)
+        if result is None:
+            category, category_rule = self._classify_category(package_name)
+            safety, safety_rule = self._classify_safety(package_name)
+            result = Classification(category, safety, category_rule, safety_rule)
+            self._cache[package_name] = result
+        return result
+    
+    def classify_batch(self, package_names: Iterable[str]) -> Dict[str, Classification]:
+        """Classify many package names in one linear pass
+        
+        Args:
+            package_names: Package identifiers
+        
+        Returns:
+            Mapping of package name to Classification
+        """
+        classify = self.classify
+        return {name: classify(name) for name in package_names}
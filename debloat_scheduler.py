@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+import contextlib
+import random
+import re
+import subprocess
+import threading
+import time
+from debloat_adb_async import AdbProtocolError
+
+T = TypeVar('T')
+
+# Errors an adb command can end with, whatever the transport
+ADB_ERRORS = (subprocess.SubprocessError, AdbProtocolError, OSError)
+
+# Messages of failures that happen before a command reaches the device (or
+# when the connection drops) and usually clear up by themselves. An
+# unauthorized device needs the user and is deliberately not listed.
+_TRANSIENT = re.compile(
+    r"device offline|device '[^']*' not found|no devices/emulators found|"
+    r"device still (?:connecting|authorizing)|error: closed|protocol fault|"
+    r"connection reset|broken pipe|adb shell session terminated",
+    re.IGNORECASE
+)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed adb command is worth retrying
+    
+    Timeouts are not retried: a wedged device would only hang again.
+    
+    Args:
+        error: Exception raised by the command
+    
+    Returns:
+        True for connection-level failures such as "device offline"
+    """
+    if isinstance(error, subprocess.TimeoutExpired):
+        return False
+    if isinstance(error, ConnectionError):
+        return True
+    text = str(error)
+    if isinstance(error, subprocess.CalledProcessError):
+        for extra in (error.stderr, error.output):
+            if isinstance(extra, bytes):
+                extra = extra.decode('utf-8', 'replace')
+            text += f"\n{extra or ''}"
+    return bool(_TRANSIENT.search(text))
+
+
+class Watchdog:
+    """Calls a function once no progress was reported for a number of seconds
+    
+    Used to enforce idle timeouts on blocking reads: the reader calls kick()
+    after each line and the watchdog kills the process when the device
+    stops answering. Kicks only store a deadline, so they are cheap.
+    """
+    
+    def __init__(self, timeout: Optional[float], on_expire: Callable[[], None]) -> None:
+        """Start watching
+        
+        Args:
+            timeout: Seconds without a kick before on_expire is called, or
+                None for a watchdog that never fires
+            on_expire: Called once on the watchdog's own thread
+        """
+        self.timeout = timeout
+        self.expired = False
+        self._on_expire = on_expire
+        self._deadline = float('inf')
+        self._stopped = threading.Event()
+        if timeout is not None:
+            self.kick()
+            threading.Thread(target=self._watch, daemon=True).start()
+    
+    def kick(self) -> None:
+        """Report progress, restarting the timeout"""
+        if self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
+    
+    def pause(self) -> None:
+        """Stop the clock (e.g. while the caller processes a line) until the next kick"""
+        self._deadline = float('inf')
+    
+    def stop(self) -> None:
+        """Stop watching"""
+        self._stopped.set()
+    
+    def _watch(self) -> None:
+        while True:
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self._stopped.wait(min(remaining, self.timeout)):
+                return
+        self.expired = True
+        self._on_expire()
+    
+    def __enter__(self) -> "Watchdog":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter for transient adb failures"""
+    attempts: int = 4          # Total tries, including the first one
+    base_delay: float = 0.25   # Seconds before the first retry, doubled each time
+    max_delay: float = 8.0
+    
+    def delays(self, rng: Optional[random.Random] = None) -> Iterator[float]:
+        """Yield the wait before each retry
+        
+        Each delay is drawn between half and all of its exponential step
+        ("equal jitter"), so devices failing together do not retry in step.
+        """
+        rng = rng or random
+        for attempt in range(self.attempts - 1):
+            step = min(self.max_delay, self.base_delay * 2 ** attempt)
+            yield step / 2 + rng.uniform(0, step / 2)
+
+
+class CommandScheduler:
+    """Admission control, timeouts and retries for adb commands
+    
+    A command first takes one of its device's slots, then one of the global
+    in-flight slots, so a busy device never holds global slots while
+    waiting. One scheduler is normally shared by all PackageManagers, which
+    keeps a fleet operation at a steady number of commands in flight.
+    """
+    
+    def __init__(self, max_in_flight: int = 8, per_device: int = 2,
+                 timeout: Optional[float] = 60.0,
+                 retry: Optional[RetryPolicy] = None) -> None:
+        """Initialize the scheduler
+        
+        Args:
+            max_in_flight: Commands running at once across all devices
+            per_device: Commands running at once on one device
+            timeout: Default seconds a command may go without output, or None
+            retry: Backoff for transient failures, defaults to RetryPolicy()
+        """
+        self.max_in_flight = max_in_flight
+        self.per_device = per_device
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._devices: Dict[Optional[str], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+    
+    def _device_slots(self, serial: Optional[str]) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._devices.get(serial)
+            if slots is None:
+                slots = self._devices[serial] = threading.BoundedSemaphore(self.per_device)
+            return slots
+    
+    @contextlib.contextmanager
+    def slot(self, serial: Optional[str]) -> Iterator[None]:
+        """Hold a device slot and a global slot for the duration of a command
+        
+        Args:
+            serial: Device serial, or None for adb's default device
+        """
+        with self._device_slots(serial), self._in_flight:
+            yield
+    
+    def call(self, serial: Optional[str], attempt: Callable[[], T]) -> T:
+        """Run a command, retrying transient failures with backoff
+        
+        The slots are released while waiting between attempts.
+        
+        Args:
+            serial: Device serial, or None for adb's default device
+            attempt: Runs the command once
+        
+        Returns:
+            The result of the first successful attempt
+        
+        Raises:
+            The last attempt's exception if it is not transient or no retries are left
+        """
+        delays = self.retry.delays()
+        while True:
+            try:
+                with self.slot(serial):
+                    return attempt()
+            except ADB_ERRORS as e:
+                delay = next(delays, None)
+                if delay is None or not is_transient(e):
+                    raise
+            time.sleep(delay)
+
+
+# Scheduler shared by every PackageManager unless one is passed in
+default_scheduler = CommandScheduler()
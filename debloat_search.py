@@ -0,0 +1,148 @@
+from typing import Dict, Iterable, List, Optional, Set
+import re
+
+
+class SearchIndex:
+    """Trigram inverted index over package names, labels and descriptions
+    
+    A query is split into whitespace-separated terms and a package matches
+    when every term is a substring of its searchable text. Terms of three or
+    more characters are answered from the trigram postings (intersecting the
+    smallest lists first) and then verified, so lookups only touch packages
+    that share all of the term's trigrams.
+    """
+    
+    GRAM = 3
+    
+    def __init__(self) -> None:
+        """Initialize an empty index"""
+        self._docs: Dict[str, str] = {}    # package name -> lower-cased searchable text
+        self._labels: Dict[str, str] = {}  # package name -> lower-cased app label
+        self._postings: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._docs)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._docs
+    
+    @classmethod
+    def _grams(cls, text: str) -> Set[str]:
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+    
+    @staticmethod
+    def terms(query: str) -> List[str]:
+        """Split a query into lower-cased search terms"""
+        return query.lower().split()
+    
+    def add(self, name: str, description: str = "", label: str = "") -> None:
+        """Index (or re-index) a package
+        
+        Args:
+            name: Package identifier
+            description: Package description
+            label: Human readable app name
+        """
+        doc = "\n".join((name, label, description)).lower()
+        if self._docs.get(name) == doc:
+            return
+        self.remove(name)
+        self._docs[name] = doc
+        self._labels[name] = label.lower()
+        for gram in self._grams(doc):
+            self._postings.setdefault(gram, set()).add(name)
+    
+    def remove(self, name: str) -> None:
+        """Drop a package from the index (no-op if absent)"""
+        doc = self._docs.pop(name, None)
+        if doc is None:
+            return
+        del self._labels[name]
+        for gram in self._grams(doc):
+            posting = self._postings[gram]
+            posting.discard(name)
+            if not posting:
+                del self._postings[gram]
+    
+    def _candidates(self, term: str) -> Optional[Set[str]]:
+        """Packages containing all trigrams of a term, or None if the term is too short"""
+        if len(term) < self.GRAM:
+            return None
+        postings = []
+        for gram in self._grams(term):
+            posting = self._postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+    
+    def _matches(self, name: str, terms: List[str]) -> bool:
+        doc = self._docs.get(name)
+        return doc is not None and all(term in doc for term in terms)
+    
+    def _score(self, name: str, terms: List[str]) -> int:
+        """Rank a matching package: name hits beat label hits beat description hits"""
+        lower = name.lower()
+        segments = re.split(r'[._]', lower)
+        score = 0
+        for term in terms:
+            if term == lower:
+                score += 100
+            elif term in segments:
+                score += 20
+            elif term in lower:
+                score += 10
+            elif term in self._labels[name]:
+                score += 5
+            else:
+                score += 1
+        return score
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Find packages matching every term of a query, best matches first
+        
+        Args:
+            query: Search text, e.g. ``samsung knox``
+            limit: Maximum number of results, or None for all
+        
+        Returns:
+            Matching package names ranked by relevance, then by name
+        """
+        terms = self.terms(query)
+        if not terms:
+            names = sorted(self._docs)
+            return names[:limit] if limit else names
+        
+        candidate_sets = [c for c in map(self._candidates, terms) if c is not None]
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            candidates: Iterable[str] = set.intersection(*candidate_sets)
+        else:
+            # Only very short terms: nothing to look up, verify every package
+            candidates = self._docs
+        matched = [name for name in candidates if self._matches(name, terms)]
+        matched.sort(key=lambda name: (-self._score(name, terms), name))
+        return matched[:limit] if limit else matched
+    
+    def filter(self, names: Iterable[str], query: str) -> List[str]:
+        """Keep the packages matching a query, preserving their order
+        
+        Cheaper than search() when the names are already a small subset.
+        
+        Args:
+            names: Package names to check
+            query: Search text
+        
+        Returns:
+            The matching names, in their original order
+        """
+        terms = self.terms(query)
+        if not terms:
+            return list(names)
+        return [name for name in names if self._matches(name, terms)]
@@ -0,0 +1,393 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from debloat_model import Package, PackageCategory, SafetyStatus, PackageState
+
+# File name prefix of the per-device databases of a fleet
+DEVICE_DB_PREFIX = "package_db_"
+
+
+def package_to_dict(pkg: Package) -> Dict[str, Any]:
+    """Serialise a Package into the JSON database record format"""
+    return {
+        'name': pkg.name,
+        'description': pkg.description,
+        'category': pkg.category.name,
+        'safety_status': pkg.safety_status.name,
+        'state': pkg.state.name,
+        'dependencies': list(pkg.dependencies),
+        'dependents': list(pkg.dependents),
+        'version_name': pkg.version_name,
+        'version_code': pkg.version_code,
+        'uid': pkg.uid,
+        'shared_user_id': pkg.shared_user_id,
+        'apk_path': pkg.apk_path,
+        'installer': pkg.installer,
+        'first_install_time': pkg.first_install_time,
+        'libraries': list(pkg.libraries),
+        'code_size': pkg.code_size,
+        'data_size': pkg.data_size,
+        'cache_size': pkg.cache_size,
+        'memory_kb': pkg.memory_kb,
+        'cpu_ms': pkg.cpu_ms,
+        'wakelock_ms': pkg.wakelock_ms,
+        'wakeups': pkg.wakeups,
+        'impact': pkg.impact
+    }
+
+
+def package_from_dict(data: Dict[str, Any]) -> Package:
+    """Build a Package from a JSON database record"""
+    return Package(
+        name=data['name'],
+        description=data['description'],
+        category=PackageCategory[data['category']],
+        safety_status=SafetyStatus[data['safety_status']],
+        state=PackageState[data['state']],
+        dependencies=data.get('dependencies', []),
+        dependents=data.get('dependents', []),
+        version_name=data.get('version_name', ""),
+        version_code=data.get('version_code', 0),
+        uid=data.get('uid', 0),
+        shared_user_id=data.get('shared_user_id', ""),
+        apk_path=data.get('apk_path', ""),
+        installer=data.get('installer', ""),
+        first_install_time=data.get('first_install_time', ""),
+        libraries=data.get('libraries', []),
+        code_size=data.get('code_size', 0),
+        data_size=data.get('data_size', 0),
+        cache_size=data.get('cache_size', 0),
+        memory_kb=data.get('memory_kb', 0),
+        cpu_ms=data.get('cpu_ms', 0),
+        wakelock_ms=data.get('wakelock_ms', 0),
+        wakeups=data.get('wakeups', 0),
+        impact=data.get('impact', 0.0)
+    )
+
+
+class PackageStore(ABC):
+    """Storage backend for the package database
+    
+    Backends must implement every abstract method; an incomplete backend
+    fails when it is constructed.
+    """
+    
+    @abstractmethod
+    def load(self) -> Dict[str, Package]:
+        """Load every stored package
+        
+        Returns:
+            Mapping of package name to Package
+        """
+    
+    @abstractmethod
+    def save_all(self, packages: Iterable[Package]) -> None:
+        """Replace the stored database with the given packages"""
+    
+    @abstractmethod
+    def update(self, packages: Iterable[Package]) -> None:
+        """Insert or update only the given packages"""
+    
+    @abstractmethod
+    def delete(self, names: Iterable[str]) -> None:
+        """Remove the named packages (unknown names are ignored)"""
+    
+    @abstractmethod
+    def query(self, category: Optional[PackageCategory] = None,
+              safety_status: Optional[SafetyStatus] = None,
+              state: Optional[PackageState] = None) -> List[str]:
+        """Find stored packages matching all given criteria
+        
+        Args:
+            category: Required category, or None for any
+            safety_status: Required safety status, or None for any
+            state: Required state, or None for any
+        
+        Returns:
+            Sorted list of matching package names
+        """
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        """Get a value stored alongside the packages
+        
+        Backends without room for metadata keep nothing and return None.
+        
+        Args:
+            key: Metadata key
+        
+        Returns:
+            The stored value, or None if there is none
+        """
+        return None
+    
+    def set_meta(self, key: str, value: str) -> None:
+        """Store a value alongside the packages (ignored by backends without metadata)"""
+    
+    def close(self) -> None:
+        """Release any resources held by the store"""
+
+
+class JsonPackageStore(PackageStore):
+    """Original single-file JSON database, rewritten on every change"""
+    
+    def __init__(self, path: Path) -> None:
+        """Initialize the store
+        
+        Args:
+            path: Path to the JSON database file
+        """
+        self.path = path
+        self._records: Dict[str, Dict[str, Any]] = {}
+    
+    def load(self) -> Dict[str, Package]:
+        if not self.path.exists():
+            return {}
+        with open(self.path, 'r') as f:
+            self._records = {data['name']: data for data in json.load(f)}
+        return {name: package_from_dict(data) for name, data in self._records.items()}
+    
+    def _write(self) -> None:
+        with open(self.path, 'w') as f:
+            json.dump(list(self._records.values()), f, indent=2)
+    
+    def save_all(self, packages: Iterable[Package]) -> None:
+        self._records = {pkg.name: package_to_dict(pkg) for pkg in packages}
+        self._write()
+    
+    def update(self, packages: Iterable[Package]) -> None:
+        for pkg in packages:
+            self._records[pkg.name] = package_to_dict(pkg)
+        self._write()
+    
+    def delete(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._records.pop(name, None)
+        self._write()
+    
+    def query(self, category: Optional[PackageCategory] = None,
+              safety_status: Optional[SafetyStatus] = None,
+              state: Optional[PackageState] = None) -> List[str]:
+        criteria = {
+            'category': category.name if category else None,
+            'safety_status': safety_status.name if safety_status else None,
+            'state': state.name if state else None
+        }
+        return sorted(
+            name for name, data in self._records.items()
+            if all(value is None or data[key] == value for key, value in criteria.items())
+        )
+
+
+class SqlitePackageStore(PackageStore):
+    """SQLite package database with indexed filter columns and row-level updates"""
+    
+    COLUMNS = ['name', 'description', 'category', 'safety_status', 'state',
+               'dependencies', 'dependents', 'version_name', 'version_code', 'uid',
+               'shared_user_id', 'apk_path', 'installer', 'first_install_time', 'libraries',
+               'code_size', 'data_size', 'cache_size', 'memory_kb', 'cpu_ms',
+               'wakelock_ms', 'wakeups', 'impact']
+    
+    # Columns holding JSON-encoded lists
+    JSON_COLUMNS = ['dependencies', 'dependents', 'libraries']
+    
+    # Schema migrations; entry N upgrades a database from user_version N to N + 1
+    MIGRATIONS = [
+        """
+        CREATE TABLE packages (
+            name TEXT PRIMARY KEY,
+            description TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL,
+            safety_status TEXT NOT NULL,
+            state TEXT NOT NULL,
+            dependencies TEXT NOT NULL DEFAULT '[]',
+            dependents TEXT NOT NULL DEFAULT '[]'
+        );
+        CREATE INDEX idx_packages_category ON packages(category);
+        CREATE INDEX idx_packages_safety_status ON packages(safety_status);
+        CREATE INDEX idx_packages_state ON packages(state);
+        """,
+        """
+        ALTER TABLE packages ADD COLUMN version_name TEXT NOT NULL DEFAULT '';
+        ALTER TABLE packages ADD COLUMN version_code INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN uid INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN shared_user_id TEXT NOT NULL DEFAULT '';
+        ALTER TABLE packages ADD COLUMN apk_path TEXT NOT NULL DEFAULT '';
+        ALTER TABLE packages ADD COLUMN installer TEXT NOT NULL DEFAULT '';
+        ALTER TABLE packages ADD COLUMN first_install_time TEXT NOT NULL DEFAULT '';
+        ALTER TABLE packages ADD COLUMN libraries TEXT NOT NULL DEFAULT '[]'
+        """,
+        """
+        ALTER TABLE packages ADD COLUMN code_size INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN data_size INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN cache_size INTEGER NOT NULL DEFAULT 0
+        """,
+        """
+        ALTER TABLE packages ADD COLUMN memory_kb INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN cpu_ms INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN wakelock_ms INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN wakeups INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE packages ADD COLUMN impact REAL NOT NULL DEFAULT 0
+        """,
+        """
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)
+        """
+    ]
+    
+    def __init__(self, path: Path, legacy_json: Optional[Path] = None) -> None:
+        """Open (and if needed create or upgrade) the database
+        
+        Args:
+            path: Path to the SQLite database file
+            legacy_json: JSON database to import when the SQLite file is new
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        created = self._migrate()
+        if created and legacy_json is not None and legacy_json.exists():
+            legacy = JsonPackageStore(legacy_json).load()
+            self.save_all(legacy.values())
+            print(f"Migrated {len(legacy)} packages from {legacy_json} to {path}")
+    
+    def _migrate(self) -> bool:
+        """Apply pending schema migrations
+        
+        Returns:
+            True if the database was newly created
+        """
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        with self._lock, self._conn:
+            for index in range(version, len(self.MIGRATIONS)):
+                for statement in self.MIGRATIONS[index].split(';'):
+                    if statement.strip():
+                        self._conn.execute(statement)
+            self._conn.execute(f"PRAGMA user_version = {len(self.MIGRATIONS)}")
+        return version == 0
+    
+    def _row(self, pkg: Package) -> tuple:
+        data = package_to_dict(pkg)
+        for column in self.JSON_COLUMNS:
+            data[column] = json.dumps(data[column])
+        return tuple(data[column] for column in self.COLUMNS)
+    
+    def _upsert(self, packages: Iterable[Package]) -> None:
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO packages ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+            (self._row(pkg) for pkg in packages)
+        )
+    
+    def load(self) -> Dict[str, Package]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM packages").fetchall()
+        packages = {}
+        for row in rows:
+            data = dict(zip(self.COLUMNS, row))
+            for column in self.JSON_COLUMNS:
+                data[column] = json.loads(data[column])
+            packages[data['name']] = package_from_dict(data)
+        return packages
+    
+    def save_all(self, packages: Iterable[Package]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM packages")
+            self._upsert(packages)
+    
+    def update(self, packages: Iterable[Package]) -> None:
+        with self._lock, self._conn:
+            self._upsert(packages)
+    
+    def delete(self, names: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM packages WHERE name = ?", ((name,) for name in names))
+    
+    def query(self, category: Optional[PackageCategory] = None,
+              safety_status: Optional[SafetyStatus] = None,
+              state: Optional[PackageState] = None) -> List[str]:
+        clauses = []
+        params = []
+        for column, value in (('category', category),
+                              ('safety_status', safety_status),
+                              ('state', state)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value.name)
+        sql = "SELECT name FROM packages"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY name", params).fetchall()
+        return [row[0] for row in rows]
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(path: Path, create: bool = True) -> PackageStore:
+    """Open the package store backend matching a database path
+    
+    ``.json`` paths use the original JSON format; anything else is an
+    SQLite database, which imports a JSON database of the same name on
+    first use.
+    
+    Args:
+        path: Database file path
+        create: Create the database if it does not exist; readers pass
+            False so a mistyped path does not leave an empty database behind
+    
+    Returns:
+        PackageStore instance
+    
+    Raises:
+        FileNotFoundError: If create is False and the database does not exist
+    """
+    if not create and not path.exists():
+        raise FileNotFoundError(f"Package database not found: {path}")
+    if path.suffix == '.json':
+        return JsonPackageStore(path)
+    return SqlitePackageStore(path, legacy_json=path.with_suffix('.json'))
+
+
+def device_db_path(db_dir: Path, serial: str) -> Path:
+    """Get the package database path of one device in a fleet
+    
+    Args:
+        db_dir: Directory holding one package database per device
+        serial: Device serial
+    
+    Returns:
+        Path of the device's SQLite database
+    """
+    safe_serial = re.sub(r'[^A-Za-z0-9_.-]', '_', serial)
+    return db_dir / f"{DEVICE_DB_PREFIX}{safe_serial}.sqlite3"
+
+
+def device_databases(db_dir: Path) -> Dict[str, Path]:
+    """Find the per-device package databases in a directory
+    
+    Args:
+        db_dir: Directory holding one package database per device
+    
+    Returns:
+        Mapping of the serial in each file name (with characters other than
+        letters, digits, ``_``, ``.`` and ``-`` replaced by ``_``) to its
+        path, sorted by serial
+    """
+    paths = sorted(db_dir.glob(f"{DEVICE_DB_PREFIX}*.sqlite3"))
+    return {path.stem[len(DEVICE_DB_PREFIX):]: path for path in paths}
@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import threading
+from debloat_base import BatchResult, PackageManager, ScanDiff
+from debloat_model import PackageState
+from debloat_scheduler import ADB_ERRORS
+
+
+@dataclass
+class WatchEvent:
+    """Package changes the watcher applied in one poll"""
+    diff: ScanDiff
+    reinstalled: List[str]               # Removed packages that came back
+    reapplied: Optional[BatchResult] = None  # Their removal, when enforcing
+
+
+@dataclass
+class PackageListing:
+    """Package states the watcher read from the device, not yet applied"""
+    states: Dict[str, PackageState]
+    scope: Optional[List[str]] = None  # Packages the listing covers, None for all
+    generation: int = 0  # The watcher's generation() when the check started
+
+
+class PackageWatcher:
+    """Follows package changes on a device as they happen
+    
+    A shell cannot receive package broadcasts, but the package manager
+    numbers every install, uninstall and enable state change since boot
+    and lists them in ``dumpsys package changes``. The watcher polls that
+    sequence number, which costs one short command per interval, and only
+    re-lists the packages that changed. A full rescan is done on the first
+    poll, after a reboot (the sequence starts over), on devices without
+    a change log and when more than REFRESH_LIMIT packages changed.
+    
+    With ``on_listing`` the watcher thread only reads the device and hands
+    each listing over; the owner applies it with apply() on the thread that
+    reads the packages (the Tk thread in the GUI). A listing read while
+    another operation changed the packages is stale: the owner drops it and
+    calls resync() (see ``generation``).
+    """
+    
+    # Changed packages re-listed one by one; more get one full listing, as
+    # each package costs a command per scan section
+    REFRESH_LIMIT = 8
+    
+    def __init__(self, manager: PackageManager, interval: float = 2.0,
+                 enforce: bool = False,
+                 on_change: Optional[Callable[[WatchEvent], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 can_poll: Optional[Callable[[], bool]] = None,
+                 on_listing: Optional[Callable[[PackageListing], None]] = None,
+                 generation: Optional[Callable[[], int]] = None) -> None:
+        """Initialize the watcher
+        
+        Args:
+            manager: PackageManager whose packages, DB and index are updated
+            interval: Seconds between polls
+            enforce: Remove packages again when a removed package reappears
+            on_change: Called on the watcher thread with each non-empty change
+            on_error: Called on the watcher thread when a poll fails
+            can_poll: Polls are skipped while this returns False (e.g. while
+                another operation is using the manager)
+            on_listing: Called on the watcher thread with each listing instead
+                of applying it there; on_change and enforce are then unused
+            generation: Counter of the other operations started on the
+                manager, stamped on each listing when its check starts
+        """
+        self.manager = manager
+        self.interval = interval
+        self.enforce = enforce
+        self.on_change = on_change
+        self.on_error = on_error
+        self.can_poll = can_poll
+        self.on_listing = on_listing
+        self.generation = generation
+        self.sequence: Optional[int] = None
+        self._started = False
+        self._resyncs = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def check(self) -> Optional[PackageListing]:
+        """Read the packages that changed on the device since the last check
+        
+        Only the device is accessed; the listing is applied with apply().
+        
+        Returns:
+            Listing to apply, or None if nothing changed
+        """
+        generation = self.generation() if self.generation is not None else 0
+        resyncs = self._resyncs
+        sequence, names = self.manager.package_changes(self.sequence or 0)
+        if not self._started or sequence is None or len(names) > self.REFRESH_LIMIT or (
+                self.sequence is not None and sequence < self.sequence):
+            listing = PackageListing(self.manager.list_package_states(), generation=generation)
+            self._started = True
+        elif sequence != self.sequence and names:
+            listing = PackageListing(self.manager.list_packages(names), names, generation)
+        else:
+            return None
+        if self._resyncs == resyncs:
+            self.sequence = sequence
+        return listing
+    
+    def resync(self) -> None:
+        """Forget the change sequence after dropping a stale listing
+        
+        The next check re-lists every package changed since boot, so the
+        changes the dropped listing covered are read again. May be called
+        from another thread while a check runs.
+        """
+        self._resyncs += 1
+        self.sequence = None
+    
+    def apply(self, listing: PackageListing) -> Optional[WatchEvent]:
+        """Apply a listing from check() to the packages, DB and search index
+        
+        Args:
+            listing: Listing to apply
+        
+        Returns:
+            The applied changes, or None if nothing changed
+        """
+        diff = self.manager.apply_listing(listing.states, listing.scope)
+        if diff.unchanged:
+            return None
+        return WatchEvent(diff, [
+            name for name, (old, new) in diff.changed.items()
+            if old == PackageState.REMOVED and new != PackageState.REMOVED
+        ])
+    
+    def poll(self) -> Optional[WatchEvent]:
+        """Check the device once and apply its package changes
+        
+        Returns:
+            The applied changes, or None if nothing changed
+        """
+        listing = self.check()
+        event = None if listing is None else self.apply(listing)
+        if event is not None and self.enforce and event.reinstalled:
+            event.reapplied = self.manager.remove_packages(event.reinstalled)
+        return event
+    
+    def run(self, stop: threading.Event) -> None:
+        """Poll until stop is set
+        
+        Args:
+            stop: Event ending the loop
+        """
+        delay = 0.0
+        while not stop.wait(delay):
+            delay = self.interval
+            if self.can_poll is not None and not self.can_poll():
+                continue
+            try:
+                if self.on_listing is not None:
+                    listing = self.check()
+                    if listing is not None:
+                        self.on_listing(listing)
+                    continue
+                event = self.poll()
+            except ADB_ERRORS as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                continue
+            if event is not None and self.on_change is not None:
+                self.on_change(event)
+    
+    def start(self) -> None:
+        """Start polling on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(self._stop,), daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the background thread and wait for its current poll"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
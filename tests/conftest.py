@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from debloat_adb_async import AdbServerClient, AdbServerTransport
+from debloat_fake_adb import FakeDevice, fake_adb_server
+
+SERIAL = "TEST0001"
+
+# Package states of the fake device; the names fix the metadata, sizes and
+# usage FakeDevice derives from them
+PACKAGES = {
+    'com.android.settings': 'enabled',
+    'com.android.systemui': 'enabled',
+    'com.samsung.android.bixby.agent': 'enabled',
+    'com.samsung.android.game.gamehome': 'disabled',
+    'com.facebook.katana': 'enabled',
+    'com.facebook.appmanager': 'uninstalled',
+    'com.google.android.youtube': 'enabled',
+    'com.att.myatt': 'enabled',
+}
+
+
+@pytest.fixture
+def device() -> FakeDevice:
+    """Fake device speaking shell protocol v2"""
+    return FakeDevice(SERIAL, PACKAGES, files={'/data/local/tmp/hello.txt': b"hello\n"})
+
+
+@pytest.fixture
+def legacy_device(device: FakeDevice) -> FakeDevice:
+    """The same device without shell protocol v2, as on Android 6 and older"""
+    device.features.discard('shell_v2')
+    return device
+
+
+@pytest.fixture
+def server(device: FakeDevice):
+    """Fake adb server serving the device; new clients connect to it"""
+    with fake_adb_server([device]) as server:
+        yield server
+
+
+@pytest.fixture
+def transport(server) -> AdbServerTransport:
+    """Synchronous shell transport to the fake device"""
+    return AdbServerTransport(SERIAL, AdbServerClient(port=server.port))
+
+
+@pytest.fixture
+def manager(server, tmp_path: Path):
+    """PackageManager over the fake device with its database in a temporary directory"""
+    from debloat_base import PackageManager
+    from debloat_references import ReferenceIndex
+    references = ReferenceIndex(tmp_path / "references_index.sqlite3")
+    manager = PackageManager(db_path=tmp_path / "package_db.sqlite3", transport='server',
+                             serial=SERIAL, references=references)
+    yield manager
+    manager.close()
+    references.close()
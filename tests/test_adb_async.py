@@ -0,0 +1,89 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from debloat_adb_async import AdbProtocolError, AdbServerClient, AdbServerTransport
+
+from conftest import SERIAL
+
+
+@pytest.fixture(params=['v2', 'legacy'])
+def shell(request, device, transport) -> AdbServerTransport:
+    """Transport to the fake device over shell protocol v2 and the legacy raw shell"""
+    if request.param == 'legacy':
+        device.features.discard('shell_v2')
+    return transport
+
+
+def test_devices_and_features(server):
+    client = AdbServerClient(port=server.port)
+    assert asyncio.run(client.devices()) == [(SERIAL, 'device')]
+    assert 'shell_v2' in asyncio.run(client.features(SERIAL))
+
+
+def test_run_returns_stdout(shell):
+    assert shell.run('echo one; echo two') == "one\ntwo\n"
+
+
+def test_run_keeps_output_without_trailing_newline(shell):
+    assert shell.run('echo -n partial') == "partial"
+
+
+def test_stream_yields_lines(shell):
+    lines = list(shell.stream('pm list packages -e'))
+    assert lines[0] == "package:com.android.settings\n"
+    assert all(line.endswith("\n") for line in lines)
+
+
+def test_exit_status_and_partial_output(shell):
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        shell.run('echo before; pm uninstall --user 0 com.not.installed')
+    assert failure.value.returncode == 1
+    assert failure.value.output.startswith("before\n")
+
+
+def test_missing_command_exit_status(shell):
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        shell.run('nosuchcommand')
+    assert failure.value.returncode == 127
+
+
+def test_stderr_is_separate_on_v2(transport):
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        transport.run('nosuchcommand')
+    assert failure.value.output == ""
+    assert "not found" in failure.value.stderr
+
+
+def test_stderr_is_merged_on_legacy_shell(legacy_device, transport):
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        transport.run('nosuchcommand')
+    assert "not found" in failure.value.output
+
+
+def test_run_times_out_when_output_stalls(device, transport):
+    device.latency = 0.5
+    with pytest.raises(subprocess.TimeoutExpired):
+        transport.run('echo late', timeout=0.05)
+
+
+def test_run_timeout_is_per_line(device, transport):
+    device.latency = 0.05
+    assert transport.run('echo slow', timeout=0.5) == "slow\n"
+
+
+def test_sync_stat_and_pull(server):
+    client = AdbServerClient(port=server.port)
+    mode, size, _ = asyncio.run(client.stat(SERIAL, '/data/local/tmp/hello.txt'))
+    assert mode != 0 and size == 6
+    assert asyncio.run(client.stat(SERIAL, '/nonexistent'))[0] == 0
+    assert asyncio.run(client.pull(SERIAL, '/data/local/tmp/hello.txt')) == b"hello\n"
+    with pytest.raises(AdbProtocolError):
+        asyncio.run(client.pull(SERIAL, '/nonexistent'))
+
+
+def test_unknown_device_is_rejected(server):
+    client = AdbServerClient(port=server.port)
+    with pytest.raises(AdbProtocolError):
+        asyncio.run(client.shell('NOSUCHDEVICE', 'echo hi'))
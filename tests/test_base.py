@@ -0,0 +1,90 @@
+import pytest
+
+from debloat_model import PackageState
+
+from conftest import PACKAGES, SERIAL
+
+
+@pytest.fixture(params=['v2', 'legacy'])
+def scanned(request, device, manager):
+    """Manager that has scanned the fake device over either shell protocol"""
+    if request.param == 'legacy':
+        device.features.discard('shell_v2')
+    manager.rescan()
+    return manager
+
+
+def test_rescan_lists_every_state(scanned):
+    states = {name: pkg.state for name, pkg in scanned.packages.items()}
+    assert states['com.android.settings'] == PackageState.INSTALLED
+    assert states['com.samsung.android.game.gamehome'] == PackageState.DISABLED
+    assert states['com.facebook.appmanager'] == PackageState.REMOVED
+    assert set(states) == set(PACKAGES)
+
+
+def test_rescan_reports_only_differences(device, scanned):
+    assert scanned.rescan().unchanged
+    device.set_state('com.facebook.katana', 'disabled')
+    device.set_state('com.example.new', 'enabled')
+    diff = scanned.rescan()
+    assert diff.added == ['com.example.new']
+    assert diff.changed == {
+        'com.facebook.katana': (PackageState.INSTALLED, PackageState.DISABLED)
+    }
+
+
+def test_remove_and_restore_on_device(device, scanned):
+    result = scanned.remove_packages(['com.facebook.katana', 'com.not.known'])
+    assert result.succeeded == ['com.facebook.katana']
+    assert result.failed == ['com.not.known']
+    assert scanned.packages['com.facebook.katana'].state == PackageState.REMOVED
+    assert scanned.list_packages(['com.facebook.katana']) == {
+        'com.facebook.katana': PackageState.REMOVED
+    }
+
+    assert scanned.restore_package('com.facebook.katana')
+    assert scanned.packages['com.facebook.katana'].state == PackageState.INSTALLED
+    assert scanned.rescan().unchanged
+
+
+def test_harvested_dependencies_drive_the_plan(scanned):
+    scanned.harvest_metadata()
+    assert scanned.packages['com.android.settings'].libraries == ('org.apache.http.legacy',)
+    # The fake makes every twentieth package declare a permission the next requests
+    assert scanned.graph.dependents('com.android.settings') == {'com.android.systemui'}
+    plan = scanned.plan_removal(['com.android.settings'])
+    assert 'com.android.settings' in plan.blocked
+
+
+def test_reference_changes_reach_stored_packages(server, tmp_path):
+    from debloat_base import PackageManager
+    from debloat_model import SafetyStatus
+    from debloat_references import ReferenceIndex
+    source = tmp_path / "references.md"
+    header = "App Name\tPackage Name\tExtra Information\tSafe To Disable?\n"
+    source.write_text(header + "MyATT\tcom.att.myatt\tCarrier account app\tYes\n")
+    
+    def open_manager():
+        references = ReferenceIndex(tmp_path / "index.sqlite3", sources=[source])
+        manager = PackageManager(db_path=tmp_path / "package_db.sqlite3", transport='server',
+                                 serial=SERIAL, references=references)
+        return manager, references
+    
+    manager, references = open_manager()
+    manager.rescan()
+    assert manager.packages['com.att.myatt'].safety_status == SafetyStatus.SAFE_TO_REMOVE
+    manager.close()
+    references.close()
+    
+    source.write_text(header + "MyATT\tcom.att.myatt\tNeeded for visual voicemail\tNo\n")
+    manager, references = open_manager()
+    try:
+        pkg = manager.packages['com.att.myatt']
+        assert (pkg.safety_status, pkg.description) == (
+            SafetyStatus.ESSENTIAL, "Needed for visual voicemail")
+        assert manager.store.load()['com.att.myatt'].safety_status == SafetyStatus.ESSENTIAL
+        # Unchanged references leave the stored classifications alone
+        assert manager._refresh_classifications() == []
+    finally:
+        manager.close()
+        references.close()
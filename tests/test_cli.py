@@ -0,0 +1,143 @@
+import io
+import json
+
+import pytest
+
+import debloat_cli
+from debloat_fake_adb import FakeDevice, fake_adb_server
+
+from conftest import PACKAGES, SERIAL
+
+
+@pytest.fixture
+def cli(monkeypatch, tmp_path):
+    """Run the CLI against databases in tmp_path; returns (exit status, records)"""
+    monkeypatch.chdir(tmp_path)
+
+    def run(*args):
+        records = io.StringIO()
+        monkeypatch.setattr(debloat_cli, '_records', records)
+        status = debloat_cli.main(['--transport', 'server', '--serial', SERIAL, *args])
+        return status, [json.loads(line) for line in records.getvalue().splitlines()]
+    return run
+
+
+def events(records, event):
+    return [record for record in records if record['event'] == event]
+
+
+@pytest.mark.parametrize('command', [
+    ['list'],
+    ['list', '--removable'],
+    ['list', '--by-impact'],
+    ['diff', 'package_db.sqlite3', 'other.sqlite3'],
+    ['remove', '--dry-run', 'com.facebook.katana'],
+    ['profile', 'carrier.json'],
+])
+def test_read_only_commands_refuse_a_missing_database(cli, tmp_path, command):
+    (tmp_path / "carrier.json").write_text('{"include": [{"categories": "CARRIER"}]}')
+    status, records = cli(*command)
+    assert status == 1
+    assert records[-1]['type'] == 'FileNotFoundError'
+    assert not list(tmp_path.glob("*.sqlite3"))
+
+
+def test_scan_list_remove_restore(cli, device, server):
+    status, records = cli('scan')
+    assert status == 0
+    assert events(records, 'summary') == [
+        {'event': 'summary', 'listed': len(PACKAGES), 'added': len(PACKAGES),
+         'removed': 0, 'changed': 0}]
+
+    status, records = cli('list', '--state', 'disabled')
+    assert [record['name'] for record in records] == ['com.samsung.android.game.gamehome']
+
+    status, records = cli('remove', '--dry-run', 'com.facebook.katana', 'com.android.settings')
+    assert status == 1
+    assert events(records, 'blocked')[0]['name'] == 'com.android.settings'
+    assert events(records, 'plan')[0]['batches'] == [['com.facebook.katana']]
+    assert device.packages['com.facebook.katana'] == 'enabled'
+
+    status, records = cli('remove', 'com.facebook.katana')
+    assert (status, records[0]['success']) == (0, True)
+    assert device.packages['com.facebook.katana'] == 'uninstalled'
+    status, records = cli('restore', 'com.facebook.katana')
+    assert (status, records[0]['success']) == (0, True)
+    assert device.packages['com.facebook.katana'] == 'enabled'
+
+
+def test_list_by_impact_and_diff(cli, server, tmp_path):
+    cli('scan', '--profile')
+    status, records = cli('list', '--by-impact')
+    impacts = [record['impact'] for record in records]
+    assert impacts == sorted(impacts, reverse=True) and impacts[0] > 0
+
+    (tmp_path / "package_db.sqlite3").rename(tmp_path / "before.sqlite3")
+    cli('--db', 'after.sqlite3', 'scan')
+    status, records = cli('diff', 'before.sqlite3', 'after.sqlite3')
+    assert status == 0
+    assert {record['event'] for record in records} == {'changed'}
+    assert all(set(record['changes']) <= {'memory_kb', 'cpu_ms', 'wakelock_ms', 'wakeups',
+                                          'impact'} for record in records)
+
+
+@pytest.fixture
+def fleet():
+    devices = [FakeDevice('FLEET01', PACKAGES),
+               FakeDevice('FLEET:02', {**PACKAGES, 'com.example.extra': 'enabled'})]
+    with fake_adb_server(devices):
+        yield devices
+
+
+def fleet_cli(cli, *args):
+    return cli('--db', 'fleet/package_db.sqlite3', *args)
+
+
+def test_fleet_scan_remove_and_table(cli, fleet, tmp_path):
+    (tmp_path / "fleet").mkdir()
+    status, records = fleet_cli(cli, 'remove', '--fleet', 'com.facebook.katana')
+    assert status == 1
+    assert {record['serial'] for record in events(records, 'error')} == {'FLEET01', 'FLEET:02'}
+    assert not list((tmp_path / "fleet").iterdir())
+
+    status, records = fleet_cli(cli, 'scan', '--fleet')
+    assert status == 0
+    assert {(record['serial'], record['listed']) for record in events(records, 'summary')} == {
+        ('FLEET01', len(PACKAGES)), ('FLEET:02', len(PACKAGES) + 1)}
+    assert events(records, 'progress')[-1]['completed'] == 2
+    rows = {record['name']: record['states'] for record in events(records, 'row')}
+    assert rows['com.example.extra'] == {'FLEET01': "", 'FLEET:02': 'INSTALLED'}
+    assert sorted(path.name for path in (tmp_path / "fleet").iterdir()) == [
+        'package_db_FLEET01.sqlite3', 'package_db_FLEET_02.sqlite3']
+
+    status, records = fleet_cli(cli, 'remove', '--fleet', 'com.facebook.katana')
+    assert status == 0
+    assert {record['serial'] for record in events(records, 'result')} == {'FLEET01', 'FLEET:02'}
+    assert events(records, 'row') == [{
+        'event': 'row', 'name': 'com.facebook.katana', 'category': 'THIRD_PARTY',
+        'safety_status': 'SAFE_TO_REMOVE', 'states': {'FLEET01': 'REMOVED', 'FLEET:02': 'REMOVED'}
+    }]
+    assert all(device.packages['com.facebook.katana'] == 'uninstalled' for device in fleet)
+
+
+def test_fleet_plans_are_offline(cli, fleet, tmp_path, monkeypatch):
+    (tmp_path / "fleet").mkdir()
+    (tmp_path / "extra.json").write_text('{"include": [{"packages": "com.example.extra"}]}')
+    status, records = fleet_cli(cli, 'profile', 'extra.json', '--fleet')
+    assert status == 1
+    assert records[0]['type'] == 'FileNotFoundError'
+
+    fleet_cli(cli, 'scan', '--fleet')
+    # No adb server to reach: planning must not need one
+    monkeypatch.setenv('ANDROID_ADB_SERVER_PORT', '1')
+    monkeypatch.setenv('PATH', str(tmp_path))
+    status, records = fleet_cli(cli, 'profile', 'extra.json', '--fleet')
+    assert status == 0
+    plans = {record['serial']: record for record in events(records, 'plan')}
+    assert plans['FLEET01']['missing'] == ['com.example.extra']
+    assert plans['FLEET_02']['batches'] == [['com.example.extra']]
+
+    status, records = fleet_cli(cli, 'remove', '--fleet', '--dry-run', 'com.example.extra')
+    assert status == 1
+    assert events(records, 'blocked') == [{'event': 'blocked', 'name': 'com.example.extra',
+                                           'reason': "Unknown package", 'serial': 'FLEET01'}]
@@ -0,0 +1,154 @@
+from debloat_dumpsys import (
+    parse_batterystats_checkin, parse_diskstats, parse_du, parse_dumpsys_packages,
+    parse_meminfo, parse_overlay_list, parse_package_changes, parse_package_paths
+)
+from debloat_fake_adb import FakeDevice
+
+from conftest import PACKAGES
+
+
+def test_dumpsys_packages_fields_and_lists():
+    lines = [
+        "Packages:\n",
+        "  Package [com.android.chrome] (5c2a1f0):\n",
+        "    userId=10123\n",
+        "    codePath=/data/app/~~a1/com.android.chrome-1\n",
+        "    versionCode=612345 minSdk=29 targetSdk=34\n",
+        "    versionName=120.0.1\n",
+        "    usesLibraries:\n",
+        "      android.test.base version:0\n",
+        "    declared permissions:\n",
+        "      com.android.chrome.permission.C2D: prot=signature, INSTALLED\n",
+        "    installerPackageName=com.android.vending\n",
+        "  Package [com.android.phone] (1b2c3d4):\n",
+        "    appId=1001\n",
+        "    sharedUser=SharedUserSetting{9f8e7d android.uid.phone/1001}\n",
+        "\n",
+        "Hidden system packages:\n",
+        "  Package [com.android.chrome] (0a0b0c0):\n",
+        "    versionCode=1\n",
+    ]
+    blocks = dict(parse_dumpsys_packages(lines))
+    assert list(blocks) == ['com.android.chrome', 'com.android.phone']
+    chrome = blocks['com.android.chrome']
+    assert chrome['uid'] == 10123
+    assert chrome['apk_path'] == '/data/app/~~a1/com.android.chrome-1'
+    assert chrome['version_code'] == 612345
+    assert chrome['version_name'] == '120.0.1'
+    assert chrome['installer'] == 'com.android.vending'
+    assert chrome['libraries'] == ['android.test.base']
+    assert chrome['declared_permissions'] == ['com.android.chrome.permission.C2D']
+    assert chrome['requested_permissions'] == []
+    assert blocks['com.android.phone']['shared_user_id'] == 'android.uid.phone'
+
+
+def test_dumpsys_packages_from_fake_device(transport):
+    lines = transport.stream('dumpsys package packages')
+    blocks = dict(parse_dumpsys_packages(lines))
+    assert set(blocks) == set(PACKAGES)
+    settings = blocks['com.android.settings']
+    assert settings['uid'] == 1000
+    assert settings['shared_user_id'] == 'android.uid.system'
+    assert settings['libraries'] == ['org.apache.http.legacy']
+    assert settings['first_install_time'] == '2008-12-31 16:00:00'
+
+
+def test_package_changes_filters_user():
+    lines = [
+        "Package Changes:\n",
+        "  Sequence number=7\n",
+        "  User 0:\n",
+        "    seq=5, package=com.foo\n",
+        "    seq=7, package=com.bar\n",
+        "  User 10:\n",
+        "    seq=6, package=com.work\n",
+    ]
+    assert parse_package_changes(lines) == (7, [(5, 'com.foo'), (7, 'com.bar')])
+    assert parse_package_changes(lines, user=10) == (7, [(6, 'com.work')])
+    assert parse_package_changes(["Unknown command\n"]) == (None, [])
+
+
+def test_package_changes_from_fake_device(device, transport):
+    device.set_state('com.facebook.katana', 'disabled')
+    device.set_state('com.example.new', 'enabled')
+    sequence, changes = parse_package_changes(transport.run('dumpsys package changes').splitlines())
+    assert sequence == 2
+    assert changes == [(1, 'com.facebook.katana'), (2, 'com.example.new')]
+
+
+def test_diskstats_from_fake_device(transport):
+    sizes = parse_diskstats(transport.run('dumpsys diskstats').splitlines())
+    # The fake leaves out packages whose checksum is a multiple of 13; none here is
+    assert set(sizes) == set(PACKAGES)
+    assert sizes['com.att.myatt'] == FakeDevice._sizes('com.att.myatt')
+
+
+def test_diskstats_rejects_mismatched_columns():
+    lines = [
+        'Package Names: ["a","b"]',
+        'App Sizes: [1,2]',
+        'App Data Sizes: [3]',
+        'Cache Sizes: [5,6]',
+    ]
+    assert parse_diskstats(lines) == {}
+    assert parse_diskstats(["Latency: 2ms [512B Data Write]"]) == {}
+
+
+def test_package_paths_and_du(transport):
+    paths = parse_package_paths(transport.run('pm list packages -f -u').splitlines())
+    assert set(paths) == set(PACKAGES)
+    assert paths['com.facebook.katana'].endswith('/base.apk')
+
+    code = FakeDevice._code_path('com.att.myatt')
+    output = transport.run(f'du -sk {code} 2>/dev/null; true')
+    assert parse_du(output.splitlines()) == {code: FakeDevice._sizes('com.att.myatt')[0]}
+
+
+def test_meminfo_reads_only_the_process_section(transport):
+    processes = parse_meminfo(transport.run('dumpsys meminfo').splitlines())
+    assert processes['com.android.systemui'] == 186459
+    assert processes['com.att.myatt:remote'] == 14046
+    # "Total PSS by OOM adjustment" follows and must not be read
+    assert processes['system'] == 412345
+    assert 'System' not in processes
+
+
+def test_batterystats_checkin_wake_lock_layouts():
+    lines = [
+        "9,0,i,uid,10100,com.foo\n",
+        "9,0,i,uid,10100,com.foo.helper\n",
+        "9,10100,l,cpu,1200,300,0\n",
+        # Current layout: count, current, max and total follow each type letter
+        "9,10100,l,wl,*job*/com.foo,0,f,0,0,0,0,5000,p,3,0,0,5000,0,w,0,0,0,0\n",
+        # Older layout without current, max and total
+        "9,10100,l,wl,sync,0,f,0,250,p,1,0,w,0\n",
+        # Partial timer only
+        "9,10100,l,wl,p,40,p,1\n",
+        "9,10100,l,wua,*walarm*:com.foo.SYNC,12\n",
+        "9,10100,u,cpu,999,999,0\n",
+    ]
+    packages, usage = parse_batterystats_checkin(lines)
+    assert packages == {10100: ['com.foo', 'com.foo.helper']}
+    assert usage == {10100: {'cpu_ms': 1500, 'wakelock_ms': 5290, 'wakeups': 12}}
+
+
+def test_batterystats_checkin_from_fake_device(transport):
+    packages, usage = parse_batterystats_checkin(
+        transport.run('dumpsys batterystats --checkin').splitlines()
+    )
+    assert packages[10002] == ['com.att.myatt']
+    assert 'com.facebook.appmanager' not in sum(packages.values(), [])
+    assert usage[10002]['cpu_ms'] == 644046 + 44046
+
+
+def test_overlay_list(device, transport):
+    device.overlays = {
+        'com.android.theme.font.notoserif': 'android',
+        'com.samsung.android.themecenter.overlay': 'com.android.systemui',
+    }
+    overlays = parse_overlay_list(transport.run('cmd overlay list').splitlines())
+    assert overlays == device.overlays
+    assert parse_overlay_list(["android\n", "--- com.disabled.overlay\n", "[ ] com.off\n"]) == {
+        'com.disabled.overlay': 'android',
+        'com.off': 'android',
+    }
@@ -0,0 +1,106 @@
+import pytest
+
+from debloat_graph import DependencyGraph, build_dependency_graph, plan_removal
+from debloat_model import Package, PackageCategory, PackageState, SafetyStatus
+
+
+def make_package(name, safety=SafetyStatus.SAFE_TO_REMOVE, state=PackageState.INSTALLED,
+                 dependencies=()):
+    return Package(name, "", PackageCategory.SAMSUNG, safety, state,
+                   dependencies=list(dependencies))
+
+
+@pytest.fixture
+def packages():
+    # lib is used by app.a, app.b and the removed app.r; core is needed by
+    # the essential phone; essential.q depends on helper
+    return {pkg.name: pkg for pkg in [
+        make_package('lib'),
+        make_package('app.a', dependencies=['lib']),
+        make_package('app.b', dependencies=['lib']),
+        make_package('app.r', state=PackageState.REMOVED, dependencies=['lib']),
+        make_package('core'),
+        make_package('phone', safety=SafetyStatus.ESSENTIAL, dependencies=['core']),
+        make_package('helper'),
+        make_package('essential.q', safety=SafetyStatus.ESSENTIAL, dependencies=['helper']),
+    ]}
+
+
+@pytest.fixture
+def graph(packages):
+    return DependencyGraph.from_packages(packages)
+
+
+def test_dependents_block_removal(packages, graph):
+    plan = plan_removal(packages, graph, ['lib'])
+    # The removed app no longer counts as a dependent
+    assert plan.blocked == {'lib': "Package has dependents: app.a, app.b"}
+    assert plan.batches == []
+
+
+def test_expand_adds_dependents_before_their_dependency(packages, graph):
+    plan = plan_removal(packages, graph, ['lib'], expand=True)
+    assert plan.blocked == {}
+    assert plan.added == ['app.a', 'app.b']
+    assert plan.batches == [['app.a', 'app.b'], ['lib']]
+    assert plan.packages == ['app.a', 'app.b', 'lib']
+
+
+def test_requesting_the_whole_closure_needs_no_expand(packages, graph):
+    plan = plan_removal(packages, graph, ['app.b', 'lib', 'app.a'])
+    assert plan.blocked == {}
+    assert plan.added == []
+    assert plan.batches == [['app.a', 'app.b'], ['lib']]
+
+
+def test_safety_checks(packages, graph):
+    plan = plan_removal(packages, graph, ['phone', 'core', 'com.unknown'], expand=True)
+    assert plan.blocked == {
+        'phone': "Essential package",
+        'core': "Needed by blocked packages: phone",
+        'com.unknown': "Unknown package",
+    }
+    plan = plan_removal(packages, graph, ['core'], expand=True)
+    assert plan.blocked == {'core': "Needed by essential packages: phone"}
+
+
+def test_blocking_cascades_to_dependencies(packages, graph):
+    plan = plan_removal(packages, graph, ['essential.q', 'helper', 'app.a'])
+    assert plan.blocked == {
+        'essential.q': "Essential package",
+        'helper': "Needed by blocked packages: essential.q",
+    }
+    assert plan.batches == [['app.a']]
+
+
+def test_build_dependency_graph_sources():
+    packages = {pkg.name: pkg for pkg in [
+        make_package('com.vendor.a'),
+        make_package('com.vendor.b'),
+        make_package('com.android.settings'),
+        make_package('com.android.phone'),
+        make_package('com.lib.maps_3'),
+        make_package('com.app.maps'),
+        make_package('com.theme.overlay'),
+        make_package('com.provider'),
+        make_package('com.client'),
+    ]}
+    packages['com.vendor.a'].shared_user_id = 'com.vendor.shared'
+    packages['com.vendor.b'].shared_user_id = 'com.vendor.shared'
+    packages['com.android.settings'].shared_user_id = 'android.uid.system'
+    packages['com.android.phone'].shared_user_id = 'android.uid.system'
+    packages['com.app.maps'].libraries = ('com.lib.maps',)
+    graph = build_dependency_graph(
+        packages,
+        declared_permissions={'com.provider': ['com.provider.READ'],
+                              'android': ['android.permission.INTERNET']},
+        requested_permissions={'com.client': ['com.provider.READ', 'android.permission.INTERNET']},
+        overlays={'com.theme.overlay': 'com.android.settings'},
+    )
+    assert graph.dependencies('com.vendor.a') >= {'com.vendor.b'}
+    # Platform shared users group unrelated components
+    assert 'com.android.phone' not in graph.dependencies('com.android.settings')
+    assert graph.dependencies('com.app.maps') == {'com.lib.maps_3'}
+    assert graph.dependencies('com.theme.overlay') == {'com.android.settings'}
+    assert graph.dependencies('com.client') == {'com.provider'}
+    assert graph.dependents('com.provider') == {'com.client'}
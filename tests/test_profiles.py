@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from debloat_model import Package, PackageCategory, PackageState, SafetyStatus
+from debloat_profiles import (
+    Profile, ProfileRule, compile_profile, compile_snapshot, find_profile, load_profile
+)
+from debloat_store import open_store
+
+
+def make_package(name, category, safety=SafetyStatus.SAFE_TO_REMOVE,
+                 state=PackageState.INSTALLED, **fields):
+    return Package(name, "", category, safety, state, **fields)
+
+
+@pytest.fixture
+def packages():
+    return {pkg.name: pkg for pkg in [
+        make_package('com.att.myatt', PackageCategory.CARRIER, code_size=3000, impact=4.0,
+                     apk_path='/data/app/com.att.myatt/base.apk'),
+        make_package('com.att.callprotect', PackageCategory.CARRIER, SafetyStatus.CAUTION,
+                     data_size=500, impact=1.5),
+        make_package('com.att.dialer', PackageCategory.CARRIER, SafetyStatus.ESSENTIAL),
+        make_package('com.att.old', PackageCategory.CARRIER, state=PackageState.REMOVED),
+        make_package('com.samsung.android.game.gamehome', PackageCategory.SAMSUNG),
+        make_package('com.samsung.android.game.gos', PackageCategory.SAMSUNG),
+        make_package('com.samsung.android.bixby.agent', PackageCategory.SAMSUNG,
+                     SafetyStatus.UNKNOWN),
+        make_package('com.samsung.android.bixby.wakeup', PackageCategory.SAMSUNG,
+                     dependencies=['com.samsung.android.bixby.agent']),
+    ]}
+
+
+CARRIER_CLEANUP = {
+    'name': 'carrier-cleanup',
+    'include': [
+        {'categories': 'carrier', 'safety': ['SAFE_TO_REMOVE', 'CAUTION']},
+        {'patterns': ['com.samsung.android.game.*']},
+        {'packages': ['com.facebook.katana']},
+    ],
+    'exclude': [{'packages': 'com.samsung.android.game.gos'}],
+}
+
+
+def test_rule_parsing():
+    rule = ProfileRule.from_dict({'categories': 'carrier', 'states': ['installed', 'DISABLED'],
+                                  'patterns': ['com.att.*', r're:\.bixby\.']})
+    assert rule.categories == {PackageCategory.CARRIER}
+    assert rule.states == {PackageState.INSTALLED, PackageState.DISABLED}
+    assert [bool(p.search('com.samsung.android.bixby.agent')) for p in rule.patterns] == [
+        False, True]
+    # Globs match the whole name from its start
+    assert not rule.patterns[0].search('org.com.att.app')
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'colour': 'red'}, "Unknown profile rule key: colour"),
+    ({'safety': 'maybe'}, "Unknown safety value in profile rule: MAYBE"),
+    ({'patterns': 're:('}, "Invalid profile pattern"),
+    (['packages'], "Profile rule must be a mapping"),
+])
+def test_rule_errors(data, message):
+    with pytest.raises(ValueError, match=message.replace('(', r'\(')):
+        ProfileRule.from_dict(data)
+
+
+def test_profile_errors():
+    with pytest.raises(ValueError, match="Unknown profile keys: remove"):
+        Profile.from_dict({'remove': []})
+    with pytest.raises(ValueError, match="must be a mapping"):
+        Profile.from_dict([])
+
+
+def test_select_includes_and_excludes(packages):
+    profile = Profile.from_dict(CARRIER_CLEANUP)
+    assert profile.select(packages.values()) == [
+        'com.att.callprotect', 'com.att.myatt', 'com.att.old',
+        'com.samsung.android.game.gamehome',
+    ]
+    assert profile.listed_packages == {'com.facebook.katana'}
+
+
+def test_compile_counts_and_risk(packages):
+    plan = compile_profile(Profile.from_dict(CARRIER_CLEANUP), packages)
+    assert plan.removal.batches == [
+        ['com.att.callprotect', 'com.att.myatt', 'com.samsung.android.game.gamehome']]
+    assert plan.already_removed == ['com.att.old']
+    assert plan.missing == ['com.facebook.katana']
+    assert plan.counts == {'selected': 4, 'remove': 3, 'added': 0, 'blocked': 0,
+                           'already_removed': 1, 'missing': 1}
+    assert plan.by_category == {'CARRIER': 2, 'SAMSUNG': 1}
+    assert plan.caution == ['com.att.callprotect']
+    assert plan.reclaimable_size == 3500
+    assert plan.impact == 5.5
+
+
+def test_compile_expands_or_blocks_dependents(packages):
+    data = {'include': [{'packages': 'com.samsung.android.bixby.agent'}]}
+    plan = compile_profile(Profile.from_dict(data), packages)
+    assert plan.removal.blocked == {
+        'com.samsung.android.bixby.agent': "Package has dependents: com.samsung.android.bixby.wakeup"
+    }
+    plan = compile_profile(Profile.from_dict({**data, 'expand': True}), packages)
+    assert plan.removal.batches == [['com.samsung.android.bixby.wakeup'],
+                                    ['com.samsung.android.bixby.agent']]
+    assert plan.unknown == ['com.samsung.android.bixby.agent']
+
+
+def test_load_find_and_compile_snapshot(packages, tmp_path):
+    path = tmp_path / "carrier.json"
+    path.write_text(json.dumps({key: value for key, value in CARRIER_CLEANUP.items()
+                                if key != 'name'}))
+    assert find_profile('carrier', tmp_path) == path
+    with pytest.raises(FileNotFoundError):
+        find_profile('missing', tmp_path)
+    profile = load_profile(path)
+    assert profile.name == 'carrier'
+
+    db_path = tmp_path / "package_db.sqlite3"
+    with pytest.raises(FileNotFoundError):
+        compile_snapshot(profile, db_path)
+    assert not db_path.exists()
+    store = open_store(db_path)
+    store.save_all(packages.values())
+    store.close()
+    assert compile_snapshot(profile, db_path).counts['remove'] == 3
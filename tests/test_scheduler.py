@@ -0,0 +1,117 @@
+import random
+import subprocess
+import threading
+import time
+
+import pytest
+
+from debloat_adb_async import AdbProtocolError
+from debloat_base import PackageManager
+from debloat_fake_adb import FakeDevice, fake_adb_server
+from debloat_references import ReferenceIndex
+from debloat_scheduler import CommandScheduler, RetryPolicy, is_transient
+
+from conftest import PACKAGES, SERIAL
+
+
+@pytest.mark.parametrize('error, transient', [
+    (AdbProtocolError("device offline"), True),
+    (AdbProtocolError("device 'X1' not found"), True),
+    (ConnectionResetError(), True),
+    (subprocess.CalledProcessError(1, 'adb', stderr="error: no devices/emulators found"), True),
+    (subprocess.CalledProcessError(1, 'adb', output=b"error: closed"), True),
+    (subprocess.CalledProcessError(1, 'adb', stderr="error: device unauthorized"), False),
+    (subprocess.CalledProcessError(1, 'pm', output="Failure [not installed for 0]"), False),
+    (subprocess.TimeoutExpired('adb', 5), False),
+])
+def test_is_transient(error, transient):
+    assert is_transient(error) == transient
+
+
+def test_backoff_is_exponential_with_equal_jitter():
+    policy = RetryPolicy(attempts=6, base_delay=0.5, max_delay=3.0)
+    delays = list(policy.delays(random.Random(1)))
+    assert len(delays) == 5
+    for delay, step in zip(delays, [0.5, 1.0, 2.0, 3.0, 3.0]):
+        assert step / 2 <= delay <= step
+
+
+def flaky(failures, error):
+    """Attempt that raises error for the first failures calls"""
+    calls = []
+
+    def attempt():
+        calls.append(None)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+    return attempt, calls
+
+
+def test_call_retries_transient_failures():
+    scheduler = CommandScheduler(retry=RetryPolicy(attempts=3, base_delay=0))
+    attempt, calls = flaky(2, AdbProtocolError("device offline"))
+    assert scheduler.call(SERIAL, attempt) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_gives_up_after_the_last_attempt():
+    scheduler = CommandScheduler(retry=RetryPolicy(attempts=3, base_delay=0))
+    attempt, calls = flaky(3, AdbProtocolError("device offline"))
+    with pytest.raises(AdbProtocolError):
+        scheduler.call(SERIAL, attempt)
+    assert len(calls) == 3
+
+
+def test_call_does_not_retry_other_failures():
+    scheduler = CommandScheduler(retry=RetryPolicy(attempts=3, base_delay=0))
+    attempt, calls = flaky(1, subprocess.CalledProcessError(1, 'pm', output="Failure"))
+    with pytest.raises(subprocess.CalledProcessError):
+        scheduler.call(SERIAL, attempt)
+    assert len(calls) == 1
+
+
+def test_slots_limit_commands_per_device_and_in_total():
+    scheduler = CommandScheduler(max_in_flight=3, per_device=2)
+    running = {'A': 0, 'B': 0, 'C': 0}
+    peaks = {'A': 0, 'total': 0}
+    lock = threading.Lock()
+
+    def command(serial):
+        with scheduler.slot(serial):
+            with lock:
+                running[serial] += 1
+                peaks['A'] = max(peaks['A'], running['A'])
+                peaks['total'] = max(peaks['total'], sum(running.values()))
+            time.sleep(0.02)
+            with lock:
+                running[serial] -= 1
+
+    threads = [threading.Thread(target=command, args=(serial,))
+               for serial in ['A'] * 4 + ['B'] * 2 + ['C'] * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peaks['A'] == 2
+    assert peaks['total'] == 3
+
+
+def test_scan_survives_a_flaky_device(tmp_path):
+    device = FakeDevice(SERIAL, PACKAGES, failure_rate=0.3, seed=7)
+    scheduler = CommandScheduler(retry=RetryPolicy(attempts=20, base_delay=0))
+    references = ReferenceIndex(tmp_path / "references_index.sqlite3")
+    with fake_adb_server([device]):
+        manager = PackageManager(db_path=tmp_path / "package_db.sqlite3", transport='server',
+                                 serial=SERIAL, references=references, scheduler=scheduler)
+        try:
+            for _ in range(5):
+                manager.rescan()
+            assert set(manager.packages) == set(PACKAGES)
+            device.failure_rate = 1.0
+            manager.scheduler = CommandScheduler(retry=RetryPolicy(attempts=2, base_delay=0))
+            with pytest.raises(AdbProtocolError, match="offline"):
+                manager.rescan()
+        finally:
+            manager.close()
+            references.close()
@@ -0,0 +1,93 @@
+import json
+import sqlite3
+
+import pytest
+
+from debloat_model import Package, PackageCategory, PackageState, SafetyStatus
+from debloat_store import (
+    JsonPackageStore, PackageStore, SqlitePackageStore, open_store, package_to_dict
+)
+
+
+def make_package(name, category=PackageCategory.SAMSUNG, safety=SafetyStatus.SAFE_TO_REMOVE,
+                 state=PackageState.INSTALLED, **fields):
+    return Package(name, f"{name} description", category, safety, state, **fields)
+
+
+@pytest.fixture(params=['sqlite3', 'json'])
+def store(request, tmp_path):
+    store = open_store(tmp_path / f"package_db.{request.param}")
+    yield store
+    store.close()
+
+
+def test_round_trip(store):
+    pkg = make_package('com.samsung.android.bixby.agent', dependencies=['com.samsung.core'],
+                       version_code=42, code_size=4096, impact=12.5)
+    store.save_all([pkg, make_package('com.samsung.core', safety=SafetyStatus.ESSENTIAL)])
+    loaded = store.load()
+    assert set(loaded) == {'com.samsung.android.bixby.agent', 'com.samsung.core'}
+    assert package_to_dict(loaded[pkg.name]) == package_to_dict(pkg)
+
+
+def test_update_delete_and_query(store):
+    store.save_all([
+        make_package('com.a'),
+        make_package('com.b', category=PackageCategory.GOOGLE),
+        make_package('com.c', state=PackageState.REMOVED),
+    ])
+    store.update([make_package('com.a', state=PackageState.DISABLED), make_package('com.d')])
+    store.delete(['com.b', 'com.unknown'])
+    assert store.load()['com.a'].state == PackageState.DISABLED
+    assert store.query(category=PackageCategory.SAMSUNG) == ['com.a', 'com.c', 'com.d']
+    assert store.query(state=PackageState.REMOVED) == ['com.c']
+    assert store.query(category=PackageCategory.GOOGLE) == []
+
+
+def test_migrates_the_first_schema(tmp_path):
+    path = tmp_path / "package_db.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SqlitePackageStore.MIGRATIONS[0])
+    conn.execute("INSERT INTO packages (name, description, category, safety_status, state) "
+                 "VALUES ('com.old', 'old', 'CARRIER', 'CAUTION', 'REMOVED')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    store = SqlitePackageStore(path)
+    try:
+        pkg = store.load()['com.old']
+        assert (pkg.category, pkg.safety_status, pkg.state) == (
+            PackageCategory.CARRIER, SafetyStatus.CAUTION, PackageState.REMOVED)
+        assert list(pkg.libraries) == []
+        assert (pkg.code_size, pkg.memory_kb, pkg.impact) == (0, 0, 0.0)
+        version = store._conn.execute("PRAGMA user_version").fetchone()[0]
+        assert version == len(SqlitePackageStore.MIGRATIONS)
+    finally:
+        store.close()
+
+
+def test_imports_legacy_json(tmp_path):
+    legacy = tmp_path / "package_db.json"
+    legacy.write_text(json.dumps([package_to_dict(make_package('com.legacy'))]))
+    store = open_store(tmp_path / "package_db.sqlite3")
+    try:
+        assert list(store.load()) == ['com.legacy']
+    finally:
+        store.close()
+
+
+def test_readers_do_not_create_a_database(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_store(tmp_path / "missing.sqlite3", create=False)
+    assert not (tmp_path / "missing.sqlite3").exists()
+
+
+def test_incomplete_backend_fails_on_construction():
+    class LoadOnly(PackageStore):
+        def load(self):
+            return {}
+
+    with pytest.raises(TypeError):
+        LoadOnly()
+    assert issubclass(JsonPackageStore, PackageStore)
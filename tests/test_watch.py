@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from debloat_model import PackageState
+from debloat_scheduler import ADB_ERRORS, CommandScheduler, RetryPolicy
+from debloat_watch import PackageWatcher
+
+from conftest import PACKAGES
+
+
+def test_listing_read_before_a_job_is_resynced(device, manager):
+    jobs = [0]
+    watcher = PackageWatcher(manager, generation=lambda: jobs[0])
+    watcher.apply(watcher.check())
+
+    # A listing is read, then a job removes a package before it is applied
+    device.set_state('com.att.myatt', 'disabled')
+    device.set_state('com.facebook.katana', 'enabled')  # An update
+    stale = watcher.check()
+    jobs[0] += 1
+    assert manager.remove_package('com.facebook.katana')
+    # Applying the listing would bring the removed package back
+    assert stale.states['com.facebook.katana'] == PackageState.INSTALLED
+
+    # The owner drops the stale listing; the next check reads both changes again
+    assert stale.generation != jobs[0]
+    watcher.resync()
+    listing = watcher.check()
+    assert listing.generation == jobs[0]
+    event = watcher.apply(listing)
+    assert event.diff.changed == {
+        'com.att.myatt': (PackageState.INSTALLED, PackageState.DISABLED)
+    }
+    assert event.reinstalled == []
+    assert manager.packages['com.facebook.katana'].state == PackageState.REMOVED
+
+
+def test_resync_during_a_check_keeps_the_sequence_reset(device, manager):
+    watcher = PackageWatcher(manager)
+    watcher.apply(watcher.check())
+    device.set_state('com.att.myatt', 'disabled')
+
+    def package_changes(since):
+        watcher.resync()
+        return type(manager).package_changes(manager, since)
+
+    manager.package_changes = package_changes
+    assert watcher.check() is not None
+    assert watcher.sequence is None
+
+
+@pytest.fixture
+def watcher(manager):
+    """Watcher that has done its initial full listing"""
+    watcher = PackageWatcher(manager)
+    event = watcher.poll()
+    assert set(event.diff.added) == set(PACKAGES)
+    return watcher
+
+
+def test_quiet_device_needs_no_listing(watcher):
+    assert watcher.check() is None
+    assert watcher.sequence == 0
+
+
+def test_changes_are_listed_by_name(device, watcher):
+    device.set_state('com.att.myatt', 'disabled')
+    device.set_state('com.example.new', 'enabled')
+    listing = watcher.check()
+    assert listing.scope == ['com.att.myatt', 'com.example.new']
+    event = watcher.apply(listing)
+    assert event.diff.added == ['com.example.new']
+    assert list(event.diff.changed) == ['com.att.myatt']
+    assert watcher.sequence == 2
+    assert watcher.check() is None
+
+
+def test_many_changes_get_one_full_listing(device, watcher):
+    for number in range(PackageWatcher.REFRESH_LIMIT + 1):
+        device.set_state(f'com.example.app{number}', 'enabled')
+    listing = watcher.check()
+    assert listing.scope is None
+    assert len(watcher.apply(listing).diff.added) == PackageWatcher.REFRESH_LIMIT + 1
+
+
+def test_reboot_restarts_with_a_full_listing(device, watcher):
+    for name in ['com.att.myatt', 'com.facebook.katana', 'com.google.android.youtube']:
+        device.set_state(name, 'enabled')
+    watcher.apply(watcher.check())
+    # After a reboot the change log starts over below the last sequence seen
+    device.sequence = 0
+    device.changes.clear()
+    device.set_state('com.facebook.katana', 'disabled')
+    listing = watcher.check()
+    assert listing.scope is None
+    assert watcher.sequence == 1
+    assert list(watcher.apply(listing).diff.changed) == ['com.facebook.katana']
+
+
+def test_enforce_removes_reinstalled_packages(device, manager, watcher):
+    assert manager.remove_package('com.facebook.katana')
+    watcher.poll()
+    watcher.enforce = True
+    device.set_state('com.facebook.katana', 'enabled')  # An OTA brings it back
+    event = watcher.poll()
+    assert event.reinstalled == ['com.facebook.katana']
+    assert event.reapplied.succeeded == ['com.facebook.katana']
+    assert device.packages['com.facebook.katana'] == 'uninstalled'
+    assert manager.packages['com.facebook.katana'].state == PackageState.REMOVED
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_run_reports_errors_and_skips_busy_polls(device, manager):
+    errors = []
+    listings = []
+    busy = threading.Event()
+    watcher = PackageWatcher(manager, interval=0.01, on_error=errors.append,
+                             can_poll=lambda: not busy.is_set(), on_listing=listings.append)
+    manager.scheduler = CommandScheduler(retry=RetryPolicy(attempts=1))
+    busy.set()
+    watcher.start()
+    time.sleep(0.05)
+    assert listings == []
+    device.failure_rate = 1.0
+    busy.clear()
+    wait_for(lambda: errors)
+    device.failure_rate = 0.0
+    wait_for(lambda: listings)
+    watcher.stop()
+    assert isinstance(errors[0], ADB_ERRORS)
+    assert listings[0].scope is None
+    assert manager.packages == {}